@@ -0,0 +1,306 @@
+"""
+Approximate Dashboard Analytics
+Maintains mergeable sketches and stratified samples while preprocessing and
+scoring, and answers the dashboard KPI, histogram and distribution queries
+from them in constant time with reported error bounds
+"""
+
+import pandas as pd
+import numpy as np
+import pickle
+import os
+
+from sketches import QuantileSketch, HyperLogLog, BottomKSample
+
+
+RISK_BINS = [0, 0.3, 0.7, 1.0]
+RISK_LABELS = ['Low Risk', 'Medium Risk', 'High Risk']
+
+# Columns of the scored frames kept in the stratified samples (stratum first)
+STRATA_COLUMNS = {
+    'customers': ['predicted_segment', 'predicted_churn', 'churn_probability', 'monetary'],
+    'products': ['product_category_name', 'predicted_return', 'return_probability', 'price']
+}
+
+# Probability sketched per part
+PROBABILITY_COLUMNS = {'customers': 'churn_probability', 'products': 'return_probability'}
+
+
+class ApproximateAnalytics:
+    def __init__(self, sample_size=10000, sketch_capacity=2048, hll_precision=12, seed=42):
+        """Initialize empty sketches
+
+        - HyperLogLog counters for distinct customers / orders / products
+        - KLL quantile sketches for churn and return probabilities, plus a
+          second sketch per probability of the scores retracted since
+        - Bottom-k samples per segment (customers) and per category (products)
+        Exact row counts are kept alongside, since they cost nothing.
+        """
+        self.sample_size = sample_size
+        self.sketch_capacity = sketch_capacity
+        self.seed = seed
+        self.distinct = {
+            'customers': HyperLogLog(hll_precision),
+            'orders': HyperLogLog(hll_precision),
+            'products': HyperLogLog(hll_precision)
+        }
+        self.transaction_rows = 0
+        self.probabilities = {
+            'churn_probability': QuantileSketch(sketch_capacity, seed),
+            'return_probability': QuantileSketch(sketch_capacity, seed)
+        }
+        self.retracted = {
+            'churn_probability': QuantileSketch(sketch_capacity, seed),
+            'return_probability': QuantileSketch(sketch_capacity, seed)
+        }
+        self.customer_strata = {}
+        self.product_strata = {}
+        # Sketched rows of the last scored customers / products, in row order
+        self.scored = {'customers': None, 'products': None}
+
+    def update_transactions(self, df):
+        """Feed a chunk of the transaction frame (preprocessing side)"""
+        for name, col in [('customers', 'customer_unique_id'), ('orders', 'order_id'),
+                          ('products', 'product_id')]:
+            if col in df.columns:
+                self.distinct[name].update(df[col].to_numpy())
+        self.transaction_rows += len(df)
+        return self
+
+    @staticmethod
+    def sketch_rows(df, part):
+        """The sketched columns of scored rows, typed the same whether scored or read back from CSV
+
+        Measures are rounded so that CSV round-trip noise does not count as a change.
+        """
+        stratum, *measures = STRATA_COLUMNS[part]
+        rows = pd.DataFrame(index=range(len(df)))
+        if part == 'customers':
+            # Segment number, -1 for unscored rows
+            rows[stratum] = pd.to_numeric(df[stratum], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+        else:
+            rows[stratum] = pd.Series(df[stratum].to_numpy(dtype=object), dtype=object).fillna('Unknown').to_numpy()
+        for col in measures:
+            if col in df.columns:
+                rows[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64).round(9)
+        return rows
+
+    def _strata(self, part):
+        """Per-stratum samples of 'customers' or 'products'"""
+        return self.customer_strata if part == 'customers' else self.product_strata
+
+    def update_scores(self, part, df):
+        """Feed scored 'customers' or 'products' rows (as returned by sketch_rows)"""
+        self.probabilities[PROBABILITY_COLUMNS[part]].update(df[PROBABILITY_COLUMNS[part]].to_numpy())
+        strata = self._strata(part)
+        for key, rows in df.groupby(STRATA_COLUMNS[part][0], sort=False):
+            if key not in strata:
+                strata[key] = BottomKSample(self.sample_size, self.seed)
+            strata[key].update(rows)
+        return self
+
+    def retract_scores(self, part, df):
+        """Remove scored rows fed earlier (e.g. the old scores of rescored rows)"""
+        self.retracted[PROBABILITY_COLUMNS[part]].update(df[PROBABILITY_COLUMNS[part]].to_numpy())
+        strata = self._strata(part)
+        for key, rows in df.groupby(STRATA_COLUMNS[part][0], sort=False):
+            if key in strata:
+                strata[key].remove(rows)
+                if strata[key].count <= 0:
+                    del strata[key]
+        return self
+
+    def needs_rebuild(self, part):
+        """Whether retractions have worn a part's sketches down enough to re-sketch it
+
+        Retracted scores widen the histogram bounds and removals shrink the
+        samples, so once more scores were retracted than are live, or a
+        sample fell below half its size, the part is better sketched afresh.
+        """
+        name = PROBABILITY_COLUMNS[part]
+        live = self.probabilities[name].count - self.retracted[name].count
+        if self.retracted[name].count > live:
+            return True
+        return any(
+            sample.rows is not None and len(sample.rows) < min(sample.count, self.sample_size) / 2
+            for sample in self._strata(part).values()
+        )
+
+    def reset(self, part):
+        """Drop a part's sketches (before it is sketched afresh)"""
+        name = PROBABILITY_COLUMNS[part]
+        self.probabilities[name] = QuantileSketch(self.sketch_capacity, self.seed)
+        self.retracted[name] = QuantileSketch(self.sketch_capacity, self.seed)
+        self._strata(part).clear()
+        self.scored[part] = None
+        return self
+
+    def sync_scores(self, part, df):
+        """Bring a part's sketches in line with its scored rows, feeding only the rows that changed
+
+        Rows are matched by position with the last scored rows: a changed
+        row has its old values retracted and its new values fed, and rows
+        past the old end are fed as new. Fewer rows than before, or worn
+        sketches (see needs_rebuild), re-sketch the part. Returns the number
+        of rows fed.
+        """
+        rows = self.sketch_rows(df, part)
+        old = self.scored[part]
+        if (old is None or len(rows) < len(old) or list(rows.columns) != list(old.columns)
+                or self.needs_rebuild(part)):
+            self.reset(part).update_scores(part, rows)
+            self.scored[part] = rows
+            return len(rows)
+
+        head = rows.iloc[:len(old)]
+        changed = np.zeros(len(old), dtype=bool)
+        for col in rows.columns:
+            before, after = old[col].to_numpy(), head[col].to_numpy()
+            differs = before != after
+            if before.dtype.kind == 'f':
+                differs &= ~(np.isnan(before) & np.isnan(after))
+            changed |= differs
+        fed = pd.concat([head[changed], rows.iloc[len(old):]], ignore_index=True)
+        if len(fed):
+            self.retract_scores(part, old[changed])
+            self.update_scores(part, fed)
+        self.scored[part] = rows
+        return len(fed)
+
+    def merge(self, other):
+        """Fold another instance (e.g. from another chunk or worker) into this one"""
+        for name, hll in other.distinct.items():
+            self.distinct[name].merge(hll)
+        self.transaction_rows += other.transaction_rows
+        for name, sketch in other.probabilities.items():
+            self.probabilities[name].merge(sketch)
+        # Transaction sketches saved before retractions existed have none
+        for name, sketch in getattr(other, 'retracted', {}).items():
+            self.retracted[name].merge(sketch)
+        for own, theirs in [(self.customer_strata, other.customer_strata),
+                            (self.product_strata, other.product_strata)]:
+            for key, sample in theirs.items():
+                if key in own:
+                    own[key].merge(sample)
+                else:
+                    own[key] = sample
+        return self
+
+    def _stratified_total(self, strata, column):
+        """(population size, total, +/- half-width) combined over strata"""
+        population = sum(sample.count for sample in strata.values())
+        total = 0.0
+        variance = 0.0
+        for sample in strata.values():
+            stratum_total, error = sample.estimate_total(column)
+            if np.isnan(stratum_total):
+                continue
+            total += stratum_total
+            variance += (error / 1.96) ** 2
+        return population, total, 1.96 * np.sqrt(variance)
+
+    def _counts(self, name, edges):
+        """(bin counts, +/- error) of a probability: sketched minus retracted scores"""
+        sketch, retracted = self.probabilities[name], self.retracted[name]
+        counts = sketch.histogram(edges) - retracted.histogram(edges)
+        error = 2 * (sketch.rank_error + retracted.rank_error)
+        return np.maximum(counts, 0.0), error
+
+    def _risk_counts(self, name):
+        """(count, +/- error) per risk level from a probability sketch"""
+        # pd.cut's bins are right-closed, the sketch's are left-closed; both
+        # only differ at the exact edges, well inside the rank error
+        counts, error = self._counts(name, RISK_BINS)
+        return {label: (float(c), float(error)) for label, c in zip(RISK_LABELS, counts)}
+
+    def kpis(self):
+        """Approximate KPI table with a +/- error column (95% or worst-case bounds)"""
+        rows = []
+
+        n_customers, churned, churned_err = self._stratified_total(self.customer_strata, 'predicted_churn')
+        _, churn_sum, churn_sum_err = self._stratified_total(self.customer_strata, 'churn_probability')
+        rows.append(('Total Customers', n_customers, 0.0))
+        rows.append(('Customers at Risk', churned, churned_err))
+        if n_customers:
+            rows.append(('Churn Rate', churned / n_customers, churned_err / n_customers))
+            rows.append(('Avg Churn Probability', churn_sum / n_customers, churn_sum_err / n_customers))
+
+        n_products, returned, returned_err = self._stratified_total(self.product_strata, 'predicted_return')
+        _, return_sum, return_sum_err = self._stratified_total(self.product_strata, 'return_probability')
+        rows.append(('Total Products', n_products, 0.0))
+        rows.append(('Products with Return Risk', returned, returned_err))
+        if n_products:
+            rows.append(('Return Rate', returned / n_products, returned_err / n_products))
+            rows.append(('Avg Return Probability', return_sum / n_products, return_sum_err / n_products))
+
+        for label, (count, error) in self._risk_counts('churn_probability').items():
+            rows.append((f'{label.split()[0]} Risk Customers', count, error))
+
+        for name, hll in self.distinct.items():
+            if self.transaction_rows:
+                estimate = hll.count()
+                rows.append((f'Distinct {name.title()}', estimate, 1.96 * hll.relative_error * estimate))
+
+        return pd.DataFrame(rows, columns=['Metric', 'Value', 'Error'])
+
+    def histogram(self, name, bins=20):
+        """Approximate histogram of a probability over [0, 1] with a count error bound"""
+        edges = np.linspace(0.0, 1.0, bins + 1)
+        counts, error = self._counts(name, edges)
+        return pd.DataFrame({
+            'bin_start': edges[:-1].round(4),
+            'bin_end': edges[1:].round(4),
+            'count': counts.round().astype(np.int64),
+            'count_error': error
+        })
+
+    def stratum_estimates(self, part, columns):
+        """Per-stratum row count (exact) and estimated means of columns, with +/- errors"""
+        rows = []
+        for key, sample in self._strata(part).items():
+            row = {STRATA_COLUMNS[part][0]: key, 'count': sample.count}
+            for col in columns:
+                row[col], row[f'{col}_error'] = sample.estimate_mean(col)
+            rows.append(row)
+        return pd.DataFrame(rows, columns=[STRATA_COLUMNS[part][0], 'count'] + [
+            name for col in columns for name in (col, f'{col}_error')
+        ])
+
+    def risk_level_estimates(self, part, columns=(), bins=RISK_BINS, labels=RISK_LABELS):
+        """Estimated rows and means of columns per (stratum, risk level), from each stratum's sample"""
+        probability = PROBABILITY_COLUMNS[part]
+        frames = []
+        for key, sample in self._strata(part).items():
+            if sample.rows is None or not len(sample.rows):
+                continue
+            levels = pd.cut(sample.rows[probability], bins=bins, labels=labels)
+            cells = sample.rows.groupby(levels, observed=True)
+            cell = cells[list(columns)].mean() if columns else pd.DataFrame(index=cells.size().index)
+            cell.insert(0, 'count', (cells.size() / len(sample.rows) * sample.count).round())
+            cell.insert(0, 'risk_level', cell.index.astype(str))
+            cell.insert(0, STRATA_COLUMNS[part][0], key)
+            frames.append(cell.reset_index(drop=True))
+        if not frames:
+            return pd.DataFrame(columns=[STRATA_COLUMNS[part][0], 'risk_level', 'count'] + list(columns))
+        return pd.concat(frames, ignore_index=True)
+
+    def save(self, filepath='models/approx_analytics.pkl'):
+        """Save all sketches and samples"""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'wb') as f:
+            pickle.dump(self, f)
+
+        print(f"Approximate analytics saved to {filepath}")
+
+    @staticmethod
+    def load(filepath='models/approx_analytics.pkl'):
+        """Load saved sketches and samples"""
+        with open(filepath, 'rb') as f:
+            return pickle.load(f)
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Approximate Dashboard Analytics Module")
+    print("Use this module to answer KPI queries from sketches and samples")
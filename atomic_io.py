@@ -0,0 +1,37 @@
+"""
+Atomic File Writes
+Writes go to a temporary file in the target folder and are renamed into
+place, so readers (the website, the data service) never see partial files
+"""
+
+import json
+import os
+import tempfile
+
+
+def atomic_write_bytes(filepath, content):
+    """Write bytes to filepath atomically"""
+    folder = os.path.dirname(filepath) or '.'
+    os.makedirs(folder, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.' + os.path.basename(filepath) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_csv(df, filepath, **to_csv_kwargs):
+    """Write a DataFrame as CSV atomically"""
+    to_csv_kwargs.setdefault('index', False)
+    atomic_write_bytes(filepath, df.to_csv(**to_csv_kwargs).encode('utf-8'))
+
+
+def atomic_write_json(obj, filepath, **dump_kwargs):
+    """Write an object as JSON atomically"""
+    atomic_write_bytes(filepath, json.dumps(obj, **dump_kwargs).encode('utf-8'))
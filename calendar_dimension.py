@@ -0,0 +1,155 @@
+"""
+Calendar Dimension
+Precomputed date attributes (year / quarter / month / ISO week / weekday /
+Brazilian national holidays) keyed by integer day numbers, so date columns
+are enriched by an array take instead of per-row .dt accessors and strftime
+"""
+
+import pandas as pd
+import numpy as np
+
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+# Calendar columns written to dashboard tables by default
+CALENDAR_COLUMNS = ['year', 'month', 'month_name', 'day_of_week', 'week_number', 'is_holiday', 'holiday_name']
+
+# Fixed-date national holidays (month, day, first year observed)
+FIXED_HOLIDAYS = [
+    (1, 1, 'New Year\'s Day', None),
+    (4, 21, 'Tiradentes', None),
+    (5, 1, 'Labour Day', None),
+    (9, 7, 'Independence Day', None),
+    (10, 12, 'Our Lady of Aparecida', None),
+    (11, 2, 'All Souls\' Day', None),
+    (11, 15, 'Republic Proclamation Day', None),
+    (11, 20, 'Black Consciousness Day', 2024),
+    (12, 25, 'Christmas Day', None)
+]
+
+# Holidays that move with Easter (days from Easter Sunday)
+EASTER_HOLIDAYS = [
+    (-48, 'Carnival Monday'),
+    (-47, 'Carnival Tuesday'),
+    (-2, 'Good Friday'),
+    (60, 'Corpus Christi')
+]
+
+
+def date_keys(dates):
+    """Integer day keys (days since 1970-01-01) of dates; -1 where missing"""
+    dates = pd.Series(dates) if not isinstance(dates, pd.Series) else dates
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce')
+    days = dates.to_numpy().astype('datetime64[D]')
+    keys = (days - EPOCH).astype(np.int64)
+    return np.where(np.isnat(days), -1, keys)
+
+
+def easter_sundays(years):
+    """Gregorian Easter Sunday of each year (anonymous Gregorian algorithm)"""
+    y = np.asarray(years, dtype=np.int64)
+    a, b, c = y % 19, y // 100, y % 100
+    d, e = b // 4, b % 4
+    g = (b - (b + 8) // 25 + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return pd.to_datetime(pd.DataFrame({'year': y, 'month': month, 'day': day}))
+
+
+def brazil_holidays(years):
+    """National holidays of Brazil in the given years, as date -> name"""
+    years = np.unique(np.asarray(years, dtype=np.int64))
+    holidays = {}
+    for month, day, name, since in FIXED_HOLIDAYS:
+        for year in years:
+            if since is None or year >= since:
+                holidays[pd.Timestamp(year=int(year), month=month, day=day)] = name
+    for easter in easter_sundays(years):
+        for offset, name in EASTER_HOLIDAYS:
+            holidays[easter + pd.Timedelta(days=offset)] = name
+    return pd.Series(holidays, dtype=object).sort_index()
+
+
+class CalendarDimension:
+    def __init__(self, start='2016-01-01', end='2019-12-31'):
+        """Initialize a calendar covering start..end (extended on demand)"""
+        self.table = None
+        self.first_key = None
+        self.build(start, end)
+
+    def build(self, start, end):
+        """Compute every calendar attribute once for each day in start..end"""
+        dates = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq='D')
+        iso = dates.isocalendar()
+        keys = date_keys(dates)
+        weekday = dates.weekday.to_numpy()
+
+        holidays = brazil_holidays(np.unique(dates.year))
+        holiday_name = holidays.reindex(dates).to_numpy(dtype=object)
+        # Black Friday: the Friday after the fourth Thursday of November
+        november_friday = (dates.month == 11) & (weekday == 4)
+        black_friday = november_friday & (dates.day >= 23) & (dates.day <= 29)
+
+        month_start = dates.to_period('M').to_timestamp()
+        self.table = pd.DataFrame({
+            'date': dates,
+            'date_key': keys,
+            'year': dates.year.to_numpy(),
+            'quarter': dates.quarter.to_numpy(),
+            'month': dates.month.to_numpy(),
+            'month_name': dates.month_name().to_numpy(dtype=object),
+            'day': dates.day.to_numpy(),
+            'day_of_week': dates.day_name().to_numpy(dtype=object),
+            'weekday': weekday,
+            'week_number': iso['week'].to_numpy(dtype=np.int64),
+            'iso_year': iso['year'].to_numpy(dtype=np.int64),
+            'week_start_key': keys - weekday,
+            'month_start_key': date_keys(month_start),
+            'is_weekend': (weekday >= 5).astype(int),
+            'is_holiday': pd.notna(holiday_name).astype(int),
+            'holiday_name': np.where(pd.isna(holiday_name), '', holiday_name),
+            'is_black_friday': black_friday.astype(int)
+        })
+        self.first_key = int(keys[0])
+        return self.table
+
+    def rows(self, keys):
+        """Calendar rows of day keys, extending the calendar if a key falls outside it"""
+        keys = np.asarray(keys, dtype=np.int64)
+        valid = keys[keys >= 0]
+        if len(valid):
+            low = min(int(valid.min()), self.first_key)
+            high = max(int(valid.max()), self.first_key + len(self.table) - 1)
+            if low < self.first_key or high >= self.first_key + len(self.table):
+                self.build(EPOCH + low, EPOCH + high)
+        return keys - self.first_key
+
+    def attributes(self, keys, columns=None):
+        """Calendar attributes for day keys, by array take (all missing for key -1)"""
+        columns = list(columns or self.table.columns)
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = self.rows(keys)
+        missing = keys < 0
+        result = self.table[columns].iloc[np.where(missing, 0, rows)].reset_index(drop=True)
+        if missing.any():
+            result = result.astype(object)
+            result.loc[missing] = np.nan
+        return result
+
+    def enrich(self, df, date_column='date', columns=CALENDAR_COLUMNS):
+        """Add calendar columns for df[date_column] in place"""
+        attributes = self.attributes(date_keys(df[date_column]), columns)
+        for col in columns:
+            df[col] = attributes[col].to_numpy()
+        return df
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Calendar Dimension Module")
+    print("Use this module to look up date attributes and Brazilian holidays")
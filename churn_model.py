@@ -8,14 +8,20 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 import xgboost as xgb
+import hashlib
 import pickle
 import os
+from drift_monitor import DriftMonitor
+from explanations import xgboost_contributions, global_importance
 
 
 class ChurnPredictor:
     def __init__(self):
         """Initialize the churn prediction model"""
         self.model = None
+        self.model_version = None
+        self.drift_monitor = None
+        self.global_importance = None
         self.feature_columns = [
             'frequency',
             'monetary',
@@ -93,6 +99,13 @@ class ChurnPredictor:
         
         # Train model
         self.model.fit(X_train, y_train)
+        self.model_version = hashlib.md5(pickle.dumps(self.model)).hexdigest()[:12]
+        
+        # Reference histograms for drift monitoring: inputs from the training
+        # rows, scores from the held-out rows (in-sample scores are overconfident)
+        self.drift_monitor = DriftMonitor().fit(
+            X_train, self.model.predict_proba(X_test)[:, 1], self.feature_columns
+        )
         
         # Evaluate
         train_score = self.model.score(X_train, y_train)
@@ -101,10 +114,18 @@ class ChurnPredictor:
         print(f"Training accuracy: {train_score:.4f}")
         print(f"Testing accuracy: {test_score:.4f}")
         
+        # Global importances from held-out contributions
+        self.global_importance = global_importance(
+            self.explain(X_test.head(5000)), self.feature_columns
+        )
+        
         return self.model
     
-    def predict(self, customer_data):
-        """Predict churn probability for customers"""
+    def predict(self, customer_data, monitor=True):
+        """Predict churn probability for customers
+        
+        With monitor=True, inputs and scores are added to the drift monitor.
+        """
         if self.model is None:
             raise ValueError("Model not trained yet. Call train() first.")
         
@@ -119,8 +140,33 @@ class ChurnPredictor:
         churn_proba = self.model.predict_proba(X)[:, 1]
         churn_prediction = self.model.predict(X)
         
+        if monitor and self.drift_monitor is not None:
+            self.drift_monitor.update(X, churn_proba)
+        
         return churn_prediction, churn_proba
     
+    def update_drift(self, customer_data, scores):
+        """Add already-scored rows to the drift monitor, with the inputs predict() sees"""
+        if self.drift_monitor is not None:
+            self.drift_monitor.update(customer_data[self.feature_columns], scores)
+    
+    def explain(self, customer_data, exact=True):
+        """Per-row churn contributions (log-odds) from XGBoost's pred_contribs
+        
+        The default is exact TreeSHAP; exact=False gives the approximate
+        path attribution, which costs about as much as scoring. Returns one
+        column per feature plus 'bias'; each row sums to the model's log-odds.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet. Call train() first.")
+        
+        X_scaled = self.model.named_steps['scaler'].transform(customer_data[self.feature_columns])
+        contributions = xgboost_contributions(self.model.named_steps['classifier'], X_scaled, exact)
+        
+        return pd.DataFrame(
+            contributions, columns=self.feature_columns + ['bias'], index=customer_data.index
+        )
+    
     def save_model(self, filepath='models/churn_model.pkl'):
         """Save the trained model"""
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -128,6 +174,9 @@ class ChurnPredictor:
         with open(filepath, 'wb') as f:
             pickle.dump({
                 'model': self.model,
+                'model_version': self.model_version,
+                'drift_monitor': self.drift_monitor,
+                'global_importance': self.global_importance,
                 'feature_columns': self.feature_columns,
                 'AT_RISK_LOWER_BOUND': self.AT_RISK_LOWER_BOUND,
                 'AT_RISK_UPPER_BOUND': self.AT_RISK_UPPER_BOUND
@@ -141,6 +190,11 @@ class ChurnPredictor:
             data = pickle.load(f)
             
         self.model = data['model']
+        self.drift_monitor = data.get('drift_monitor')
+        self.global_importance = data.get('global_importance')
+        self.model_version = data.get(
+            'model_version', hashlib.md5(pickle.dumps(self.model)).hexdigest()[:12]
+        )
         self.feature_columns = data['feature_columns']
         self.AT_RISK_LOWER_BOUND = data.get('AT_RISK_LOWER_BOUND', 90)
         self.AT_RISK_UPPER_BOUND = data.get('AT_RISK_UPPER_BOUND', 180)
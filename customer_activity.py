@@ -0,0 +1,220 @@
+"""
+Incremental Customer Activity
+All-time per-customer running totals (orders, spend, review / delivery sums,
+purchase-gap moments, first and last purchase) of the orders before a day
+watermark, so a refresh recomputes every customer master feature at the
+latest analysis date from the orders since the watermark only
+"""
+
+import pandas as pd
+import numpy as np
+import pickle
+import os
+
+from customer_kernels import sort_and_offsets, NS_PER_DAY
+
+
+PURCHASE_COLUMN = 'order_purchase_timestamp'
+
+# Mean features -> transaction column they average (rows with a value only)
+MEAN_FEATURES = {
+    'avg_review_score': 'review_score',
+    'avg_delivery_time': 'delivery_time_days',
+    'avg_delivery_lateness': 'delivery_lateness_days',
+    'avg_approval_hours': 'approval_time_hours'
+}
+
+# Additive per-customer totals
+TOTAL_COLUMNS = (
+    ['frequency', 'monetary', 'number_of_low_reviews', 'gap_n', 'gap_sum', 'gap_sumsq']
+    + [f'{col}_sum' for col in MEAN_FEATURES.values()] + [f'{col}_n' for col in MEAN_FEATURES.values()]
+)
+INTEGER_COLUMNS = ['frequency', 'number_of_low_reviews', 'gap_n'] + [f'{col}_n' for col in MEAN_FEATURES.values()]
+
+
+class CustomerActivity:
+    def __init__(self):
+        """Initialize empty totals"""
+        self.totals = None
+        self.watermark = None
+        self.updated_at = None
+
+    @staticmethod
+    def _partial_totals(df, decode=None):
+        """Per-customer totals of consecutive transaction rows, plus first / last purchase (ns)
+
+        Gaps are day differences between a customer's consecutive rows,
+        as in customer_kernels. decode maps customer codes back to ids
+        (compact frames).
+        """
+        customer_codes, customer_ids = pd.factorize(df['customer_unique_id'], sort=True)
+        order_codes = pd.factorize(df['order_id'])[0]
+        purchase_ns = df[PURCHASE_COLUMN].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        sort_order, offsets = sort_and_offsets(customer_codes, purchase_ns, order_codes)
+        starts = offsets[:-1]
+        purchase_ns = purchase_ns[sort_order]
+        order_codes = order_codes[sort_order]
+
+        segment_start = np.zeros(len(sort_order), dtype=bool)
+        segment_start[starts] = True
+        new_order = segment_start.copy()
+        new_order[1:] |= order_codes[1:] != order_codes[:-1]
+        gaps = np.zeros(len(sort_order))
+        gaps[1:] = (purchase_ns[1:] - purchase_ns[:-1]) // NS_PER_DAY
+        gaps[segment_start] = 0.0
+
+        def column(col):
+            return df[col].to_numpy(dtype=np.float64, na_value=np.nan)[sort_order]
+
+        review = column('review_score')
+        totals = {
+            'frequency': np.add.reduceat(new_order.astype(np.int64), starts),
+            'monetary': np.add.reduceat(np.nan_to_num(column('payment_value')), starts),
+            'number_of_low_reviews': np.add.reduceat((review <= 2).astype(np.int64), starts),
+            'gap_n': np.add.reduceat((~segment_start).astype(np.int64), starts),
+            'gap_sum': np.add.reduceat(gaps, starts),
+            'gap_sumsq': np.add.reduceat(gaps ** 2, starts)
+        }
+        for col in MEAN_FEATURES.values():
+            values = review if col == 'review_score' else column(col)
+            valid = ~np.isnan(values)
+            totals[f'{col}_sum'] = np.add.reduceat(np.where(valid, values, 0.0), starts)
+            totals[f'{col}_n'] = np.add.reduceat(valid.astype(np.int64), starts)
+        totals['first_ns'] = purchase_ns[starts]
+        totals['last_ns'] = purchase_ns[offsets[1:] - 1]
+
+        customer_ids = customer_ids[customer_codes[sort_order][starts]]
+        if decode is not None:
+            customer_ids = decode(customer_ids)
+        return pd.DataFrame(totals, index=pd.Index(customer_ids, name='customer_unique_id'))
+
+    @staticmethod
+    def _combine(before, after):
+        """Totals of two periods, every purchase in after later than those in before
+
+        A customer active in both gets one more gap: from their last
+        purchase before to their first purchase after.
+        """
+        if before is None or before.empty:
+            return after
+        if after.empty:
+            return before
+        combined = before[TOTAL_COLUMNS].add(after[TOTAL_COLUMNS], fill_value=0)
+        combined = combined.astype({col: np.int64 for col in INTEGER_COLUMNS})
+
+        # Purchase times are gathered by position (an aligned fill would
+        # pass the int64 nanoseconds through float64)
+        in_before = before.index.get_indexer(combined.index)
+        in_after = after.index.get_indexer(combined.index)
+        both = (in_before >= 0) & (in_after >= 0)
+        combined['first_ns'] = np.where(
+            in_before >= 0, before['first_ns'].to_numpy()[in_before], after['first_ns'].to_numpy()[in_after]
+        )
+        combined['last_ns'] = np.where(
+            in_after >= 0, after['last_ns'].to_numpy()[in_after], before['last_ns'].to_numpy()[in_before]
+        )
+
+        boundary = (
+            after['first_ns'].to_numpy()[in_after[both]] - before['last_ns'].to_numpy()[in_before[both]]
+        ) // NS_PER_DAY
+        combined.loc[both, 'gap_n'] += 1
+        combined.loc[both, 'gap_sum'] += boundary
+        combined.loc[both, 'gap_sumsq'] += boundary.astype(np.float64) ** 2
+        return combined
+
+    def _since_watermark(self, df):
+        """Rows of df purchased on or after the watermark"""
+        if self.watermark is None:
+            return df
+        return df[df[PURCHASE_COLUMN] >= self.watermark]
+
+    def update(self, df, decode=None):
+        """Fold the orders before df's latest day into the totals
+
+        df holds prepared transaction rows (customer_unique_id, order_id,
+        order_purchase_timestamp, payment_value, review_score and the
+        delivery / approval timings) for every order purchased since the
+        watermark (the full history on the first update). The latest day
+        may still be incomplete, so it stays out of the totals and is read
+        again next time. Returns the number of customers in the totals.
+        """
+        df = self._since_watermark(df)
+        if df.empty:
+            return 0 if self.totals is None else len(self.totals)
+        watermark = df[PURCHASE_COLUMN].max().normalize()
+        settled = df[df[PURCHASE_COLUMN] < watermark]
+        if len(settled):
+            self.totals = self._combine(self.totals, self._partial_totals(settled, decode))
+        self.watermark = watermark
+        self.updated_at = pd.Timestamp.now().isoformat(timespec='seconds')
+        print(f"Customer activity updated: {len(settled)} rows folded, watermark {watermark:%Y-%m-%d}")
+        return 0 if self.totals is None else len(self.totals)
+
+    def customer_features(self, df, days=90, decode=None):
+        """Customer master features as of the day after df's latest purchase
+
+        The all-time features combine the totals with df's rows from the
+        watermark on; the last-N-days features come from df's rows in the
+        window, so df must hold every order since min(watermark, window
+        start). Matches DataPreprocessor.create_customer_master over the
+        full history (without the churn label).
+        """
+        analysis_date = df[PURCHASE_COLUMN].max() + pd.DateOffset(days=1)
+        window_start = analysis_date - pd.DateOffset(days=days)
+        recent = self._since_watermark(df)
+        totals = self._combine(self.totals, self._partial_totals(recent, decode)) if len(recent) else self.totals
+
+        features = pd.DataFrame(index=totals.index)
+        features['recency'] = (pd.Timestamp(analysis_date).value - totals['last_ns']) // NS_PER_DAY
+        features['frequency'] = totals['frequency']
+        features['monetary'] = totals['monetary']
+        for feature, col in MEAN_FEATURES.items():
+            features[feature] = totals[f'{col}_sum'] / totals[f'{col}_n'].where(totals[f'{col}_n'] > 0)
+        features['number_of_low_reviews'] = totals['number_of_low_reviews']
+        features['has_left_bad_review'] = (totals['number_of_low_reviews'] > 0).astype(int)
+        gap_n = totals['gap_n'].where(totals['gap_n'] > 0)
+        features['avg_days_between_purchases'] = totals['gap_sum'] / gap_n
+        variance = (totals['gap_sumsq'] - totals['gap_sum'] ** 2 / gap_n) / (gap_n - 1).where(gap_n > 1)
+        features['std_dev_days_between_purchases'] = np.sqrt(variance.clip(lower=0))
+
+        window = df[df[PURCHASE_COLUMN] >= window_start]
+        window_totals = window.groupby('customer_unique_id', observed=True).agg(
+            frequency_last_90_days=('order_id', 'nunique'),
+            monetary_last_90_days=('payment_value', 'sum')
+        )
+        if decode is not None:
+            window_totals.index = decode(window_totals.index.to_numpy())
+        features = features.join(window_totals.astype(np.float64)).fillna(0)
+        features['frequency_last_90_days'] = features['frequency_last_90_days'].astype(np.int64)
+        # Summed in a different order than the all-time spend; never above it
+        features['monetary_last_90_days'] = np.minimum(features['monetary_last_90_days'], features['monetary'])
+        features['freq_ratio_90d_alltime'] = features['frequency_last_90_days'] / (features['frequency'] + 1)
+        features.attrs['analysis_date'] = analysis_date
+        return features.reset_index()
+
+    def save(self, filepath='models/customer_activity.pkl'):
+        """Save the totals"""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'wb') as f:
+            pickle.dump({'totals': self.totals, 'watermark': self.watermark, 'updated_at': self.updated_at}, f)
+
+        print(f"Customer activity saved to {filepath}")
+
+    def load(self, filepath='models/customer_activity.pkl'):
+        """Load saved totals"""
+        with open(filepath, 'rb') as f:
+            data = pickle.load(f)
+
+        self.totals = data['totals']
+        self.watermark = data['watermark']
+        self.updated_at = data['updated_at']
+
+        print(f"Customer activity loaded from {filepath}")
+        return self
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Incremental Customer Activity Module")
+    print("Use this module to keep all-time customer totals for daily feature refreshes")
@@ -0,0 +1,221 @@
+"""
+Per-customer Segment Reduction Kernels
+Computes the customer master features in one pass over transaction columns
+sorted by (customer, purchase time), using CSR-style segment offsets
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+NS_PER_DAY = 86400 * 10**9
+
+FEATURE_NAMES = [
+    'recency', 'frequency', 'monetary', 'avg_review_score',
+    'avg_delivery_time', 'avg_delivery_lateness', 'avg_approval_hours',
+    'number_of_low_reviews', 'avg_days_between_purchases',
+    'std_dev_days_between_purchases', 'frequency_last_90_days', 'monetary_last_90_days'
+]
+
+
+def sort_and_offsets(customer_codes, purchase_ns, order_codes):
+    """Sort rows by (customer, purchase time, order) and return (order, offsets)
+
+    offsets[i]:offsets[i+1] is the row range of the i-th customer in the
+    sorted arrays. Rows of one order share a timestamp, so they end up
+    adjacent and distinct orders can be counted by boundaries.
+    """
+    sort_order = np.lexsort((order_codes, purchase_ns, customer_codes))
+    sorted_customers = customer_codes[sort_order]
+
+    starts = np.flatnonzero(np.r_[True, sorted_customers[1:] != sorted_customers[:-1]])
+    offsets = np.r_[starts, len(sorted_customers)].astype(np.int64)
+
+    return sort_order, offsets
+
+
+def _nan_mean(values, starts, lengths):
+    """Per-segment mean skipping NaN (NaN for all-NaN segments)"""
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan), counts
+
+
+def _reduce_numpy(offsets, purchase_ns, order_codes, payment, review, delivery,
+                  lateness, approval, analysis_ns, window_start_ns):
+    """Pure-NumPy implementation built on ufunc.reduceat"""
+    n = len(purchase_ns)
+    starts = offsets[:-1]
+    ends = offsets[1:]
+    lengths = ends - starts
+
+    segment_start = np.zeros(n, dtype=bool)
+    segment_start[starts] = True
+    new_order = segment_start.copy()
+    new_order[1:] |= order_codes[1:] != order_codes[:-1]
+    in_window = purchase_ns >= window_start_ns
+
+    # Day gaps between consecutive rows of the same customer
+    gaps = np.empty(n, dtype=np.float64)
+    gaps[0] = np.nan
+    gaps[1:] = (purchase_ns[1:] - purchase_ns[:-1]) // NS_PER_DAY
+    gaps[segment_start] = np.nan
+
+    avg_gap, gap_counts = _nan_mean(gaps, starts, lengths)
+    centered = gaps - np.repeat(avg_gap, lengths)
+    squares = np.add.reduceat(np.where(np.isnan(centered), 0.0, centered ** 2), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std_gap = np.where(gap_counts > 1, np.sqrt(squares / np.maximum(gap_counts - 1, 1)), np.nan)
+
+    return {
+        'recency': (analysis_ns - purchase_ns[ends - 1]) // NS_PER_DAY,
+        'frequency': np.add.reduceat(new_order.astype(np.int64), starts),
+        'monetary': np.add.reduceat(payment, starts),
+        'avg_review_score': _nan_mean(review, starts, lengths)[0],
+        'avg_delivery_time': _nan_mean(delivery, starts, lengths)[0],
+        'avg_delivery_lateness': _nan_mean(lateness, starts, lengths)[0],
+        'avg_approval_hours': _nan_mean(approval, starts, lengths)[0],
+        'number_of_low_reviews': np.add.reduceat((review <= 2).astype(np.int64), starts),
+        'avg_days_between_purchases': avg_gap,
+        'std_dev_days_between_purchases': std_gap,
+        'frequency_last_90_days': np.add.reduceat((new_order & in_window).astype(np.int64), starts),
+        'monetary_last_90_days': np.add.reduceat(np.where(in_window, payment, 0.0), starts)
+    }
+
+
+def _reduce_loop(offsets, purchase_ns, order_codes, payment, review, delivery,
+                 lateness, approval, analysis_ns, window_start_ns,
+                 recency, frequency, monetary, avg_review, avg_delivery, avg_lateness,
+                 avg_approval, low_reviews, avg_gap, std_gap, frequency_90d, monetary_90d):
+    """Fused single-pass loop over all segments (compiled with Numba when available)"""
+    for i in range(len(offsets) - 1):
+        start = offsets[i]
+        end = offsets[i + 1]
+
+        orders = 0
+        orders_90d = 0
+        pay_sum = 0.0
+        pay_90d = 0.0
+        low = 0
+        review_sum = 0.0
+        review_n = 0
+        delivery_sum = 0.0
+        delivery_n = 0
+        lateness_sum = 0.0
+        lateness_n = 0
+        approval_sum = 0.0
+        approval_n = 0
+        gap_sum = 0.0
+        gap_n = 0
+
+        for j in range(start, end):
+            new_order = j == start or order_codes[j] != order_codes[j - 1]
+            recent = purchase_ns[j] >= window_start_ns
+            if new_order:
+                orders += 1
+                if recent:
+                    orders_90d += 1
+            pay_sum += payment[j]
+            if recent:
+                pay_90d += payment[j]
+            if review[j] == review[j]:
+                review_sum += review[j]
+                review_n += 1
+                if review[j] <= 2:
+                    low += 1
+            if delivery[j] == delivery[j]:
+                delivery_sum += delivery[j]
+                delivery_n += 1
+            if lateness[j] == lateness[j]:
+                lateness_sum += lateness[j]
+                lateness_n += 1
+            if approval[j] == approval[j]:
+                approval_sum += approval[j]
+                approval_n += 1
+            if j > start:
+                gap_sum += (purchase_ns[j] - purchase_ns[j - 1]) // NS_PER_DAY
+                gap_n += 1
+
+        recency[i] = (analysis_ns - purchase_ns[end - 1]) // NS_PER_DAY
+        frequency[i] = orders
+        monetary[i] = pay_sum
+        low_reviews[i] = low
+        frequency_90d[i] = orders_90d
+        monetary_90d[i] = pay_90d
+        avg_review[i] = review_sum / review_n if review_n > 0 else np.nan
+        avg_delivery[i] = delivery_sum / delivery_n if delivery_n > 0 else np.nan
+        avg_lateness[i] = lateness_sum / lateness_n if lateness_n > 0 else np.nan
+        avg_approval[i] = approval_sum / approval_n if approval_n > 0 else np.nan
+
+        if gap_n > 0:
+            mean_gap = gap_sum / gap_n
+            avg_gap[i] = mean_gap
+            if gap_n > 1:
+                squares = 0.0
+                for j in range(start + 1, end):
+                    d = (purchase_ns[j] - purchase_ns[j - 1]) // NS_PER_DAY - mean_gap
+                    squares += d * d
+                std_gap[i] = np.sqrt(squares / (gap_n - 1))
+            else:
+                std_gap[i] = np.nan
+        else:
+            avg_gap[i] = np.nan
+            std_gap[i] = np.nan
+
+
+_reduce_loop_jit = njit(cache=True, nogil=True)(_reduce_loop) if njit is not None else None
+
+
+def _reduce_numba(offsets, purchase_ns, order_codes, payment, review, delivery,
+                  lateness, approval, analysis_ns, window_start_ns):
+    """Run the fused loop compiled with Numba"""
+    n_segments = len(offsets) - 1
+    out = {name: np.empty(n_segments, dtype=np.float64) for name in FEATURE_NAMES}
+    for name in ['recency', 'frequency', 'number_of_low_reviews', 'frequency_last_90_days']:
+        out[name] = np.empty(n_segments, dtype=np.int64)
+
+    _reduce_loop_jit(
+        offsets, purchase_ns, order_codes, payment, review, delivery,
+        lateness, approval, analysis_ns, window_start_ns,
+        *[out[name] for name in FEATURE_NAMES]
+    )
+    return out
+
+
+def customer_segment_reductions(offsets, purchase_ns, order_codes, payment, review,
+                                delivery, lateness, approval, analysis_ns, window_start_ns,
+                                use_numba=True):
+    """Compute all customer master reductions over sorted segments
+
+    All column arrays must already be in (customer, purchase time, order)
+    order; missing values are NaN and are skipped like pandas' mean().
+    Returns a dict of per-customer arrays keyed by feature name.
+    """
+    args = (
+        np.ascontiguousarray(offsets, dtype=np.int64),
+        np.ascontiguousarray(purchase_ns, dtype=np.int64),
+        np.ascontiguousarray(order_codes, dtype=np.int64),
+        np.nan_to_num(np.asarray(payment, dtype=np.float64), nan=0.0),
+        np.ascontiguousarray(review, dtype=np.float64),
+        np.ascontiguousarray(delivery, dtype=np.float64),
+        np.ascontiguousarray(lateness, dtype=np.float64),
+        np.ascontiguousarray(approval, dtype=np.float64),
+        np.int64(analysis_ns),
+        np.int64(window_start_ns)
+    )
+
+    if use_numba and _reduce_loop_jit is not None:
+        return _reduce_numba(*args)
+    return _reduce_numpy(*args)
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Customer Segment Reduction Kernels")
+    print(f"Numba available: {njit is not None}")
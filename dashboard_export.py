@@ -0,0 +1,208 @@
+"""
+Dashboard Summary Export
+Writes pre-aggregated, columnar JSON tables (plus compressed variants) and a
+content-hashed manifest so the website never has to download row-level data
+"""
+
+import pandas as pd
+import numpy as np
+import hashlib
+import gzip
+import json
+import os
+from atomic_io import atomic_write_bytes, atomic_write_json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+
+TOP_N_PER_GROUP = 20
+HISTOGRAM_BINS = 20
+
+CUSTOMER_TOP_COLUMNS = [
+    'customer_unique_id', 'segment_name', 'churn_risk_level',
+    'churn_probability', 'monetary', 'frequency', 'recency'
+]
+PRODUCT_TOP_COLUMNS = [
+    'product_category_name', 'return_risk_level', 'return_probability',
+    'price', 'freight_value', 'product_weight_g', 'predicted_return'
+]
+
+
+def _top_per_group(df, group_columns, sort_column, columns, top_n=TOP_N_PER_GROUP):
+    """Keep the top N rows of every group
+
+    Any filter that selects whole groups can still show its exact top N
+    from this subset.
+    """
+    columns = [c for c in columns if c in df.columns]
+    ranked = df.sort_values(sort_column, ascending=False)
+    return ranked.groupby(group_columns, observed=True).head(top_n)[columns].reset_index(drop=True)
+
+
+def _histogram(values, bins=HISTOGRAM_BINS):
+    """Fixed-width histogram of probabilities over [0, 1]"""
+    counts, edges = np.histogram(values.dropna().astype(float), bins=bins, range=(0.0, 1.0))
+    return pd.DataFrame({
+        'bin_start': edges[:-1].round(4),
+        'bin_end': edges[1:].round(4),
+        'count': counts
+    })
+
+
+def build_customer_summaries(customer_summary, top_n=TOP_N_PER_GROUP, precomputed=None):
+    """Aggregate the customer analysis to segment x risk tables
+
+    Tables in precomputed (e.g. answered from sketches) are used as they
+    are instead of being computed.
+    """
+    precomputed = precomputed or {}
+    df = customer_summary.copy()
+    df['segment_name'] = df['segment_name'].fillna('Unknown')
+    df['churn_risk_level'] = df['churn_risk_level'].astype(object).fillna('Unknown')
+
+    def segment_risk():
+        return df.groupby(['segment_name', 'churn_risk_level'], observed=True).agg(
+            count=('customer_unique_id', 'size'),
+            total_monetary=('monetary', 'sum'),
+            avg_churn_probability=('churn_probability', 'mean')
+        ).reset_index()
+
+    builders = {
+        'customer_segment_risk': segment_risk,
+        'customer_churn_histogram': lambda: _histogram(df['churn_probability']),
+        'customer_top': lambda: _top_per_group(
+            df, ['segment_name', 'churn_risk_level'], 'churn_probability',
+            CUSTOMER_TOP_COLUMNS, top_n
+        )
+    }
+    return {name: precomputed[name] if name in precomputed else build() for name, build in builders.items()}
+
+
+def build_product_summaries(product_summary, top_n=TOP_N_PER_GROUP, precomputed=None):
+    """Aggregate the product analysis to category x risk tables
+
+    Tables in precomputed (e.g. answered from sketches) are used as they
+    are instead of being computed.
+    """
+    precomputed = precomputed or {}
+    df = product_summary.copy()
+    df['product_category_name'] = df['product_category_name'].fillna('Unknown')
+    df['return_risk_level'] = df['return_risk_level'].astype(object).fillna('Unknown')
+
+    def category_risk():
+        return df.groupby(['product_category_name', 'return_risk_level'], observed=True).agg(
+            count=('return_probability', 'size')
+        ).reset_index()
+
+    def category_rollup():
+        rollup = df.groupby('product_category_name').agg(
+            Avg_Return_Probability=('return_probability', 'mean'),
+            Total_Returns=('predicted_return', 'sum'),
+            Avg_Price=('price', 'mean'),
+            Products=('return_probability', 'size')
+        ).reset_index().rename(columns={'product_category_name': 'Category'})
+        return rollup.sort_values('Avg_Return_Probability', ascending=False)
+
+    builders = {
+        'product_category_risk': category_risk,
+        'product_category_rollup': category_rollup,
+        'product_return_histogram': lambda: _histogram(df['return_probability']),
+        'product_top': lambda: _top_per_group(
+            df, ['product_category_name', 'return_risk_level'], 'return_probability',
+            PRODUCT_TOP_COLUMNS, top_n
+        )
+    }
+    return {name: precomputed[name] if name in precomputed else build() for name, build in builders.items()}
+
+
+def to_columnar(df):
+    """Convert a DataFrame to a compact column-oriented dict"""
+    data = {}
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_float_dtype(values):
+            values = values.round(6)
+        data[col] = [None if pd.isna(v) else v for v in values.tolist()]
+
+    return {'columns': list(df.columns), 'length': len(df), 'data': data}
+
+
+def write_columnar_table(df, folder, name):
+    """Write one table as JSON (+ gzip/brotli/Arrow variants) and return its manifest entry"""
+    payload = json.dumps(to_columnar(df), separators=(',', ':'), default=str).encode('utf-8')
+
+    entry = {
+        'rows': len(df),
+        'hash': hashlib.sha256(payload).hexdigest()[:16],
+        'files': {}
+    }
+
+    variants = {
+        'json': payload,
+        'gzip': gzip.compress(payload, compresslevel=9, mtime=0)
+    }
+    if brotli is not None:
+        variants['brotli'] = brotli.compress(payload)
+
+    extensions = {'json': '.json', 'gzip': '.json.gz', 'brotli': '.json.br'}
+    for kind, content in variants.items():
+        filename = f'{name}{extensions[kind]}'
+        atomic_write_bytes(os.path.join(folder, filename), content)
+        entry['files'][kind] = {'path': filename, 'bytes': len(content)}
+
+    if pa is not None:
+        filename = f'{name}.arrow'
+        sink = pa.BufferOutputStream()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        content = sink.getvalue().to_pybytes()
+        atomic_write_bytes(os.path.join(folder, filename), content)
+        entry['files']['arrow'] = {'path': filename, 'bytes': len(content)}
+
+    return entry
+
+
+def export_dashboard_summaries(customer_summary, product_summary, output_folder='website/PowerBI_Data',
+                               precomputed=None):
+    """Write all dashboard summary tables and their manifest
+
+    Tables in precomputed (by name, e.g. answered from sketches) are
+    written instead of exact ones.
+    """
+    summary_folder = os.path.join(output_folder, 'summary')
+    os.makedirs(summary_folder, exist_ok=True)
+
+    tables = {}
+    tables.update(build_customer_summaries(customer_summary, precomputed=precomputed))
+    tables.update(build_product_summaries(product_summary, precomputed=precomputed))
+
+    manifest = {
+        'generated_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'tables': {}
+    }
+    for name, df in tables.items():
+        manifest['tables'][name] = write_columnar_table(df, summary_folder, name)
+
+    # Manifest last, so it only ever points at fully written tables
+    atomic_write_json(manifest, os.path.join(summary_folder, 'manifest.json'), indent=2)
+
+    total_bytes = sum(t['files']['gzip']['bytes'] for t in manifest['tables'].values())
+    print(f"  ✓ Dashboard summaries saved to {summary_folder}/ ({total_bytes / 1024:.1f} KB gzipped)")
+
+    return manifest
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Dashboard Summary Export Module")
+    print("Use this module to write compact dashboard summary tables")
@@ -0,0 +1,370 @@
+"""
+Local Data Service for the BI Dashboard website
+Serves prediction outputs through paginated, sorted and filtered JSON endpoints
+and the static website files from the same origin
+"""
+
+import pandas as pd
+import numpy as np
+from collections import OrderedDict
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import json
+import os
+import threading
+import time
+
+from regional_cube import RegionalCube, GROUP_COLUMNS
+
+
+class LRUCache:
+    def __init__(self, max_entries=256):
+        """Initialize a thread-safe LRU cache"""
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a cached value (or None) and mark it as recently used"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+class ColumnarTable:
+    def __init__(self, df, filter_columns, range_columns, sort_columns, cache_size=256):
+        """Build in-memory columnar indexes over a prediction table
+
+        - filter_columns: equality filters, indexed as value -> sorted row ids
+        - range_columns: numeric range filters, indexed by a sorted order
+        - sort_columns: precomputed row orders for sorting
+        """
+        self.df = df.reset_index(drop=True)
+        self.n_rows = len(self.df)
+        self.cache = LRUCache(cache_size)
+
+        self.value_index = {}
+        for col in filter_columns:
+            codes, uniques = pd.factorize(self.df[col].astype(str), sort=True)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.value_index[col] = {
+                value: order[bounds[i]:bounds[i + 1]]
+                for i, value in enumerate(uniques)
+            }
+
+        self.range_index = {}
+        for col in range_columns:
+            values = pd.to_numeric(self.df[col], errors='coerce').to_numpy(dtype=np.float64)
+            order = np.argsort(values, kind='stable')
+            self.range_index[col] = (values[order], order)
+
+        # Precomputed row orders per sort column (missing values last in
+        # both directions), so a query only gathers its mask in that order
+        self.sort_order = {}
+        for col in sort_columns:
+            values = pd.to_numeric(self.df[col], errors='coerce').to_numpy(dtype=np.float64)
+            self.sort_order[col] = {
+                False: np.argsort(values, kind='stable'),
+                True: np.argsort(-values, kind='stable')
+            }
+
+    def _matching_rows(self, filters, ranges):
+        """Intersect index lookups into a boolean row mask (None = all rows)"""
+        mask = None
+
+        for col, value in filters.items():
+            rows = self.value_index[col].get(value)
+            if rows is None:
+                return np.zeros(self.n_rows, dtype=bool)
+            selected = np.zeros(self.n_rows, dtype=bool)
+            selected[rows] = True
+            mask = selected if mask is None else mask & selected
+
+        for col, (low, high) in ranges.items():
+            sorted_values, order = self.range_index[col]
+            start = 0 if low is None else np.searchsorted(sorted_values, low, side='left')
+            stop = len(sorted_values) if high is None else np.searchsorted(sorted_values, high, side='right')
+            selected = np.zeros(self.n_rows, dtype=bool)
+            selected[order[start:stop]] = True
+            mask = selected if mask is None else mask & selected
+
+        return mask
+
+    def query(self, filters=None, ranges=None, sort=None, descending=True, page=1, page_size=20):
+        """Return one page of rows matching the filters"""
+        filters = {k: v for k, v in (filters or {}).items() if k in self.value_index}
+        ranges = {k: v for k, v in (ranges or {}).items() if k in self.range_index}
+        sort = sort if sort in self.sort_order else None
+        page = max(int(page), 1)
+        page_size = min(max(int(page_size), 1), 500)
+
+        key = (
+            tuple(sorted(filters.items())), tuple(sorted(ranges.items())),
+            sort, descending, page, page_size
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        mask = self._matching_rows(filters, ranges)
+        if sort is not None:
+            row_ids = self.sort_order[sort][descending]
+            if mask is not None:
+                row_ids = row_ids[mask[row_ids]]
+        else:
+            row_ids = np.arange(self.n_rows) if mask is None else np.flatnonzero(mask)
+
+        start = (page - 1) * page_size
+        page_rows = self.df.iloc[row_ids[start:start + page_size]]
+
+        result = {
+            'total': int(len(row_ids)),
+            'page': page,
+            'page_size': page_size,
+            'rows': json.loads(page_rows.to_json(orient='records'))
+        }
+        self.cache.put(key, result)
+        return result
+
+    def distinct(self, col):
+        """Distinct values of an indexed filter column"""
+        return sorted(self.value_index[col].keys())
+
+
+class PredictionDataService:
+    def __init__(self, data_folder='website/PowerBI_Data', cube_path='models/regional_cube.pkl',
+                 check_interval=1.0):
+        """Initialize the service over the dashboard prediction exports
+
+        Requests reload the exports and the cube when any of their files
+        changed on disk, checked at most every check_interval seconds.
+        """
+        self.data_folder = data_folder
+        self.cube_path = cube_path
+        self.check_interval = check_interval
+        self.customers = None
+        self.products = None
+        self.regions = None
+        self.region_cache = LRUCache()
+        self.versions = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+
+    def _source_files(self):
+        """Files the service is built from"""
+        return [
+            os.path.join(self.data_folder, 'Customer_Analysis.csv'),
+            os.path.join(self.data_folder, 'Product_Analysis.csv'),
+            self.cube_path
+        ]
+
+    def _source_versions(self):
+        """(mtime_ns, size) of every source file (None when missing)"""
+        versions = {}
+        for filepath in self._source_files():
+            try:
+                stat = os.stat(filepath)
+                versions[filepath] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                versions[filepath] = None
+        return versions
+
+    def load(self):
+        """Load prediction exports and build their indexes
+
+        The new tables replace the old ones only once all are built, so
+        requests keep being answered during a reload; cached results of the
+        old tables are dropped.
+        """
+        print("Loading prediction data...")
+        versions = self._source_versions()
+        customer_path, product_path, _ = self._source_files()
+
+        customers = ColumnarTable(
+            pd.read_csv(customer_path),
+            filter_columns=['segment_name', 'churn_risk_level'],
+            range_columns=['churn_probability'],
+            sort_columns=['churn_probability', 'monetary', 'frequency', 'recency']
+        )
+
+        products = ColumnarTable(
+            pd.read_csv(product_path),
+            filter_columns=['product_category_name', 'return_risk_level'],
+            range_columns=['return_probability'],
+            sort_columns=['return_probability', 'price', 'freight_value', 'product_weight_g']
+        )
+
+        regions = RegionalCube().load(self.cube_path) if os.path.exists(self.cube_path) else None
+
+        previous = [table for table in (self.customers, self.products) if table is not None]
+        self.customers, self.products, self.regions = customers, products, regions
+        self.versions = versions
+        for table in previous:
+            table.cache.clear()
+        self.region_cache.clear()
+
+        print(f"Indexed {self.customers.n_rows} customers and {self.products.n_rows} products")
+        return self
+
+    def refresh(self):
+        """Reload if a source file changed since the last load
+
+        Only one request reloads; the others keep using the loaded data.
+        A failed reload (e.g. a file caught mid-write) keeps the old data
+        and is retried on the next check. Returns True after a reload.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval or not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._checked_at = now
+            if self._source_versions() == self.versions:
+                return False
+            self.load()
+            return True
+        except Exception as e:
+            print(f"  ⚠ Reload failed, serving the previous data: {e}")
+            return False
+        finally:
+            self._reload_lock.release()
+
+    def query_customers(self, params):
+        """Query customers from URL parameters"""
+        self.refresh()
+        return self.customers.query(
+            filters=_present({
+                'segment_name': params.get('segment'),
+                'churn_risk_level': params.get('risk')
+            }),
+            ranges=_probability_range(params, 'churn_probability'),
+            sort=params.get('sort', 'churn_probability'),
+            descending=params.get('order', 'desc') != 'asc',
+            page=params.get('page', 1),
+            page_size=params.get('page_size', 20)
+        )
+
+    def query_products(self, params):
+        """Query products from URL parameters"""
+        self.refresh()
+        return self.products.query(
+            filters=_present({
+                'product_category_name': params.get('category'),
+                'return_risk_level': params.get('risk')
+            }),
+            ranges=_probability_range(params, 'return_probability'),
+            sort=params.get('sort', 'return_probability'),
+            descending=params.get('order', 'desc') != 'asc',
+            page=params.get('page', 1),
+            page_size=params.get('page_size', 20)
+        )
+
+    def query_regions(self, params):
+        """Aggregate the regional cube from URL parameters
+        
+        group_by is a comma-separated list of cube dimensions; any cube
+        dimension can also be a filter, and from / to bound the month.
+        """
+        self.refresh()
+        regions = self.regions
+        if regions is None:
+            raise ValueError("No regional cube found; run train_models.py first")
+        group_by = tuple(c for c in params.get('group_by', 'customer_state').split(',') if c)
+        filters = _present({col: params.get(col) for col in GROUP_COLUMNS})
+        months = (params.get('from') or None, params.get('to') or None)
+        
+        key = (group_by, tuple(sorted(filters.items())), months)
+        cached = self.region_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        result = regions.query(group_by, filters, months)
+        response = {'total': len(result), 'rows': json.loads(result.to_json(orient='records'))}
+        # Not cached if a reload replaced the cube meanwhile
+        if regions is self.regions:
+            self.region_cache.put(key, response)
+        return response
+
+
+def _present(filters):
+    """Drop filters that are unset or 'all'"""
+    return {k: v for k, v in filters.items() if v not in (None, '', 'all')}
+
+
+def _probability_range(params, col):
+    """Parse min_prob / max_prob into a range filter"""
+    low = params.get('min_prob')
+    high = params.get('max_prob')
+    if low in (None, '') and high in (None, ''):
+        return {}
+    return {col: (
+        float(low) if low not in (None, '') else None,
+        float(high) if high not in (None, '') else None
+    )}
+
+
+class DashboardRequestHandler(SimpleHTTPRequestHandler):
+    """Serve /api/* from the data service and everything else from website/"""
+
+    service = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        routes = {
+            '/api/customers': self.service.query_customers,
+            '/api/products': self.service.query_products,
+            '/api/regions': self.service.query_regions
+        }
+
+        if parsed.path not in routes:
+            return super().do_GET()
+
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        try:
+            body = json.dumps(routes[parsed.path](params)).encode('utf-8')
+            status = 200
+        except (ValueError, KeyError) as e:
+            body = json.dumps({'error': str(e)}).encode('utf-8')
+            status = 400
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run_server(host='127.0.0.1', port=8000, website_folder='website'):
+    """Start the dashboard data service"""
+    service = PredictionDataService(os.path.join(website_folder, 'PowerBI_Data')).load()
+    DashboardRequestHandler.service = service
+
+    handler = partial(DashboardRequestHandler, directory=website_folder)
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Dashboard running at http://{host}:{port}/ (API under /api/)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    run_server()
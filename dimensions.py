@@ -0,0 +1,153 @@
+"""
+Seller, Geography and Category Dimensions
+Pre-built integer-keyed lookup indexes over the small dimension tables, so
+transaction rows are enriched with array takes instead of string merges
+"""
+
+import pandas as pd
+import numpy as np
+import os
+
+
+# Brazilian state -> macro-region (IBGE)
+STATE_REGIONS = {
+    'AC': 'North', 'AM': 'North', 'AP': 'North', 'PA': 'North', 'RO': 'North', 'RR': 'North', 'TO': 'North',
+    'AL': 'Northeast', 'BA': 'Northeast', 'CE': 'Northeast', 'MA': 'Northeast', 'PB': 'Northeast',
+    'PE': 'Northeast', 'PI': 'Northeast', 'RN': 'Northeast', 'SE': 'Northeast',
+    'DF': 'Central-West', 'GO': 'Central-West', 'MS': 'Central-West', 'MT': 'Central-West',
+    'ES': 'Southeast', 'MG': 'Southeast', 'RJ': 'Southeast', 'SP': 'Southeast',
+    'PR': 'South', 'RS': 'South', 'SC': 'South'
+}
+
+MISSING_LABEL = 'Unknown'
+
+
+class DimensionLookup:
+    def __init__(self, keys, attributes):
+        """Index a dimension table by its key
+
+        Every attribute is stored as int codes into its own categories, with
+        one extra trailing row for keys that are missing from the dimension.
+        rows() maps keys to dimension rows once per distinct key; take()
+        then gathers attributes for any number of fact rows by position.
+        """
+        self.index = pd.Index(np.asarray(keys, dtype=object))
+        if not self.index.is_unique:
+            self.index = self.index.drop_duplicates()
+            attributes = attributes.loc[~pd.Index(np.asarray(keys, dtype=object)).duplicated()]
+        self.missing_row = len(self.index)
+
+        self.codes = {}
+        self.categories = {}
+        for col in attributes.columns:
+            codes, categories = pd.factorize(attributes[col].astype(object).fillna(MISSING_LABEL))
+            if MISSING_LABEL not in categories:
+                categories = categories.append(pd.Index([MISSING_LABEL]))
+            self.categories[col] = categories
+            self.codes[col] = np.append(codes, categories.get_loc(MISSING_LABEL)).astype(np.int32)
+
+    def rows(self, keys, dictionary=None):
+        """Dimension row of every fact key (missing_row if unknown)
+
+        keys may be strings, a categorical, or int codes into dictionary
+        (compact mode); in every case only the distinct keys are hashed.
+        """
+        if dictionary is not None:
+            codes = np.asarray(keys, dtype=np.int64)
+            uniques = np.char.decode(np.asarray(dictionary), 'utf-8').astype(object)
+        elif isinstance(getattr(keys, 'dtype', None), pd.CategoricalDtype):
+            codes = np.asarray(keys.cat.codes, dtype=np.int64)
+            uniques = np.asarray(keys.cat.categories, dtype=object)
+        else:
+            codes, uniques = pd.factorize(pd.Series(keys).astype(object))
+            uniques = np.asarray(uniques, dtype=object)
+
+        unique_rows = self.index.get_indexer(uniques)
+        unique_rows = np.append(np.where(unique_rows < 0, self.missing_row, unique_rows), self.missing_row)
+        return unique_rows[np.where(codes < 0, len(uniques), codes)]
+
+    def take(self, rows, col):
+        """Attribute values for dimension rows, as a categorical"""
+        return pd.Categorical.from_codes(self.codes[col].take(rows), self.categories[col])
+
+
+class Dimensions:
+    def __init__(self, data_path=''):
+        """Initialize the seller, geography and category dimensions"""
+        self.data_path = data_path
+        self.sellers = None
+        self.states = None
+        self.categories = None
+
+    def load(self):
+        """Read the dimension CSVs and build their lookup indexes
+
+        Missing files leave that dimension empty, so every key maps to
+        'Unknown' (categories keep their Portuguese name).
+        """
+        states = pd.Series(STATE_REGIONS)
+        self.states = DimensionLookup(states.index, pd.DataFrame({'region': states.to_numpy()}))
+
+        sellers_path = f'{self.data_path}olist_sellers_dataset.csv'
+        if os.path.exists(sellers_path):
+            sellers = pd.read_csv(sellers_path, dtype={'seller_zip_code_prefix': str})
+        else:
+            print(f"  ⚠ {sellers_path} not found; seller attributes will be 'Unknown'")
+            sellers = pd.DataFrame(columns=['seller_id', 'seller_zip_code_prefix', 'seller_city', 'seller_state'])
+        sellers['seller_region'] = sellers['seller_state'].map(STATE_REGIONS)
+        self.sellers = DimensionLookup(
+            sellers['seller_id'],
+            sellers[['seller_zip_code_prefix', 'seller_city', 'seller_state', 'seller_region']]
+        )
+
+        translation_path = f'{self.data_path}product_category_name_translation.csv'
+        if os.path.exists(translation_path):
+            translation = pd.read_csv(translation_path, encoding='utf-8-sig')
+        else:
+            translation = pd.DataFrame(columns=['product_category_name', 'product_category_name_english'])
+        self.categories = DimensionLookup(
+            translation['product_category_name'], translation[['product_category_name_english']]
+        )
+
+        print(f"Dimensions loaded: {self.sellers.missing_row} sellers, "
+              f"{self.categories.missing_row} category translations")
+        return self
+
+    def translate_categories(self, categories):
+        """English category names (the original name where there is no translation)"""
+        categories = pd.Series(categories)
+        if isinstance(categories.dtype, pd.CategoricalDtype):
+            codes, uniques = categories.cat.codes.to_numpy(), categories.cat.categories
+        else:
+            codes, uniques = pd.factorize(categories.astype(object))
+        uniques = np.asarray(uniques, dtype=object)
+
+        english = np.asarray(
+            self.categories.take(self.categories.rows(uniques), 'product_category_name_english'), dtype=object
+        )
+        english = np.where(english == MISSING_LABEL, uniques, english)
+        english = np.append(english, np.nan)
+        return pd.Series(english[np.where(codes < 0, len(uniques), codes)], index=categories.index)
+
+    def enrich(self, df, id_dictionary=None):
+        """Add seller, region and English category columns to a transaction frame in place"""
+        seller_dictionary = (id_dictionary or {}).get('seller_id')
+        if 'seller_id' in df.columns:
+            seller_rows = self.sellers.rows(df['seller_id'], seller_dictionary)
+            for col in ['seller_city', 'seller_state', 'seller_region']:
+                df[col] = self.sellers.take(seller_rows, col)
+
+        if 'customer_state' in df.columns:
+            df['customer_region'] = self.states.take(self.states.rows(df['customer_state']), 'region')
+
+        if 'product_category_name' in df.columns:
+            df['product_category_name_english'] = pd.Categorical(
+                self.translate_categories(df['product_category_name']).to_numpy()
+            )
+        return df
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Seller, Geography and Category Dimensions Module")
+    print("Use this module to enrich transactions with dimension attributes")
@@ -0,0 +1,192 @@
+"""
+Data and Model Drift Monitoring
+Stores compact training-time histograms of model inputs and scores inside
+the model artifact, accumulates the same histograms while scoring and reports
+PSI / KS per feature and for the score distribution
+"""
+
+import pandas as pd
+import numpy as np
+import json
+import os
+import time
+
+
+SCORE_COLUMN = '__score__'
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+
+class DriftMonitor:
+    def __init__(self, numeric_bins=10, score_bins=20, max_categories=30):
+        """Initialize an unfitted monitor
+
+        Numeric features are binned on training deciles, categorical
+        features on their most frequent training values (+ 'other'), and
+        scores on fixed-width bins over [0, 1]. Every histogram has an
+        extra bucket for missing values.
+        """
+        self.numeric_bins = numeric_bins
+        self.score_bins = score_bins
+        self.max_categories = max_categories
+        self.numeric_edges = {}
+        self.categories = {}
+        self.reference = {}
+        self.current = {}
+        self.rows_seen = 0
+
+    def _bin(self, col, values):
+        """Histogram of one column over its training bins (missing last)"""
+        if col in self.categories:
+            categories = self.categories[col]
+            codes = pd.Categorical(np.asarray(values, dtype=object), categories=categories).codes.astype(np.int64)
+            missing = pd.isna(values)
+            codes[codes < 0] = len(categories)
+            codes[np.asarray(missing)] = len(categories) + 1
+            return np.bincount(codes, minlength=len(categories) + 2)
+
+        edges = self.numeric_edges[col]
+        values = np.asarray(values, dtype=np.float64)
+        index = np.searchsorted(edges, values, side='right')
+        index[np.isnan(values)] = len(edges) + 1
+        return np.bincount(index, minlength=len(edges) + 2)
+
+    def fit(self, X, scores, numeric_columns, categorical_columns=()):
+        """Record the training histograms
+
+        scores should be predictions on rows the model was not fitted on
+        (e.g. the test split), so they look like scoring-time scores;
+        they need not be the rows of X.
+        """
+        self.numeric_edges = {}
+        self.categories = {}
+
+        for col in numeric_columns:
+            values = pd.to_numeric(X[col], errors='coerce').to_numpy(dtype=np.float64)
+            quantiles = np.nanquantile(values, np.linspace(0, 1, self.numeric_bins + 1)[1:-1])
+            self.numeric_edges[col] = np.unique(quantiles)
+
+        for col in categorical_columns:
+            counts = X[col].astype(object).value_counts()
+            self.categories[col] = list(counts.index[:self.max_categories])
+
+        self.numeric_edges[SCORE_COLUMN] = np.linspace(0, 1, self.score_bins + 1)[1:-1]
+
+        self.reference = {col: self._bin(col, X[col].to_numpy()) for col in self.feature_columns}
+        self.reference[SCORE_COLUMN] = self._bin(SCORE_COLUMN, scores)
+        self.reset()
+        return self
+
+    @property
+    def feature_columns(self):
+        """Monitored input columns"""
+        return [c for c in list(self.numeric_edges) + list(self.categories) if c != SCORE_COLUMN]
+
+    def reset(self):
+        """Clear the scoring-time histograms"""
+        self.current = {col: np.zeros_like(counts) for col, counts in self.reference.items()}
+        self.rows_seen = 0
+
+    def update(self, X, scores):
+        """Add one scored batch to the scoring-time histograms"""
+        for col in self.feature_columns:
+            if col in X.columns:
+                self.current[col] += self._bin(col, X[col].to_numpy())
+        self.current[SCORE_COLUMN] += self._bin(SCORE_COLUMN, scores)
+        self.rows_seen += len(scores)
+
+    @staticmethod
+    def _psi_ks(expected, actual, eps=1e-4):
+        """PSI and binned KS statistic between two histograms"""
+        p = expected / max(expected.sum(), 1)
+        q = actual / max(actual.sum(), 1)
+        p_smooth = np.clip(p, eps, None)
+        q_smooth = np.clip(q, eps, None)
+        psi = float(np.sum((q_smooth - p_smooth) * np.log(q_smooth / p_smooth)))
+        ks = float(np.max(np.abs(np.cumsum(q) - np.cumsum(p))))
+        return psi, ks
+
+    def metrics(self):
+        """Per-feature and score drift as a list of metric records"""
+        records = []
+        for col, expected in self.reference.items():
+            actual = self.current[col]
+            psi, ks = self._psi_ks(expected, actual) if actual.sum() else (np.nan, np.nan)
+            status = (
+                'no_data' if np.isnan(psi) else
+                'significant' if psi >= PSI_SIGNIFICANT else
+                'moderate' if psi >= PSI_MODERATE else 'stable'
+            )
+            records.append({
+                'feature': 'score' if col == SCORE_COLUMN else col,
+                'kind': 'score' if col == SCORE_COLUMN else 'feature',
+                'psi': None if np.isnan(psi) else round(psi, 6),
+                'ks': None if np.isnan(ks) else round(ks, 6),
+                'missing_rate': float(actual[-1] / actual.sum()) if actual.sum() else None,
+                'status': status
+            })
+        return records
+
+    def emit(self, filepath, model_name, model_version=None):
+        """Append this batch's metrics as one JSON line and return the record"""
+        record = {
+            'timestamp': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'model': model_name,
+            'model_version': model_version,
+            'rows': int(self.rows_seen),
+            'metrics': self.metrics()
+        }
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+        drifted = [m['feature'] for m in record['metrics'] if m['status'] == 'significant']
+        if drifted:
+            print(f"  ⚠ Drift detected in {model_name}: {', '.join(drifted)}")
+        return record
+
+
+def benchmark_monitoring_overhead(model, X, repeats=5):
+    """Time model.predict against the drift monitor update it adds
+
+    The monitor update is timed on its own (best of N) because the
+    difference of two predict timings is dominated by run-to-run noise.
+    Returns the timings and the monitoring overhead in percent.
+    """
+    monitor = model.drift_monitor
+    predict_seconds = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, scores = model.predict(X, monitor=False)
+        predict_seconds = min(predict_seconds, time.perf_counter() - start)
+
+    monitored_input = model.imputer.transform(X) if getattr(model, 'imputer', None) is not None else X
+    update_seconds = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        monitor.update(monitored_input, scores)
+        update_seconds = min(update_seconds, time.perf_counter() - start)
+    monitor.reset()
+
+    overhead = update_seconds / predict_seconds * 100
+    print(f"  {type(model).__name__}: {len(X)} rows, predict {predict_seconds * 1000:.1f} ms, "
+          f"monitor update {update_seconds * 1000:.1f} ms ({overhead:.1f}% overhead)")
+    return {'rows': len(X), 'predict_seconds': predict_seconds,
+            'monitor_seconds': update_seconds, 'overhead_percent': overhead}
+
+
+if __name__ == "__main__":
+    # Benchmark monitoring overhead against the trained models
+    from churn_model import ChurnPredictor
+    from return_model import ReturnPredictor
+
+    print("=== Drift Monitoring Overhead ===")
+    churn_model = ChurnPredictor()
+    churn_model.load_model('models/churn_model.pkl')
+    customers = pd.read_csv('Predictions_Customer.csv')
+    benchmark_monitoring_overhead(churn_model, pd.concat([customers] * 1000, ignore_index=True))
+
+    return_model = ReturnPredictor()
+    return_model.load_model('models/return_model.pkl')
+    products = pd.read_csv('Predictions_Product.csv')
+    benchmark_monitoring_overhead(return_model, pd.concat([products] * 1000, ignore_index=True))
@@ -0,0 +1,309 @@
+"""
+Out-of-core Data Preprocessing using DuckDB
+Expresses load / clean / feature engineering / customer master as lazy SQL
+views over the Olist CSVs, executed multi-threaded with spill-to-disk
+"""
+
+import pandas as pd
+import os
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from preprocessing import DataPreprocessor, DATE_COLUMNS
+from imputation import MEDIAN_COLUMNS
+
+RETURN_FEATURE_COLUMNS = [
+    'review_score', 'price', 'freight_value', 'product_category_name',
+    'product_name_lenght', 'product_description_lenght', 'product_photos_qty',
+    'product_weight_g', 'product_length_cm', 'product_height_cm', 'product_width_cm'
+]
+
+
+class DuckDBPreprocessor(DataPreprocessor):
+    def __init__(self, data_path='', threads=None, memory_limit=None, temp_directory=None,
+                 database=None, materialize_transactions=False):
+        """Initialize the DuckDB preprocessor
+
+        threads / memory_limit (e.g. '4GB') / temp_directory control DuckDB's
+        parallelism and where it spills when a query exceeds the memory limit.
+        Staged tables live in `database`; by default a file inside
+        temp_directory (so they can be evicted too), else in memory.
+        The transaction-level frame is only pulled into pandas when
+        materialize_transactions=True; every other output is aggregated or
+        filtered inside DuckDB first.
+        """
+        if duckdb is None:
+            raise ImportError("DuckDBPreprocessor requires the 'duckdb' package (pip install duckdb)")
+
+        super().__init__(data_path=data_path)
+        self.materialize_transactions = materialize_transactions
+
+        if temp_directory:
+            os.makedirs(temp_directory, exist_ok=True)
+        if database is None:
+            database = os.path.join(temp_directory, 'preprocessing.duckdb') if temp_directory else ':memory:'
+        self.database = database
+        self.con = duckdb.connect(database)
+
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self.con.execute(f"SET memory_limit = '{memory_limit}'")
+        if temp_directory:
+            self.con.execute(f"SET temp_directory = '{temp_directory}'")
+        self.con.execute("SET preserve_insertion_order = false")
+
+    def _csv(self, name):
+        """SQL table function reading one Olist CSV"""
+        filepath = f'{self.data_path}olist_{name}_dataset.csv'.replace("'", "''")
+        return f"read_csv_auto('{filepath}', header = true)"
+
+    def load_data(self):
+        """Read and join the CSVs into a DuckDB table"""
+        print("Loading CSV files into DuckDB...")
+
+        # Stage every CSV as its own table first: joining straight from the
+        # CSV readers keeps all hash-join build sides pinned in memory at once
+        tables = ['customers', 'orders', 'order_items', 'order_payments', 'order_reviews', 'products']
+        for name in tables:
+            self.con.execute(f"CREATE OR REPLACE TABLE raw_{name} AS SELECT * FROM {self._csv(name)}")
+        self.con.execute("CHECKPOINT")
+
+        self.con.execute("""
+            CREATE OR REPLACE TABLE raw_transactions AS
+            SELECT *
+            FROM raw_orders
+            JOIN raw_customers USING (customer_id)
+            JOIN raw_order_payments USING (order_id)
+            JOIN (SELECT * EXCLUDE (review_comment_title, review_comment_message) FROM raw_order_reviews)
+                USING (order_id)
+            JOIN raw_order_items USING (order_id)
+            JOIN raw_products USING (product_id)
+        """)
+
+        for name in tables:
+            self.con.execute(f"DROP TABLE raw_{name}")
+
+        n_rows = self.con.execute("SELECT count(*) FROM raw_transactions").fetchone()[0]
+        print(f"Merged transaction table: {n_rows} rows")
+        return None
+
+    def clean_data(self):
+        """Define the cleaned view: medians filled, dates typed, free text dropped"""
+        print("\nDefining cleaned view...")
+
+        medians = self.con.execute(
+            "SELECT " + ", ".join(f"median({col})" for col in MEDIAN_COLUMNS)
+            + " FROM raw_transactions"
+        ).fetchone()
+        self.imputer.fill_values = {
+            col: float(value) for col, value in zip(MEDIAN_COLUMNS, medians) if value is not None
+        }
+        self.imputer.n_rows = self.con.execute("SELECT count(*) FROM raw_transactions").fetchone()[0]
+        fills = ",\n".join(
+            f"coalesce({col}, {self.imputer.fill_values.get(col, 'NULL')}) AS {col}"
+            for col in MEDIAN_COLUMNS
+        )
+        dates = ",\n".join(f"TRY_CAST({col} AS TIMESTAMP) AS {col}" for col in DATE_COLUMNS)
+        replaced = ", ".join(MEDIAN_COLUMNS + DATE_COLUMNS + ['product_category_name'])
+
+        self.con.execute(f"""
+            CREATE OR REPLACE VIEW clean_transactions AS
+            SELECT
+                * EXCLUDE ({replaced}),
+                coalesce(product_category_name, 'Unknown') AS product_category_name,
+                {fills},
+                {dates}
+            FROM raw_transactions
+        """)
+
+        print("Data cleaning view defined!")
+        return None
+
+    def engineer_features(self):
+        """Define the feature view with delivery and approval metrics"""
+        print("\nDefining feature view...")
+
+        self.con.execute("""
+            CREATE OR REPLACE VIEW transactions AS
+            SELECT
+                *,
+                floor((epoch(order_delivered_customer_date) - epoch(order_purchase_timestamp)) / 86400)
+                    AS delivery_time_days,
+                floor((epoch(order_delivered_customer_date) - epoch(order_estimated_delivery_date)) / 86400)
+                    AS delivery_lateness_days,
+                (epoch(order_approved_at) - epoch(order_purchase_timestamp)) / 3600
+                    AS approval_time_hours
+            FROM clean_transactions
+        """)
+
+        if self.materialize_transactions:
+            self.df = self.con.execute("SELECT * FROM transactions").df()
+
+        print("Feature view defined!")
+        return self.df
+
+    def create_customer_master(self):
+        """Aggregate customer features inside DuckDB and return them as pandas"""
+        print("\nCreating customer master dataframe...")
+
+        self.analysis_date = pd.Timestamp(
+            self.con.execute("SELECT max(order_purchase_timestamp) FROM transactions").fetchone()[0]
+        ) + pd.DateOffset(days=1)
+        window_start = self.analysis_date - pd.DateOffset(days=90)
+
+        self.customer_master_df = self.con.execute("""
+            WITH gaps AS (
+                SELECT
+                    *,
+                    floor((epoch(order_purchase_timestamp) - epoch(lag(order_purchase_timestamp) OVER (
+                        PARTITION BY customer_unique_id ORDER BY order_purchase_timestamp
+                    ))) / 86400) AS days_between_purchases
+                FROM transactions
+            )
+            SELECT
+                customer_unique_id,
+                CAST(floor((epoch(CAST(? AS TIMESTAMP)) - epoch(max(order_purchase_timestamp))) / 86400) AS BIGINT)
+                    AS recency,
+                count(DISTINCT order_id) AS frequency,
+                sum(payment_value) AS monetary,
+                avg(review_score) AS avg_review_score,
+                avg(delivery_time_days) AS avg_delivery_time,
+                avg(delivery_lateness_days) AS avg_delivery_lateness,
+                avg(approval_time_hours) AS avg_approval_hours,
+                CAST(count_if(review_score <= 2) AS BIGINT) AS number_of_low_reviews,
+                CAST(count_if(review_score <= 2) > 0 AS BIGINT) AS has_left_bad_review,
+                coalesce(avg(days_between_purchases), 0) AS avg_days_between_purchases,
+                coalesce(stddev_samp(days_between_purchases), 0) AS std_dev_days_between_purchases,
+                CAST(count(DISTINCT order_id) FILTER (WHERE order_purchase_timestamp >= CAST(? AS TIMESTAMP))
+                    AS DOUBLE) AS frequency_last_90_days,
+                coalesce(sum(payment_value) FILTER (WHERE order_purchase_timestamp >= CAST(? AS TIMESTAMP)), 0)
+                    AS monetary_last_90_days
+            FROM gaps
+            GROUP BY customer_unique_id
+            ORDER BY customer_unique_id
+        """, [str(self.analysis_date), str(window_start), str(window_start)]).df()
+
+        self.customer_master_df.fillna(0, inplace=True)
+
+        self.customer_master_df['freq_ratio_90d_alltime'] = (
+            self.customer_master_df['frequency_last_90_days'] /
+            (self.customer_master_df['frequency'] + 1)
+        )
+        self.customer_master_df['churn'] = (
+            self.customer_master_df['recency'] > self.CHURN_THRESHOLD_DAYS
+        ).astype(int)
+
+        print(f"Customer master dataframe created! Shape: {self.customer_master_df.shape}")
+        return self.customer_master_df
+
+    def get_transaction_data(self):
+        """Daily sales totals (every day between first and last order, zeros filled)"""
+        return self.con.execute("""
+            WITH daily AS (
+                SELECT date_trunc('day', order_purchase_timestamp) AS ds, sum(payment_value) AS y
+                FROM transactions
+                GROUP BY 1
+            ),
+            days AS (
+                SELECT unnest(generate_series(min(ds), max(ds), INTERVAL 1 DAY)) AS ds
+                FROM daily
+            )
+            SELECT days.ds, coalesce(daily.y, 0) AS y
+            FROM days
+            LEFT JOIN daily USING (ds)
+            ORDER BY days.ds
+        """).df()
+
+    def get_product_return_data(self):
+        """Row-level return training data, filtered inside DuckDB"""
+        columns = ", ".join(RETURN_FEATURE_COLUMNS)
+        not_null = " AND ".join(f"{col} IS NOT NULL" for col in RETURN_FEATURE_COLUMNS)
+        feature_columns = ", ".join(c for c in RETURN_FEATURE_COLUMNS if c != 'review_score')
+
+        return self.con.execute(f"""
+            SELECT {feature_columns}, CAST(review_score <= 2 AS BIGINT) AS is_likely_return
+            FROM (SELECT {columns} FROM transactions)
+            WHERE {not_null}
+        """).df()
+
+    def get_product_feature_data(self):
+        """Aggregate return-model features to one row per product"""
+        return self.con.execute("""
+            SELECT
+                product_id,
+                any_value(product_category_name) AS product_category_name,
+                avg(price) AS price,
+                avg(freight_value) AS freight_value,
+                any_value(product_name_lenght) AS product_name_lenght,
+                any_value(product_description_lenght) AS product_description_lenght,
+                any_value(product_photos_qty) AS product_photos_qty,
+                any_value(product_weight_g) AS product_weight_g,
+                any_value(product_length_cm) AS product_length_cm,
+                any_value(product_height_cm) AS product_height_cm,
+                any_value(product_width_cm) AS product_width_cm,
+                count(*) AS order_item_count,
+                avg(CASE WHEN review_score <= 2 THEN 1.0 ELSE 0.0 END) AS observed_return_rate
+            FROM transactions
+            GROUP BY product_id
+            ORDER BY product_id
+        """).df()
+
+    def compare_with_pandas(self, rtol=1e-6):
+        """Parity check of every DuckDB output against the pandas backend
+
+        Runs both pipelines on the same data and raises AssertionError on
+        any mismatch. Only suitable for data that fits the pandas backend.
+        """
+        print("\n=== Comparing DuckDB backend with pandas backend ===")
+        reference = DataPreprocessor(data_path=self.data_path, feature_engine='pandas')
+        expected = reference.process_all()
+        actual = self.process_all()
+
+        def sort_frame(df, keys):
+            return df.sort_values(keys).reset_index(drop=True)
+
+        pd.testing.assert_frame_equal(
+            sort_frame(actual['customer_master'], 'customer_unique_id'),
+            sort_frame(expected['customer_master'], 'customer_unique_id'),
+            check_dtype=False, rtol=rtol
+        )
+        print("  ✓ customer_master matches")
+
+        pd.testing.assert_frame_equal(
+            actual['sales_data'].reset_index(drop=True),
+            expected['sales_data'].reset_index(drop=True),
+            check_dtype=False, check_datetimelike_compat=True, rtol=rtol
+        )
+        print("  ✓ sales_data matches")
+
+        return_keys = [c for c in expected['return_data'].columns]
+        pd.testing.assert_frame_equal(
+            sort_frame(actual['return_data'][return_keys], return_keys),
+            sort_frame(expected['return_data'], return_keys),
+            check_dtype=False, rtol=rtol
+        )
+        print("  ✓ return_data matches")
+
+        pd.testing.assert_frame_equal(
+            sort_frame(self.get_product_feature_data(), 'product_id'),
+            sort_frame(reference.get_product_feature_data(), 'product_id'),
+            check_dtype=False, rtol=rtol
+        )
+        print("  ✓ product features match")
+
+        return True
+
+
+if __name__ == "__main__":
+    # Run the DuckDB pipeline on the current directory
+    preprocessor = DuckDBPreprocessor(data_path='', temp_directory='.duckdb_tmp')
+    data = preprocessor.process_all()
+
+    print("\n=== Preprocessing Complete ===")
+    print(f"Customer master shape: {data['customer_master'].shape}")
+    print(f"Sales data shape: {data['sales_data'].shape}")
+    print(f"Return data shape: {data['return_data'].shape}")
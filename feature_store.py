@@ -0,0 +1,159 @@
+"""
+Customer Feature Store
+Versioned, columnar on-disk snapshots of the customer master table keyed by
+customer_unique_id, with memory-mapped reads and sorted-key point/batch lookup
+"""
+
+import pandas as pd
+import numpy as np
+import json
+import os
+import shutil
+
+
+class CustomerFeatureStore:
+    KEY_COLUMN = 'customer_unique_id'
+
+    def __init__(self, root='models/feature_store'):
+        """Initialize the store rooted at a folder of snapshots
+
+        Each snapshot is a folder named after its analysis date holding one
+        .npy file per column (rows sorted by key) plus meta.json.
+        """
+        self.root = root
+        self.version = None
+        self.meta = None
+        self.keys = None
+        self.columns = {}
+
+    def _snapshot_folder(self, version):
+        """Folder of one snapshot"""
+        return os.path.join(self.root, version)
+
+    def write_snapshot(self, customer_master, analysis_date):
+        """Write a customer master frame as the snapshot for analysis_date"""
+        version = pd.Timestamp(analysis_date).strftime('%Y-%m-%d')
+        folder = self._snapshot_folder(version)
+        staging = folder + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        df = customer_master.sort_values(self.KEY_COLUMN, kind='stable').reset_index(drop=True)
+        keys = df[self.KEY_COLUMN].astype(str).to_numpy().astype('S')
+        if len(keys) > 1 and (keys[1:] == keys[:-1]).any():
+            raise ValueError(f"Duplicate {self.KEY_COLUMN} values in customer master")
+        np.save(os.path.join(staging, 'keys.npy'), keys)
+
+        columns = {}
+        for col in df.columns.drop(self.KEY_COLUMN):
+            values = df[col].to_numpy()
+            if not np.issubdtype(values.dtype, np.number):
+                raise ValueError(f"Feature column '{col}' is not numeric")
+            np.save(os.path.join(staging, f'{col}.npy'), values)
+            columns[col] = str(values.dtype)
+
+        meta = {
+            'version': version,
+            'analysis_date': str(pd.Timestamp(analysis_date)),
+            'created_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'n_rows': len(df),
+            'columns': columns
+        }
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        # Swap the finished snapshot in place of any previous one for the date
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(staging, folder)
+        with open(os.path.join(self.root, 'LATEST'), 'w') as f:
+            f.write(version)
+
+        print(f"Feature snapshot {version} saved to {folder} ({len(df)} customers)")
+        return version
+
+    def list_snapshots(self):
+        """Available snapshot versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, 'meta.json'))
+        )
+
+    def open(self, version=None):
+        """Memory-map a snapshot (the latest one by default)"""
+        if version is None:
+            latest = os.path.join(self.root, 'LATEST')
+            if not os.path.exists(latest):
+                raise FileNotFoundError(f"No feature snapshots found in {self.root}")
+            with open(latest) as f:
+                version = f.read().strip()
+
+        folder = self._snapshot_folder(version)
+        with open(os.path.join(folder, 'meta.json')) as f:
+            self.meta = json.load(f)
+
+        self.version = version
+        self.keys = np.load(os.path.join(folder, 'keys.npy'), mmap_mode='r')
+        self.columns = {
+            col: np.load(os.path.join(folder, f'{col}.npy'), mmap_mode='r')
+            for col in self.meta['columns']
+        }
+        return self
+
+    def _positions(self, customer_ids):
+        """Row positions of the given ids (-1 where not found)"""
+        if self.keys is None:
+            raise ValueError("No snapshot opened. Call open() first.")
+
+        ids = np.asarray(customer_ids, dtype=str)
+        positions = np.full(len(ids), -1, dtype=np.int64)
+        width = self.keys.dtype.itemsize
+        fits = np.char.str_len(ids) <= width if len(ids) else np.zeros(0, dtype=bool)
+        if not fits.any() or len(self.keys) == 0:
+            return positions
+
+        encoded = ids[fits].astype(self.keys.dtype)
+        found = np.searchsorted(self.keys, encoded)
+        found = np.minimum(found, len(self.keys) - 1)
+        matched = self.keys[found] == encoded
+        positions[np.flatnonzero(fits)[matched]] = found[matched]
+        return positions
+
+    def get(self, customer_id):
+        """Features of one customer as a dict (None if unknown)"""
+        if self.keys is None:
+            raise ValueError("No snapshot opened. Call open() first.")
+        key = str(customer_id).encode()
+        position = int(np.searchsorted(self.keys, key))
+        if position >= len(self.keys) or self.keys[position] != key:
+            return None
+        return {col: values[position].item() for col, values in self.columns.items()}
+
+    def get_many(self, customer_ids, columns=None):
+        """Features of many customers, in request order
+
+        Unknown ids come back as rows of NaN; the 'found' column flags them.
+        """
+        customer_ids = list(customer_ids)
+        positions = self._positions(customer_ids)
+        found = positions >= 0
+        columns = columns or list(self.columns)
+
+        result = pd.DataFrame({self.KEY_COLUMN: customer_ids})
+        for col in columns:
+            values = self.columns[col]
+            if found.all():
+                result[col] = values[positions]
+            else:
+                out = np.full(len(positions), np.nan)
+                out[found] = values[positions[found]]
+                result[col] = out
+        result['found'] = found
+        return result
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Customer Feature Store Module")
+    print("Use this module to snapshot and look up customer features")
@@ -0,0 +1,111 @@
+"""
+Missing-value Imputation with Persisted Training Statistics
+Fits all fill values in one vectorized pass (or streams chunks through
+mergeable quantile sketches) and applies them identically at scoring time
+"""
+
+import pandas as pd
+import numpy as np
+import pickle
+import os
+from sketches import QuantileSketch
+
+
+# Product columns that clean_data fills with the training median
+MEDIAN_COLUMNS = [
+    'product_weight_g', 'product_name_lenght', 'product_description_lenght',
+    'product_photos_qty', 'product_length_cm', 'product_height_cm', 'product_width_cm'
+]
+
+# Categorical columns filled with a constant label
+CONSTANT_FILLS = {'product_category_name': 'Unknown'}
+
+
+class MedianImputer:
+    def __init__(self, median_columns=None, constant_fills=None, sketch_capacity=2048):
+        """Initialize the imputer with the columns it fills"""
+        self.median_columns = list(median_columns or MEDIAN_COLUMNS)
+        self.constant_fills = dict(constant_fills if constant_fills is not None else CONSTANT_FILLS)
+        self.sketch_capacity = sketch_capacity
+        self.fill_values = None
+        self.n_rows = 0
+        self._sketches = None
+
+    def fit(self, df):
+        """Compute all medians over an in-memory frame in one vectorized call"""
+        columns = [c for c in self.median_columns if c in df.columns]
+        medians = df[columns].astype(np.float64).median()
+        self.fill_values = {col: float(medians[col]) for col in columns}
+        self.n_rows = len(df)
+        return self
+
+    def partial_fit(self, chunk):
+        """Stream one chunk into the per-column quantile sketches"""
+        if self._sketches is None:
+            self._sketches = {
+                col: QuantileSketch(self.sketch_capacity) for col in self.median_columns
+            }
+        for col in self.median_columns:
+            if col in chunk.columns:
+                self._sketches[col].update(chunk[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        self.n_rows += len(chunk)
+        self.fill_values = {
+            col: sketch.quantile(0.5) for col, sketch in self._sketches.items() if sketch.count > 0
+        }
+        return self
+
+    def transform(self, df, inplace=False):
+        """Fill missing values with the fitted statistics"""
+        if self.fill_values is None:
+            raise ValueError("Imputer not fitted yet. Call fit() first.")
+        if not inplace:
+            df = df.copy()
+
+        for col, value in self.constant_fills.items():
+            if col not in df.columns:
+                continue
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and value not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories([value])
+            df[col] = df[col].fillna(value)
+
+        fills = {col: value for col, value in self.fill_values.items() if col in df.columns}
+        if fills:
+            df.fillna(value=fills, inplace=True)
+        return df
+
+    def fit_transform(self, df, inplace=False):
+        """Fit on df and fill it"""
+        return self.fit(df).transform(df, inplace=inplace)
+
+    def save(self, filepath='models/imputer.pkl'):
+        """Save the fitted statistics"""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'wb') as f:
+            pickle.dump({
+                'median_columns': self.median_columns,
+                'constant_fills': self.constant_fills,
+                'fill_values': self.fill_values,
+                'n_rows': self.n_rows
+            }, f)
+
+        print(f"Imputer saved to {filepath}")
+
+    def load(self, filepath='models/imputer.pkl'):
+        """Load fitted statistics"""
+        with open(filepath, 'rb') as f:
+            data = pickle.load(f)
+
+        self.median_columns = data['median_columns']
+        self.constant_fills = data['constant_fills']
+        self.fill_values = data['fill_values']
+        self.n_rows = data['n_rows']
+
+        print(f"Imputer loaded from {filepath}")
+        return self
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Missing-value Imputation Module")
+    print("Use this module to fit and apply persisted fill values")
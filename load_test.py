@@ -0,0 +1,243 @@
+"""
+Scoring Load Test Driver
+Replays synthetic prediction inputs against batch scoring (predict.py on CSV
+shards) and online scoring (single-row model calls at a target request rate),
+and reports throughput and latency percentiles
+"""
+
+import pandas as pd
+import numpy as np
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from segmentation_model import CustomerSegmentation
+from churn_model import ChurnPredictor
+from return_model import ReturnPredictor
+from synthetic_data import SyntheticDataGenerator
+from shared_scoring import SharedScoringPool, SHARED_ROOT
+from atomic_io import atomic_write_csv
+import predict
+
+
+PERCENTILES = [50, 90, 99, 99.9]
+
+# Distinct single-row requests prepared per online run; the schedule cycles through them
+MAX_REQUEST_ROWS = 1000
+
+
+def latency_summary(latencies):
+    """Latency percentiles in milliseconds"""
+    latencies = np.asarray(latencies, dtype=np.float64) * 1000
+    if len(latencies) == 0:
+        return {f'p{p:g}_ms': np.nan for p in PERCENTILES} | {'max_ms': np.nan}
+    summary = {f'p{p:g}_ms': float(v) for p, v in zip(PERCENTILES, np.percentile(latencies, PERCENTILES))}
+    summary['max_ms'] = float(latencies.max())
+    return summary
+
+
+class LoadDriver:
+    def __init__(self, shard_folder='data/synthetic', output_folder='data/load_test'):
+        """Initialize the driver over a folder of synthetic CSV shards"""
+        self.shard_folder = shard_folder
+        self.output_folder = output_folder
+        self.models = {}
+        self.results = []
+
+    def generate(self, generator, table, n_rows, shard_rows=100000, n_jobs=-1):
+        """Write fresh synthetic shards for a table (replacing old ones)"""
+        for path in self.shards(table):
+            os.remove(path)
+        return generator.generate(table, n_rows, self.shard_folder, shard_rows, n_jobs)
+
+    def shards(self, table):
+        """Synthetic shard files of a table, in shard order"""
+        return sorted(glob.glob(os.path.join(self.shard_folder, f'{table}-*.csv')))
+
+    def run_batch(self, table):
+        """Score every shard through predict.py's batch path, one call per shard
+
+        The prediction cache is bypassed (incremental=False) so each shard
+        is fully scored, and outputs and drift metrics go to output_folder
+        instead of the real prediction files.
+        """
+        print(f"\n=== Batch Load Test: {table} ===")
+        shard_paths = self.shards(table)
+        if not shard_paths:
+            raise ValueError(f"No {table} shards in {self.shard_folder}. Call generate() first.")
+        score = predict.predict_customer_data if table == 'customer' else predict.predict_product_returns
+        monitoring_log = os.path.join(self.output_folder, 'drift_metrics.jsonl')
+
+        rows, latencies = 0, []
+        started = time.perf_counter()
+        for path in shard_paths:
+            shard_started = time.perf_counter()
+            scored = score(
+                input_csv=path, output_csv=os.path.join(self.output_folder, os.path.basename(path)),
+                incremental=False, monitoring_log=monitoring_log
+            )
+            latencies.append(time.perf_counter() - shard_started)
+            rows += len(scored)
+        elapsed = time.perf_counter() - started
+
+        result = {
+            'mode': 'batch', 'table': table, 'target_rps': np.nan, 'requests': len(shard_paths),
+            'rows': rows, 'errors': 0, 'seconds': elapsed,
+            'achieved_rps': len(shard_paths) / elapsed, 'rows_per_second': rows / elapsed
+        }
+        result.update(latency_summary(latencies))
+        self.results.append(result)
+        print(f"Batch {table}: {rows} rows in {elapsed:.1f}s ({result['rows_per_second']:.0f} rows/s), "
+              f"per-shard p50 {result['p50_ms']:.0f} ms")
+        return result
+
+    def run_shared_batch(self, table, workers=None):
+        """Score every shard with shared-memory scoring workers (see shared_scoring.py)
+
+        Reports the same throughput and per-shard latency as run_batch,
+        plus the workers' summed PSS, which counts the shared model pages
+        once in total. Spawned workers re-import the launching script, so
+        from here they also load its libraries; the shared_scoring.py CLI
+        keeps workers to NumPy / pandas / Numba.
+        """
+        print(f"\n=== Shared Batch Load Test: {table} ===")
+        shard_paths = self.shards(table)
+        if not shard_paths:
+            raise ValueError(f"No {table} shards in {self.shard_folder}. Call generate() first.")
+
+        rows, latencies = 0, []
+        with SharedScoringPool(workers) as pool:
+            started = time.perf_counter()
+            for path in shard_paths:
+                shard_started = time.perf_counter()
+                rows += len(pool.score_csv(table, path, os.path.join(self.output_folder, os.path.basename(path))))
+                latencies.append(time.perf_counter() - shard_started)
+            elapsed = time.perf_counter() - started
+            memory = pool.memory_report()
+            workers = pool.workers
+
+        result = {
+            'mode': f'shared batch x{workers}', 'table': table, 'target_rps': np.nan,
+            'requests': len(shard_paths), 'rows': rows, 'errors': 0, 'seconds': elapsed,
+            'achieved_rps': len(shard_paths) / elapsed, 'rows_per_second': rows / elapsed,
+            'workers_pss_mb': memory['pss_mb'].sum() if 'pss_mb' in memory else np.nan
+        }
+        result.update(latency_summary(latencies))
+        self.results.append(result)
+        print(f"Shared batch {table}: {rows} rows in {elapsed:.1f}s ({result['rows_per_second']:.0f} rows/s) "
+              f"with {workers} workers")
+        return result
+
+    def _scorer(self, table):
+        """Single-request scoring function with the models loaded once"""
+        if table not in self.models:
+            if table == 'customer':
+                seg_model = CustomerSegmentation()
+                seg_model.load_model('models/segmentation_model.pkl')
+                churn_model = ChurnPredictor()
+                churn_model.load_model('models/churn_model.pkl')
+                self.models[table] = (seg_model, churn_model)
+            else:
+                return_model = ReturnPredictor()
+                return_model.load_model('models/return_model.pkl')
+                self.models[table] = (return_model,)
+
+        if table == 'customer':
+            seg_model, churn_model = self.models[table]
+
+            def score(row):
+                return seg_model.predict(row), churn_model.predict(row, monitor=False)
+        else:
+            return_model, = self.models[table]
+
+            def score(row):
+                return return_model.predict(row, monitor=False)
+        return score
+
+    def run_online(self, table, rate, duration=10.0, workers=4):
+        """Replay single-row requests at a fixed target rate (open loop)
+
+        Requests are issued on a fixed schedule whatever the response
+        times, and each latency is measured from its scheduled start, so
+        queueing delay when the service falls behind is counted instead of
+        hidden (no coordinated omission).
+        """
+        print(f"\n=== Online Load Test: {table} at {rate} req/s for {duration}s ===")
+        shard_paths = self.shards(table)
+        if not shard_paths:
+            raise ValueError(f"No {table} shards in {self.shard_folder}. Call generate() first.")
+        rows = pd.read_csv(shard_paths[0], nrows=MAX_REQUEST_ROWS)
+        requests = [rows.iloc[[i]] for i in range(len(rows))]
+        score = self._scorer(table)
+
+        def timed(request, scheduled):
+            try:
+                score(request)
+                return time.perf_counter() - scheduled, False
+            except Exception:
+                return time.perf_counter() - scheduled, True
+
+        n_requests = max(int(rate * duration), 1)
+        futures = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for i in range(n_requests):
+                scheduled = started + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(timed, requests[i % len(requests)], scheduled))
+            outcomes = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, failed in outcomes if not failed]
+        errors = sum(failed for _, failed in outcomes)
+        result = {
+            'mode': 'online', 'table': table, 'target_rps': rate, 'requests': n_requests,
+            'rows': n_requests, 'errors': errors, 'seconds': elapsed,
+            'achieved_rps': n_requests / elapsed, 'rows_per_second': n_requests / elapsed
+        }
+        result.update(latency_summary(latencies))
+        self.results.append(result)
+        print(f"Online {table}: {result['achieved_rps']:.1f}/{rate} req/s, {errors} errors, "
+              f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, max {result['max_ms']:.1f} ms")
+        return result
+
+    def report(self, output_csv=None):
+        """All results so far as a DataFrame (optionally saved)"""
+        report = pd.DataFrame(self.results)
+        if output_csv:
+            atomic_write_csv(report.round(3), output_csv)
+            print(f"Load test report saved to {output_csv}")
+        return report
+
+
+def main():
+    """Generate synthetic inputs and run batch and online load tests
+
+    Usage: python load_test.py [rows] [online_rate]
+    """
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 50.0
+
+    if not os.path.exists('models/synthetic_generator.pkl'):
+        print("\n❌ ERROR: No synthetic data generator found!")
+        print("Please run 'train_models.py' first to fit it.")
+        return
+
+    generator = SyntheticDataGenerator().load()
+    driver = LoadDriver()
+    for table in ['customer', 'product']:
+        driver.generate(generator, table, n_rows)
+        driver.run_batch(table)
+        if os.path.exists(os.path.join(SHARED_ROOT, 'LATEST')):
+            driver.run_shared_batch(table)
+        driver.run_online(table, rate)
+
+    print(driver.report(os.path.join(driver.output_folder, 'load_test_report.csv')).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
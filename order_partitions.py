@@ -0,0 +1,335 @@
+"""
+Partitioned Order Storage
+Converts incoming order, item, payment and review extracts into an
+append-only, month-partitioned columnar dataset with per-part min/max
+statistics, so time-bounded jobs only read the partitions they need
+"""
+
+import pandas as pd
+import numpy as np
+import json
+import os
+import shutil
+import sys
+
+from atomic_io import atomic_write_json
+
+
+PARTITION_COLUMN = 'order_purchase_timestamp'
+
+# Fact tables stored in partitions; customers and products stay flat CSVs
+PARTITIONED_TABLES = ['orders', 'order_items', 'order_payments', 'order_reviews']
+
+DATE_COLUMNS = [
+    'order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date',
+    'order_delivered_customer_date', 'order_estimated_delivery_date',
+    'review_creation_date', 'review_answer_timestamp', 'shipping_limit_date'
+]
+
+# Free-text review columns the pipeline never uses
+DROPPED_COLUMNS = ['review_comment_title', 'review_comment_message']
+
+UNKNOWN_PARTITION = 'unknown'
+MANIFEST = '_manifest.json'
+
+
+class OrderPartitionStore:
+    def __init__(self, root='data/partitions'):
+        """Initialize the store rooted at a partitioned dataset folder
+
+        Layout: <root>/<table>/month=YYYY-MM/part-NNNNN/ with one .npy file
+        per column and meta.json. Every ingest only adds new part folders;
+        _manifest.json lists the parts with their statistics and is replaced
+        atomically once they are written, so readers never see a partial
+        ingest. Child tables are partitioned by their order's purchase month.
+        """
+        self.root = root
+        self.manifest = self._load_manifest()
+        self.last_scan = {}
+
+    def _load_manifest(self):
+        """Read the manifest (empty dataset if there is none yet)"""
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {'partition_column': PARTITION_COLUMN, 'next_part': 0,
+                    'ingested_files': {}, 'schemas': {}, 'parts': []}
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _column_stats(values):
+        """[min, max] of a numeric or datetime column as JSON values (None if empty)"""
+        if np.issubdtype(values.dtype, np.datetime64):
+            valid = values[~np.isnat(values)]
+            if len(valid) == 0:
+                return None
+            return [str(pd.Timestamp(valid.min())), str(pd.Timestamp(valid.max()))]
+        if np.issubdtype(values.dtype, np.number):
+            valid = values[~np.isnan(values)] if np.issubdtype(values.dtype, np.floating) else values
+            if len(valid) == 0:
+                return None
+            return [valid.min().item(), valid.max().item()]
+        return None
+
+    @staticmethod
+    def _encode_column(series):
+        """Column as a fixed-dtype array plus a null mask for string columns"""
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series.to_numpy(dtype='datetime64[ns]'), None
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            if pd.api.types.is_extension_array_dtype(series):
+                return series.to_numpy(dtype=np.float64, na_value=np.nan), None
+            return series.to_numpy(), None
+
+        missing = series.isna().to_numpy()
+        values = series.astype(object).where(~missing, '').astype(str).to_numpy()
+        try:
+            encoded = values.astype(bytes)
+        except UnicodeEncodeError:
+            encoded = np.char.encode(values, 'utf-8')
+        return encoded, (missing if missing.any() else None)
+
+    def _write_part(self, table, partition, df, purchase_times):
+        """Write one partition's rows as a new part folder and return its manifest entry"""
+        part_name = f"part-{self.manifest['next_part']:05d}"
+        self.manifest['next_part'] += 1
+        relative = os.path.join(table, f'month={partition}', part_name)
+        folder = os.path.join(self.root, relative)
+        # A folder here can only be left over from an ingest that never reached the manifest
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+
+        schema = {}
+        stats = {PARTITION_COLUMN: self._column_stats(purchase_times)}
+        for col in df.columns:
+            values, missing = self._encode_column(df[col])
+            np.save(os.path.join(folder, f'{col}.npy'), values)
+            if missing is not None:
+                np.save(os.path.join(folder, f'{col}.isnull.npy'), missing)
+            kind = 'string' if values.dtype.kind == 'S' else str(values.dtype)
+            schema[col] = kind
+            if kind != 'string' and col != PARTITION_COLUMN:
+                stats[col] = self._column_stats(values)
+
+        entry = {'table': table, 'partition': partition, 'path': relative,
+                 'rows': len(df), 'stats': stats}
+        with open(os.path.join(folder, 'meta.json'), 'w') as f:
+            json.dump(entry, f, indent=2)
+
+        known = self.manifest['schemas'].setdefault(table, schema)
+        known.update({col: kind for col, kind in schema.items() if col not in known})
+        return entry
+
+    def _stored_purchase_times(self, order_ids):
+        """Purchase timestamps of already-stored orders, indexed by order_id"""
+        frames = [
+            self._read_part(entry, ['order_id', PARTITION_COLUMN])
+            for entry in self.manifest['parts'] if entry['table'] == 'orders'
+        ]
+        if not frames:
+            return pd.Series(dtype='datetime64[ns]')
+        stored = pd.concat(frames, ignore_index=True)
+        stored = stored[stored['order_id'].isin(order_ids)]
+        return stored.drop_duplicates('order_id').set_index('order_id')[PARTITION_COLUMN]
+
+    def ingest(self, extracts, source_files=None):
+        """Append a batch of extracts ({table name: DataFrame}) as new partitions
+
+        Orders are split by purchase month. Items, payments and reviews take
+        their order's month, looked up in the same batch first and then in
+        the stored orders; rows whose order is unknown go to
+        month=unknown, which time-bounded reads skip.
+        """
+        unknown_tables = set(extracts) - set(PARTITIONED_TABLES)
+        if unknown_tables:
+            raise ValueError(f"Not a partitioned table: {', '.join(sorted(unknown_tables))}")
+
+        purchase_times = pd.Series(dtype='datetime64[ns]')
+        if 'orders' in extracts:
+            orders = extracts['orders']
+            purchase_times = pd.to_datetime(orders[PARTITION_COLUMN], errors='coerce')
+            purchase_times = pd.Series(purchase_times.to_numpy(), index=orders['order_id'].to_numpy())
+            purchase_times = purchase_times[~purchase_times.index.duplicated()]
+
+        new_parts = []
+        for table in PARTITIONED_TABLES:
+            if table not in extracts:
+                continue
+            df = extracts[table].drop(columns=DROPPED_COLUMNS, errors='ignore').reset_index(drop=True)
+            for col in DATE_COLUMNS:
+                if col in df.columns:
+                    df[col] = pd.to_datetime(df[col], errors='coerce')
+
+            times = purchase_times.reindex(df['order_id'].to_numpy()).to_numpy(dtype='datetime64[ns]')
+            unmatched = np.isnat(times)
+            if table != 'orders' and unmatched.any():
+                stored = self._stored_purchase_times(df['order_id'][unmatched].unique())
+                times[unmatched] = stored.reindex(df['order_id'][unmatched].to_numpy()).to_numpy(
+                    dtype='datetime64[ns]'
+                )
+
+            months = pd.Series(times).dt.strftime('%Y-%m').fillna(UNKNOWN_PARTITION).to_numpy()
+            for partition in np.unique(months):
+                rows = np.flatnonzero(months == partition)
+                new_parts.append(
+                    self._write_part(table, partition, df.iloc[rows].reset_index(drop=True), times[rows])
+                )
+
+        self.manifest['parts'].extend(new_parts)
+        self.manifest['ingested_files'].update(source_files or {})
+        atomic_write_json(self.manifest, os.path.join(self.root, MANIFEST), indent=2)
+
+        rows = sum(entry['rows'] for entry in new_parts)
+        print(f"Ingested {rows} rows into {len(new_parts)} new parts under {self.root}")
+        return new_parts
+
+    def ingest_csv_folder(self, data_path=''):
+        """Ingest olist_<table>_dataset.csv extracts from a folder, skipping files already ingested"""
+        extracts = {}
+        source_files = {}
+        for table in PARTITIONED_TABLES:
+            filepath = os.path.join(data_path, f'olist_{table}_dataset.csv')
+            if not os.path.exists(filepath):
+                continue
+            stat = os.stat(filepath)
+            fingerprint = f'{stat.st_size}:{int(stat.st_mtime)}'
+            if self.manifest['ingested_files'].get(os.path.abspath(filepath)) == fingerprint:
+                print(f"  Skipping {filepath} (already ingested)")
+                continue
+            extracts[table] = pd.read_csv(filepath)
+            source_files[os.path.abspath(filepath)] = fingerprint
+
+        if not extracts:
+            print("Nothing new to ingest")
+            return []
+        return self.ingest(extracts, source_files)
+
+    def parts(self, table):
+        """Manifest entries of one table"""
+        return [entry for entry in self.manifest['parts'] if entry['table'] == table]
+
+    def prune(self, table, start=None, end=None):
+        """Parts whose purchase-time range overlaps [start, end)
+
+        Without bounds every part is kept; with bounds, parts without
+        statistics (month=unknown) are skipped.
+        """
+        if start is None and end is None:
+            return self.parts(table)
+
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        kept = []
+        for entry in self.parts(table):
+            bounds = entry['stats'].get(PARTITION_COLUMN)
+            if bounds is None:
+                continue
+            low, high = pd.Timestamp(bounds[0]), pd.Timestamp(bounds[1])
+            if (start is None or high >= start) and (end is None or low < end):
+                kept.append(entry)
+        return kept
+
+    def _read_part(self, entry, columns=None):
+        """Load one part folder as a DataFrame"""
+        folder = os.path.join(self.root, entry['path'])
+        schema = self.manifest['schemas'][entry['table']]
+        data = {}
+        for col in (columns or schema):
+            path = os.path.join(folder, f'{col}.npy')
+            if not os.path.exists(path):
+                # Column added by a later extract: missing in this part
+                data[col] = np.full(entry['rows'], np.nan)
+                continue
+            values = np.load(path, mmap_mode='r')
+            if values.dtype.kind == 'S':
+                values = np.char.decode(values, 'utf-8').astype(object)
+                null_path = os.path.join(folder, f'{col}.isnull.npy')
+                if os.path.exists(null_path):
+                    values[np.load(null_path)] = np.nan
+            else:
+                values = np.array(values)
+            data[col] = values
+        return pd.DataFrame(data)
+
+    def _empty_frame(self, table, columns=None):
+        """Zero-row frame with the table's columns and dtypes"""
+        schema = self.manifest['schemas'].get(table, {})
+        return pd.DataFrame({
+            col: np.empty(0, dtype=object if schema[col] == 'string' else schema[col])
+            for col in (columns or schema)
+        })
+
+    def iter_parts(self, table, start=None, end=None, columns=None):
+        """Yield the pruned parts of a table one DataFrame at a time"""
+        entries = self.prune(table, start, end)
+        self.last_scan[table] = (len(entries), len(self.parts(table)))
+        for entry in entries:
+            yield self._read_part(entry, columns)
+
+    def read(self, table, start=None, end=None, columns=None):
+        """Read the pruned parts of a table
+
+        Orders are filtered to purchase times in [start, end); child
+        tables return whole pruned parts (joining them to the orders
+        drops the rest).
+        """
+        frames = list(self.iter_parts(table, start, end, columns))
+        if not frames:
+            return self._empty_frame(table, columns)
+        df = pd.concat(frames, ignore_index=True)
+        if table == 'orders' and PARTITION_COLUMN in df.columns:
+            df = df[self.time_mask(df[PARTITION_COLUMN], start, end)].reset_index(drop=True)
+        return df
+
+    @staticmethod
+    def time_mask(purchase_times, start=None, end=None):
+        """Rows with purchase times in [start, end)"""
+        purchase_times = pd.to_datetime(purchase_times, errors='coerce')
+        mask = pd.Series(True, index=purchase_times.index)
+        if start is not None:
+            mask &= purchase_times >= pd.Timestamp(start)
+        if end is not None:
+            mask &= purchase_times < pd.Timestamp(end)
+        return mask.to_numpy()
+
+    def time_bounds(self):
+        """(earliest, latest) order purchase time from the part statistics alone"""
+        bounds = [
+            entry['stats'][PARTITION_COLUMN] for entry in self.parts('orders')
+            if entry['stats'].get(PARTITION_COLUMN) is not None
+        ]
+        if not bounds:
+            return None, None
+        return min(pd.Timestamp(b[0]) for b in bounds), max(pd.Timestamp(b[1]) for b in bounds)
+
+    def scan_report(self):
+        """Partitions read vs available per table for the last reads"""
+        return {table: {'read': read, 'total': total} for table, (read, total) in self.last_scan.items()}
+
+    def reset(self):
+        """Delete the whole dataset (e.g. to rebuild it from full snapshots)"""
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.manifest = self._load_manifest()
+
+
+def main():
+    """Ingest Olist extracts: python order_partitions.py [extract_folder] [partition_root]"""
+    data_path = sys.argv[1] if len(sys.argv) > 1 else ''
+    root = sys.argv[2] if len(sys.argv) > 2 else 'data/partitions'
+
+    print("\n" + "="*60)
+    print("BI DASHBOARD - ORDER INGESTION")
+    print("="*60)
+
+    store = OrderPartitionStore(root)
+    store.ingest_csv_folder(data_path)
+
+    for table in PARTITIONED_TABLES:
+        parts = store.parts(table)
+        months = {entry['partition'] for entry in parts}
+        print(f"  {table}: {sum(entry['rows'] for entry in parts)} rows in "
+              f"{len(parts)} parts over {len(months)} months")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,64 +11,261 @@ from segmentation_model import CustomerSegmentation
 from churn_model import ChurnPredictor
 from sales_forecast_model import SalesForecaster
 from return_model import ReturnPredictor
+from product_risk import ProductRiskTable
+from dashboard_export import export_dashboard_summaries
+from prediction_cache import PredictionCache
+from feature_store import CustomerFeatureStore
+from atomic_io import atomic_write_csv
+from approx_analytics import ApproximateAnalytics, STRATA_COLUMNS
+from explanations import top_reasons
+from dimensions import Dimensions
+from regional_cube import RegionalCube
+from calendar_dimension import CalendarDimension
+from sales_rollup import SalesRollup
+from preprocessing import DataPreprocessor
+from customer_activity import CustomerActivity
 import pandas as pd
+import numpy as np
 import os
+import sys
 
 
-def predict_customer_data(input_csv='Predictions_Customer.csv', output_csv='Predictions_Customer.csv'):
-    """Predict customer segments and churn"""
+# Rows of KPI_Metrics.csv, in order
+KPI_METRICS = [
+    'Total Customers',
+    'Customers at Risk',
+    'Churn Rate',
+    'Avg Churn Probability',
+    'Total Products',
+    'Products with Return Risk',
+    'Return Rate',
+    'Avg Return Probability',
+    'Total Forecasted Sales (90d)',
+    'Avg Daily Sales',
+    'Peak Daily Sales',
+    'Low Risk Customers',
+    'Medium Risk Customers',
+    'High Risk Customers'
+]
+
+
+# Names of the four segments of the default segmentation model
+SEGMENT_NAMES = {
+    0: 'Inactive Customers',
+    1: 'Unhappy Customers',
+    2: 'Recent Buyers',
+    3: 'VIP Customers'
+}
+
+# Dimensions read by this process, per working folder (see _dimensions)
+_DIMENSIONS = {}
+
+
+def _dimensions():
+    """Seller / category dimensions of the working folder, read once per process"""
+    folder = os.getcwd()
+    if folder not in _DIMENSIONS:
+        _DIMENSIONS[folder] = Dimensions().load()
+    return _DIMENSIONS[folder]
+
+
+def _reason_columns(top_k, impact='impact'):
+    """Output columns written by top_reasons"""
+    return [col for i in range(1, top_k + 1) for col in (f'reason_{i}', f'reason_{i}_{impact}')]
+
+
+def _drop_reason_columns(df):
+    """Drop reason columns left in the input by an earlier run (any top_k)"""
+    return df.drop(columns=df.columns[df.columns.str.fullmatch(r'reason_\d+(_(path_)?impact)?')])
+
+
+def _write_outputs(df, previous, input_csv, output_csv, output_columns):
+    """Write scored rows unless the output file already holds them exactly
+    
+    previous is the input as read. When scores are written back to the
+    input file, the write is skipped only if that file already had the
+    same columns and output values; a fresh input with the same features
+    gets its outputs even when every score came from the cache. Sets
+    df.attrs['outputs_changed'] and returns it.
+    """
+    def as_written(values):
+        # Empty strings are read back as missing
+        return values.astype(str).where(values.notna(), '').to_numpy()
+    
+    unchanged = (
+        input_csv == output_csv and previous.shape == df.shape and list(previous.columns) == list(df.columns)
+        and all((as_written(previous[col]) == as_written(df[col])).all() for col in output_columns)
+    )
+    if not unchanged:
+        atomic_write_csv(df, output_csv)
+    df.attrs['outputs_changed'] = not unchanged
+    return not unchanged
+
+
+def predict_customer_data(input_csv='Predictions_Customer.csv', output_csv='Predictions_Customer.csv',
+                          incremental=True, cache_path='models/cache/customer_predictions.pkl',
+                          feature_store='models/feature_store',
+                          monitoring_log='models/monitoring/drift_metrics.jsonl', explain_top_k=3,
+                          sketch_path='models/approx_customers.pkl'):
+    """Predict customer segments and churn
+    
+    With incremental=True, rows whose features and models are unchanged since
+    the last run reuse their cached scores. If the input only lists
+    customer_unique_id, features are fetched from the feature store.
+    The explain_top_k strongest churn drivers per customer are added as
+    reason columns (0 disables explanations). The KPI sketches at
+    sketch_path are updated from the rows whose scores changed.
+    """
     print("\nPredicting customer segments and churn...")
     
-    # Load data
-    df = pd.read_csv(input_csv)
+    # Load data (outputs are written back to the input file by default,
+    # so explanations from an earlier run are dropped, not joined again)
+    previous = pd.read_csv(input_csv)
+    df = _drop_reason_columns(previous)
     print(f"  Loaded {len(df)} customer records")
     
-    # Load and predict with Segmentation Model
+    # Load Segmentation and Churn Models
     seg_model = CustomerSegmentation()
     seg_model.load_model('models/segmentation_model.pkl')
-    segments = seg_model.predict(df)
-    df['predicted_segment'] = segments
-    
-    # Load and predict with Churn Model
     churn_model = ChurnPredictor()
     churn_model.load_model('models/churn_model.pkl')
     
-    # Only predict for customers with all required features
-    try:
-        churn_pred, churn_proba = churn_model.predict(df)
-        df['predicted_churn'] = churn_pred
-        df['churn_probability'] = churn_proba
-    except Exception as e:
-        print(f"  ⚠ Warning: Could not predict churn - {e}")
-        df['predicted_churn'] = 'N/A'
-        df['churn_probability'] = 'N/A'
+    output_columns = ['predicted_segment', 'predicted_churn', 'churn_probability'] + _reason_columns(explain_top_k)
+    feature_columns = seg_model.feature_columns + [
+        col for col in churn_model.feature_columns if col not in seg_model.feature_columns
+    ]
+    
+    missing_columns = [col for col in feature_columns if col not in df.columns]
+    if missing_columns and 'customer_unique_id' in df.columns and os.path.exists(feature_store):
+        store = CustomerFeatureStore(feature_store).open()
+        features = store.get_many(df['customer_unique_id'].astype(str), columns=missing_columns)
+        for col in missing_columns:
+            df[col] = features[col].values
+        if not features['found'].all():
+            print(f"  ⚠ Warning: {int((~features['found']).sum())} unknown customers dropped")
+            df = df[features['found'].values].reset_index(drop=True)
+        print(f"  Fetched {len(missing_columns)} features for {int(features['found'].sum())} "
+              f"customers from feature snapshot {store.version}")
     
-    # Save results
-    df.to_csv(output_csv, index=False)
-    print(f"  ✓ Customer predictions saved to {output_csv}")
+    if incremental and all(col in df.columns for col in feature_columns):
+        def score_customers(rows):
+            scored = pd.DataFrame(index=rows.index)
+            scored['predicted_segment'] = seg_model.predict(rows)
+            scored['predicted_churn'], scored['churn_probability'] = churn_model.predict(rows, monitor=False)
+            if explain_top_k:
+                scored = scored.join(top_reasons(churn_model.explain(rows), churn_model.feature_columns, explain_top_k))
+            return scored
+        
+        cache = PredictionCache(feature_columns, output_columns, cache_path).load()
+        model_version = f'{seg_model.model_version}-{churn_model.model_version}'
+        outputs, rows_rescored = cache.score(df, model_version, score_customers)
+        for col in output_columns:
+            df[col] = outputs[col].values
+        churn_model.update_drift(df, df['churn_probability'].to_numpy())
+        print(f"  Rescored {rows_rescored} rows, skipped {len(df) - rows_rescored} unchanged")
+    else:
+        rows_rescored = len(df)
+        segments = seg_model.predict(df)
+        df['predicted_segment'] = segments
+        
+        # Only predict for customers with all required features
+        try:
+            churn_pred, churn_proba = churn_model.predict(df)
+            df['predicted_churn'] = churn_pred
+            df['churn_probability'] = churn_proba
+            if explain_top_k:
+                df = df.join(top_reasons(churn_model.explain(df), churn_model.feature_columns, explain_top_k))
+        except Exception as e:
+            print(f"  ⚠ Warning: Could not predict churn - {e}")
+            df['predicted_churn'] = 'N/A'
+            df['churn_probability'] = 'N/A'
+    
+    df.attrs['rows_rescored'] = rows_rescored
+    
+    # Drift of this batch against the training distribution
+    if churn_model.drift_monitor is not None and churn_model.drift_monitor.rows_seen:
+        churn_model.drift_monitor.emit(monitoring_log, 'churn', churn_model.model_version)
+    
+    # Save results (a file already holding these outputs is left as it is)
+    if _write_outputs(df, previous, input_csv, output_csv, output_columns):
+        print(f"  ✓ Customer predictions saved to {output_csv}")
+    else:
+        print(f"  ✓ Customer predictions in {output_csv} already up to date")
+    
+    # Keep the KPI sketches in line with the scores (changed rows only)
+    update_score_sketches('customers', df, sketch_path)
     
     return df
 
 
-def predict_product_returns(input_csv='Predictions_Product.csv', output_csv='Predictions_Product.csv'):
-    """Predict product return likelihood"""
+def predict_product_returns(input_csv='Predictions_Product.csv', output_csv='Predictions_Product.csv',
+                            incremental=True, cache_path='models/cache/product_predictions.pkl',
+                            monitoring_log='models/monitoring/drift_metrics.jsonl', explain_top_k=3,
+                            sketch_path='models/approx_products.pkl'):
+    """Predict product return likelihood
+    
+    With incremental=True, rows whose features and model are unchanged since
+    the last run reuse their cached scores. The explain_top_k strongest
+    return drivers per product are added as reason columns; their impacts
+    are forest path attributions, not SHAP values, so they are written as
+    reason_<i>_path_impact. The KPI sketches at sketch_path are updated
+    from the rows whose scores changed.
+    """
     print("\nPredicting product returns...")
     
-    # Load data
-    df = pd.read_csv(input_csv)
+    # Load data (outputs are written back to the input file by default,
+    # so explanations from an earlier run are dropped, not joined again)
+    previous = pd.read_csv(input_csv)
+    df = _drop_reason_columns(previous)
     print(f"  Loaded {len(df)} product records")
     
-    # Load and predict with Return Model
+    # Load Return Model
     return_model = ReturnPredictor()
     return_model.load_model('models/return_model.pkl')
     
-    return_pred, return_proba = return_model.predict(df)
-    df['predicted_return'] = return_pred
-    df['return_probability'] = return_proba
+    feature_columns = return_model.numerical_features + return_model.categorical_features
+    if return_model.backend != 'random_forest':
+        explain_top_k = 0
+    output_columns = ['predicted_return', 'return_probability'] + _reason_columns(explain_top_k, 'path_impact')
+    
+    if incremental:
+        def score_products(rows):
+            scored = pd.DataFrame(index=rows.index)
+            scored['predicted_return'], scored['return_probability'] = return_model.predict(rows, monitor=False)
+            if explain_top_k:
+                reasons = top_reasons(return_model.explain(rows), feature_columns, explain_top_k, 'path_impact')
+                scored = scored.join(reasons)
+            return scored
+        
+        cache = PredictionCache(feature_columns, output_columns, cache_path).load()
+        outputs, rows_rescored = cache.score(df, return_model.model_version, score_products)
+        for col in output_columns:
+            df[col] = outputs[col].values
+        return_model.update_drift(df, df['return_probability'].to_numpy())
+        print(f"  Rescored {rows_rescored} rows, skipped {len(df) - rows_rescored} unchanged")
+    else:
+        rows_rescored = len(df)
+        return_pred, return_proba = return_model.predict(df)
+        df['predicted_return'] = return_pred
+        df['return_probability'] = return_proba
+        if explain_top_k:
+            df = df.join(top_reasons(return_model.explain(df), feature_columns, explain_top_k, 'path_impact'))
+    
+    df.attrs['rows_rescored'] = rows_rescored
+    df.attrs['model_version'] = return_model.model_version
+    
+    # Drift of this batch against the training distribution
+    if return_model.drift_monitor is not None and return_model.drift_monitor.rows_seen:
+        return_model.drift_monitor.emit(monitoring_log, 'return', return_model.model_version)
     
-    # Save results
-    df.to_csv(output_csv, index=False)
-    print(f"  ✓ Product predictions saved to {output_csv}")
+    # Save results (a file already holding these outputs is left as it is)
+    if _write_outputs(df, previous, input_csv, output_csv, output_columns):
+        print(f"  ✓ Product predictions saved to {output_csv}")
+    else:
+        print(f"  ✓ Product predictions in {output_csv} already up to date")
+    
+    # Keep the KPI sketches in line with the scores (changed rows only)
+    update_score_sketches('products', df, sketch_path)
     
     return df
 
@@ -89,76 +286,89 @@ def predict_sales_forecast(output_csv='Predictions_Sales.csv', periods=90):
     return forecast
 
 
-def prepare_powerbi_data(customer_df, product_df, sales_df):
-    """Prepare and save data for Power BI dashboard"""
-    print("\nPreparing dashboard data...")
+def export_customer_analysis(customer_df, powerbi_folder='website/PowerBI_Data', refresh=True):
+    """Label customers with risk level and segment name and export them
     
-    # Create PowerBI_Data folder if it doesn't exist
-    powerbi_folder = 'website/PowerBI_Data'
-    if not os.path.exists(powerbi_folder):
-        os.makedirs(powerbi_folder)
-    
-    # 1. Customer Analysis for Dashboard
+    The row-level file is only rewritten when refresh is set; the labelled
+    frame is always returned.
+    """
     customer_summary = customer_df.copy()
     customer_summary['churn_risk_level'] = pd.cut(
         customer_summary['churn_probability'], 
         bins=[0, 0.3, 0.7, 1.0], 
         labels=['Low Risk', 'Medium Risk', 'High Risk']
     )
-    customer_summary['segment_name'] = customer_summary['predicted_segment'].map({
-        0: 'Inactive Customers',
-        1: 'Unhappy Customers',
-        2: 'Recent Buyers',
-        3: 'VIP Customers'
-    })
-    customer_summary.to_csv(f'{powerbi_folder}/Customer_Analysis.csv', index=False)
+    customer_summary['segment_name'] = customer_summary['predicted_segment'].map(SEGMENT_NAMES)
+    # Models trained with a selected k can have segments beyond the named four
+    unnamed = customer_summary['segment_name'].isna() & customer_summary['predicted_segment'].notna()
+    customer_summary.loc[unnamed, 'segment_name'] = (
+        'Segment ' + customer_summary.loc[unnamed, 'predicted_segment'].astype(int).astype(str)
+    )
+    if refresh:
+        atomic_write_csv(customer_summary, f'{powerbi_folder}/Customer_Analysis.csv')
     
-    # 2. Product Analysis for Dashboard
+    return customer_summary
+
+
+def export_product_analysis(product_df, powerbi_folder='website/PowerBI_Data', refresh=True):
+    """Label products with return risk level and English category name and export them"""
     product_summary = product_df.copy()
     product_summary['return_risk_level'] = pd.cut(
         product_summary['return_probability'], 
         bins=[0, 0.3, 0.7, 1.0], 
         labels=['Low Risk', 'Medium Risk', 'High Risk']
     )
-    product_summary.to_csv(f'{powerbi_folder}/Product_Analysis.csv', index=False)
+    if 'product_category_name' in product_summary.columns:
+        product_summary['product_category_name_english'] = _dimensions().translate_categories(
+            product_summary['product_category_name']
+        )
+    if refresh:
+        atomic_write_csv(product_summary, f'{powerbi_folder}/Product_Analysis.csv')
     
-    # 3. Sales Forecast for Dashboard
+    return product_summary
+
+
+def export_sales_forecast(sales_df, powerbi_folder='website/PowerBI_Data'):
+    """Add calendar columns (looked up from the calendar dimension) to the forecast and export it"""
     sales_summary = sales_df.copy()
     sales_summary['date'] = pd.to_datetime(sales_summary['date'])
-    sales_summary['year'] = sales_summary['date'].dt.year
-    sales_summary['month'] = sales_summary['date'].dt.month
-    sales_summary['month_name'] = sales_summary['date'].dt.strftime('%B')
-    sales_summary['day_of_week'] = sales_summary['date'].dt.day_name()
-    sales_summary['week_number'] = sales_summary['date'].dt.isocalendar().week
-    sales_summary.to_csv(f'{powerbi_folder}/Sales_Forecast.csv', index=False)
+    CalendarDimension().enrich(sales_summary, 'date')
+    atomic_write_csv(sales_summary, f'{powerbi_folder}/Sales_Forecast.csv')
+    
+    return sales_summary
+
+
+def export_dashboard_rollups(customer_summary, product_summary, sales_df, powerbi_folder='website/PowerBI_Data',
+                             approximate=False):
+    """Write the tables that combine all three branches (KPIs, distributions, summaries)
+    
+    With approximate=True, the KPIs, segment / category distributions and
+    the aggregated summary tables are answered from the persisted sketches
+    (see update_score_sketches) instead of being recomputed exactly; only
+    the top-N row selections are taken from the scored frames.
+    """
+    if approximate:
+        analytics = load_approximate_analytics()
+        export_approximate_kpis(analytics, sales_df, powerbi_folder)
+        category_analysis = export_approximate_distributions(analytics, powerbi_folder)
+        export_dashboard_summaries(
+            customer_summary, product_summary, powerbi_folder,
+            precomputed=approximate_summary_tables(analytics, category_analysis)
+        )
+        return
     
     # 4. Create KPI Metrics
     kpi_metrics = pd.DataFrame({
-        'Metric': [
-            'Total Customers',
-            'Customers at Risk',
-            'Churn Rate',
-            'Avg Churn Probability',
-            'Total Products',
-            'Products with Return Risk',
-            'Return Rate',
-            'Avg Return Probability',
-            'Total Forecasted Sales (90d)',
-            'Avg Daily Sales',
-            'Peak Daily Sales',
-            'Low Risk Customers',
-            'Medium Risk Customers',
-            'High Risk Customers'
-        ],
+        'Metric': KPI_METRICS,
         'Value': [
-            len(customer_df),
-            int(customer_df['predicted_churn'].sum()),
-            f"{(customer_df['predicted_churn'].sum() / len(customer_df) * 100):.1f}%",
-            f"{customer_df['churn_probability'].mean():.2%}",
-            len(product_df),
-            int(product_df['predicted_return'].sum()),
-            f"{(product_df['predicted_return'].sum() / len(product_df) * 100):.1f}%",
-            f"{product_df['return_probability'].mean():.2%}",
+            len(customer_summary),
+            int(customer_summary['predicted_churn'].sum()),
+            f"{(customer_summary['predicted_churn'].sum() / len(customer_summary) * 100):.1f}%",
+            f"{customer_summary['churn_probability'].mean():.2%}",
+            len(product_summary),
+            int(product_summary['predicted_return'].sum()),
+            f"{(product_summary['predicted_return'].sum() / len(product_summary) * 100):.1f}%",
+            f"{product_summary['return_probability'].mean():.2%}",
             f"${sales_df['predicted_sales'].sum():,.2f}",
             f"${sales_df['predicted_sales'].mean():,.2f}",
             f"${sales_df['predicted_sales'].max():,.2f}",
@@ -167,11 +377,11 @@ def prepare_powerbi_data(customer_df, product_df, sales_df):
             int((customer_summary['churn_risk_level'] == 'High Risk').sum())
         ]
     })
-    kpi_metrics.to_csv(f'{powerbi_folder}/KPI_Metrics.csv', index=False)
+    atomic_write_csv(kpi_metrics, f'{powerbi_folder}/KPI_Metrics.csv')
     
     # 5. Segment Distribution
     segment_dist = customer_summary.groupby(['segment_name', 'predicted_segment']).size().reset_index(name='count')
-    segment_dist.to_csv(f'{powerbi_folder}/Segment_Distribution.csv', index=False)
+    atomic_write_csv(segment_dist, f'{powerbi_folder}/Segment_Distribution.csv')
     
     # 6. Category Analysis
     category_analysis = product_summary.groupby('product_category_name').agg({
@@ -180,14 +390,312 @@ def prepare_powerbi_data(customer_df, product_df, sales_df):
         'price': 'mean'
     }).reset_index()
     category_analysis.columns = ['Category', 'Avg_Return_Probability', 'Total_Returns', 'Avg_Price']
+    if 'product_category_name_english' in product_summary.columns:
+        english = product_summary.groupby('product_category_name')['product_category_name_english'].first()
+        category_analysis.insert(1, 'Category_English', category_analysis['Category'].map(english))
     category_analysis = category_analysis.sort_values('Avg_Return_Probability', ascending=False)
-    category_analysis.to_csv(f'{powerbi_folder}/Category_Analysis.csv', index=False)
+    atomic_write_csv(category_analysis, f'{powerbi_folder}/Category_Analysis.csv')
+    
+    # 7. Compact pre-aggregated summaries for the website
+    export_dashboard_summaries(customer_summary, product_summary, powerbi_folder)
+
+
+def update_score_sketches(part, df, sketch_path):
+    """Bring one branch's persisted KPI sketches in line with its scored rows
+    
+    Each branch keeps its own file, so concurrent branches never write the
+    same one. Only rows whose sketched values changed since the last run are
+    fed (their old values are retracted first), see
+    ApproximateAnalytics.sync_scores.
+    """
+    analytics = ApproximateAnalytics.load(sketch_path) if os.path.exists(sketch_path) else ApproximateAnalytics()
+    fed = analytics.sync_scores(part, df)
+    if fed:
+        analytics.save(sketch_path)
+        print(f"  Sketched {fed} changed {part}")
+    
+    return analytics
+
+
+def load_approximate_analytics(sketch_paths=('models/approx_customers.pkl', 'models/approx_products.pkl'),
+                               transaction_path='models/transaction_sketches.pkl'):
+    """Merge the persisted branch sketches and the training transaction sketches"""
+    analytics = ApproximateAnalytics()
+    for path in (transaction_path,) + tuple(sketch_paths):
+        if os.path.exists(path):
+            analytics.merge(ApproximateAnalytics.load(path))
+    
+    return analytics
+
+
+def export_approximate_distributions(analytics, powerbi_folder='website/PowerBI_Data'):
+    """Write Segment_Distribution.csv and Category_Analysis.csv from the sketches
+    
+    Segment counts are exact (samples keep their stratum's row count);
+    category means and return totals are sample estimates, with +/- errors.
+    Returns the category analysis.
+    """
+    segments = analytics.stratum_estimates('customers', [])
+    segment_dist = pd.DataFrame({
+        'segment_name': [_segment_name(key) for key in segments['predicted_segment']],
+        'predicted_segment': segments['predicted_segment'].where(segments['predicted_segment'] >= 0),
+        'count': segments['count'].astype(np.int64)
+    }).sort_values(['segment_name', 'predicted_segment']).reset_index(drop=True)
+    atomic_write_csv(segment_dist, f'{powerbi_folder}/Segment_Distribution.csv')
+    
+    columns = STRATA_COLUMNS['products'][1:]
+    estimates = analytics.stratum_estimates('products', columns)
+    category_analysis = pd.DataFrame({
+        'Category': estimates['product_category_name'],
+        'Category_English': _dimensions().translate_categories(estimates['product_category_name']),
+        'Avg_Return_Probability': estimates['return_probability'],
+        'Avg_Return_Probability_Error': estimates['return_probability_error'],
+        'Total_Returns': (estimates['predicted_return'] * estimates['count']).round(),
+        'Total_Returns_Error': (estimates['predicted_return_error'] * estimates['count']).round(),
+        'Avg_Price': estimates['price'],
+        'Avg_Price_Error': estimates['price_error'],
+        'Products': estimates['count']
+    }).sort_values('Avg_Return_Probability', ascending=False)
+    atomic_write_csv(category_analysis.drop(columns='Products'), f'{powerbi_folder}/Category_Analysis.csv')
+    print(f"  ✓ Approximate distributions saved to {powerbi_folder}/")
+    
+    return category_analysis
+
+
+def _segment_name(key):
+    """Dashboard name of a sketched segment number (-1 for unscored rows)"""
+    if key < 0:
+        return 'Unknown'
+    return SEGMENT_NAMES.get(key, f'Segment {key}')
+
+
+def approximate_summary_tables(analytics, category_analysis):
+    """Aggregated dashboard summary tables answered from the sketches"""
+    customer_risk = analytics.risk_level_estimates('customers', ['monetary', 'churn_probability'])
+    customer_risk.insert(0, 'segment_name', customer_risk.pop('predicted_segment').map(_segment_name))
+    customer_risk = customer_risk.rename(columns={'risk_level': 'churn_risk_level'})
+    customer_risk['total_monetary'] = customer_risk.pop('monetary') * customer_risk['count']
+    customer_risk['avg_churn_probability'] = customer_risk.pop('churn_probability')
+    
+    product_risk = analytics.risk_level_estimates('products')
+    product_risk = product_risk.rename(columns={'risk_level': 'return_risk_level'})
+    
+    return {
+        'customer_segment_risk': customer_risk,
+        'customer_churn_histogram': analytics.histogram('churn_probability'),
+        'product_category_risk': product_risk,
+        'product_category_rollup': category_analysis[
+            ['Category', 'Avg_Return_Probability', 'Total_Returns', 'Avg_Price', 'Products']
+        ].reset_index(drop=True),
+        'product_return_histogram': analytics.histogram('return_probability')
+    }
+
+
+def export_approximate_kpis(analytics, sales_df, powerbi_folder='website/PowerBI_Data'):
+    """Write KPI_Metrics.csv from the sketches, with a +/- Error column
+    
+    Metrics and formatting match the exact table; the forecast rows are
+    exact, and distinct transaction counts are appended when sketched.
+    """
+    estimates = analytics.kpis().set_index('Metric')
+    
+    def estimate(metric):
+        if metric not in estimates.index:
+            return np.nan, np.nan
+        return estimates.loc[metric, 'Value'], estimates.loc[metric, 'Error']
+    
+    sales = sales_df['predicted_sales']
+    exact_sales = {
+        'Total Forecasted Sales (90d)': sales.sum(),
+        'Avg Daily Sales': sales.mean(),
+        'Peak Daily Sales': sales.max()
+    }
+    
+    rows = []
+    for metric in KPI_METRICS:
+        value, error = estimate(metric)
+        if metric in exact_sales:
+            rows.append((metric, f"${exact_sales[metric]:,.2f}", "$0.00"))
+        elif metric in ('Churn Rate', 'Return Rate'):
+            rows.append((metric, f"{value * 100:.1f}%", f"±{error * 100:.1f}%"))
+        elif metric.startswith('Avg'):
+            rows.append((metric, f"{value:.2%}", f"±{error:.2%}"))
+        else:
+            rows.append((metric, f"{value:.0f}", f"±{error:.0f}"))
+    for metric in estimates.index[estimates.index.str.startswith('Distinct')]:
+        value, error = estimate(metric)
+        rows.append((metric, f"{value:.0f}", f"±{error:.0f}"))
+    
+    kpi_metrics = pd.DataFrame(rows, columns=['Metric', 'Value', 'Error'])
+    atomic_write_csv(kpi_metrics, f'{powerbi_folder}/KPI_Metrics.csv')
+    print(f"  ✓ Approximate KPIs saved to {powerbi_folder}/KPI_Metrics.csv")
+    
+    return kpi_metrics
+
+
+def prepare_powerbi_data(customer_df, product_df, sales_df, refresh_customers=True, refresh_products=True,
+                         approximate=False):
+    """Prepare and save data for Power BI dashboard
+    
+    Row-level customer/product exports are only rewritten when their
+    refresh flag is set; KPIs and summaries are always recomputed.
+    With approximate=True, KPIs, distributions and aggregated summaries
+    come from the persisted sketches.
+    """
+    print("\nPreparing dashboard data...")
+    
+    # Create PowerBI_Data folder if it doesn't exist
+    powerbi_folder = 'website/PowerBI_Data'
+    if not os.path.exists(powerbi_folder):
+        os.makedirs(powerbi_folder)
+    
+    # 1-3. Row-level analysis files
+    customer_summary = export_customer_analysis(customer_df, powerbi_folder, refresh_customers)
+    product_summary = export_product_analysis(product_df, powerbi_folder, refresh_products)
+    export_sales_forecast(sales_df, powerbi_folder)
+    
+    # 4-7. Combined KPIs, distributions and summaries
+    export_dashboard_rollups(customer_summary, product_summary, sales_df, powerbi_folder, approximate)
     
     print(f"  ✓ Dashboard data saved to {powerbi_folder}/")
 
 
-def main():
-    """Run all prediction models"""
+def refresh_daily_inputs(input_csv='Predictions_Customer.csv', rollup_path='models/sales_rollup.pkl',
+                         activity_path='models/customer_activity.pkl', data_path='',
+                         partition_root='data/partitions', days=90):
+    """Daily refresh of the sales rollups and customer inputs from the latest orders only
+    
+    Restates the saved sales rollups from their watermark. The saved
+    customer activity totals are brought forward with the orders since
+    their watermark, and every customer master feature in the customer
+    prediction input is rewritten at the new analysis date, so recency,
+    all-time and last-N-days features never mix dates. Customers whose
+    first order is newer than the saved totals are appended. The following
+    scoring run then rescores just the customers whose features changed.
+    With a partitioned dataset (partition_root) each step reads only the
+    latest monthly partitions; without saved totals the first run reads
+    the full history once.
+    """
+    print("\nRefreshing daily sales rollups and customer features...")
+    preprocessor = DataPreprocessor(
+        data_path=data_path, partition_root=partition_root if os.path.isdir(partition_root or '') else None
+    )
+    
+    if os.path.exists(rollup_path):
+        rollup = SalesRollup().load(rollup_path)
+        preprocessor.refresh_sales_rollup(rollup)
+        rollup.save(rollup_path)
+    
+    activity = CustomerActivity().load(activity_path) if os.path.exists(activity_path) else CustomerActivity()
+    known = activity.totals.index if activity.totals is not None else None
+    features = preprocessor.refresh_customer_activity(activity, days).set_index('customer_unique_id')
+    activity.save(activity_path)
+    
+    customers = pd.read_csv(input_csv)
+    feature_columns = [col for col in features.columns if col in customers.columns]
+    if 'customer_unique_id' not in customers.columns or not feature_columns:
+        print(f"  {input_csv} has no customer feature columns; skipped")
+        return customers
+    
+    ids = customers['customer_unique_id'].astype(str)
+    found = ids.isin(features.index).to_numpy()
+    changed = np.zeros(len(customers), dtype=bool)
+    for col in feature_columns:
+        refreshed = np.where(found, features[col].reindex(ids).to_numpy(), customers[col].to_numpy())
+        changed |= ~np.isclose(refreshed.astype(np.float64), customers[col].to_numpy(dtype=np.float64), equal_nan=True)
+        customers[col] = refreshed
+    
+    # Customers first seen since the saved totals
+    new_ids = features.index[:0] if known is None else features.index.difference(known).difference(ids)
+    if len(new_ids):
+        customers = pd.concat([customers, features.loc[new_ids, feature_columns].reset_index()], ignore_index=True)
+    
+    if changed.any() or len(new_ids):
+        atomic_write_csv(customers, input_csv)
+    print(f"  ✓ Features refreshed for {int(changed.sum())} customers, {len(new_ids)} new customers added "
+          f"to {input_csv}")
+    return customers
+
+
+def refresh_product_risk_table(product_features=None, model_version=None,
+                               table_path='models/product_risk_table.pkl',
+                               model_path='models/return_model.pkl'):
+    """Bring the precomputed product risk table up to date
+    
+    Products are rescored when the return model version differs from the
+    table's, or when their row in product_features changed. If
+    model_version (e.g. from the product scoring run) matches the table and
+    no product features are given, the return model is not even loaded.
+    """
+    if not os.path.exists(table_path):
+        return None
+    
+    risk_table = ProductRiskTable()
+    risk_table.load(table_path)
+    if product_features is None and model_version is not None and model_version == risk_table.model_version:
+        return risk_table.table
+    
+    return_model = ReturnPredictor()
+    return_model.load_model(model_path)
+    risk_table.refresh(product_features, return_model)
+    if risk_table.rows_rescored > 0:
+        risk_table.save(table_path)
+    
+    return risk_table.table
+
+
+def export_product_risk_rollup(table_path='models/product_risk_table.pkl',
+                               output_csv='website/PowerBI_Data/Product_Risk_Rollup.csv'):
+    """Write category rollups from the precomputed product risk table"""
+    if not os.path.exists(table_path):
+        return None
+    
+    risk_table = ProductRiskTable()
+    risk_table.load(table_path)
+    rollup = risk_table.category_rollup()
+    atomic_write_csv(rollup, output_csv)
+    print(f"  ✓ Product risk rollup saved to {output_csv}")
+    
+    return rollup
+
+
+def export_regional_tables(cube_path='models/regional_cube.pkl', powerbi_folder='website/PowerBI_Data'):
+    """Write the seller / state / month tables from the precomputed regional cube"""
+    if not os.path.exists(cube_path):
+        return None
+    
+    return RegionalCube().load(cube_path).export_tables(powerbi_folder)
+
+
+def export_sales_history(rollup_path='models/sales_rollup.pkl', powerbi_folder='website/PowerBI_Data'):
+    """Write the daily / weekly / monthly sales history from the materialized rollups"""
+    if not os.path.exists(rollup_path):
+        return None
+    
+    return SalesRollup().load(rollup_path).export_tables(powerbi_folder)
+
+
+def export_feature_importances(powerbi_folder='website/PowerBI_Data'):
+    """Write the global feature importances cached in the churn and return models"""
+    for name, model_class, model_path in [('Churn', ChurnPredictor, 'models/churn_model.pkl'),
+                                          ('Return', ReturnPredictor, 'models/return_model.pkl')]:
+        model = model_class()
+        model.load_model(model_path)
+        if model.global_importance is None:
+            continue
+        importance = model.global_importance.rename_axis('Feature').reset_index(name='Importance')
+        atomic_write_csv(importance, f'{powerbi_folder}/{name}_Feature_Importance.csv')
+    print(f"  ✓ Feature importances saved to {powerbi_folder}/")
+
+
+def main(approximate=False, daily=False):
+    """Run all prediction models
+    
+    With approximate=True, dashboard KPIs and histograms are answered from
+    persisted sketches (python predict.py --approximate). With daily=True,
+    the sales rollups and recent customer features are first refreshed
+    from the latest orders (python predict.py --daily).
+    """
     print("\n" + "="*60)
     print("BI DASHBOARD - PREDICTION PIPELINE")
     print("="*60)
@@ -200,6 +708,10 @@ def main():
     
     # Run predictions
     try:
+        # 0. Daily refresh of the windowed inputs
+        if daily:
+            refresh_daily_inputs()
+        
         # 1. Customer predictions
         customer_df = predict_customer_data()
         
@@ -209,14 +721,29 @@ def main():
         # 3. Sales forecast
         sales_df = predict_sales_forecast()
         
-        # 4. Prepare data for Power BI Dashboard
-        prepare_powerbi_data(customer_df, product_df, sales_df)
+        # 4. Prepare data for Power BI Dashboard (row-level exports only if scores changed)
+        prepare_powerbi_data(
+            customer_df, product_df, sales_df,
+            refresh_customers=customer_df.attrs.get('outputs_changed', True)
+                or not os.path.exists('website/PowerBI_Data/Customer_Analysis.csv'),
+            refresh_products=product_df.attrs.get('outputs_changed', True)
+                or not os.path.exists('website/PowerBI_Data/Product_Analysis.csv'),
+            approximate=approximate
+        )
+        refresh_product_risk_table(model_version=product_df.attrs.get('model_version'))
+        export_product_risk_rollup()
+        export_regional_tables()
+        export_sales_history()
+        export_feature_importances()
         
         # Summary
         print("\n" + "="*60)
         print("✅ PREDICTION COMPLETE")
         print("="*60)
         print(f"\n{len(customer_df)} customers analyzed | {len(product_df)} products analyzed | {len(sales_df)}-day forecast generated")
+        skipped_customers = len(customer_df) - customer_df.attrs.get('rows_rescored', len(customer_df))
+        skipped_products = len(product_df) - product_df.attrs.get('rows_rescored', len(product_df))
+        print(f"Unchanged rows skipped: {skipped_customers} customers | {skipped_products} products")
         print(f"\nAll predictions saved to:")
         print(f"  • Root directory (Predictions_*.csv)")
         print(f"  • Dashboard folder (website/PowerBI_Data/*.csv)")
@@ -229,4 +756,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(approximate='--approximate' in sys.argv[1:], daily='--daily' in sys.argv[1:])
@@ -0,0 +1,112 @@
+"""
+Prediction Cache for incremental scoring
+Remembers the last scores for each distinct feature row so unchanged rows
+are not rescored on the next refresh
+"""
+
+import pandas as pd
+import numpy as np
+import pickle
+import os
+
+
+class PredictionCache:
+    def __init__(self, feature_columns, output_columns, filepath):
+        """Initialize a cache for one prediction output file"""
+        self.feature_columns = feature_columns
+        self.output_columns = output_columns
+        self.filepath = filepath
+        self.model_version = None
+        self.cached = None
+        
+    def load(self):
+        """Load the previous run's fingerprints and scores, if any"""
+        if not os.path.exists(self.filepath):
+            return self
+        
+        with open(self.filepath, 'rb') as f:
+            data = pickle.load(f)
+        
+        self.model_version = data['model_version']
+        self.cached = data['cached']
+        return self
+    
+    def fingerprint(self, df):
+        """Hash each row's model input features
+        
+        Numeric features are cast to float64 and rounded so that int/float
+        dtype changes and CSV round-trip noise do not count as changes.
+        """
+        features = df[self.feature_columns].copy()
+        for col in features.columns:
+            if pd.api.types.is_numeric_dtype(features[col]):
+                features[col] = features[col].astype(np.float64).round(9)
+        return pd.util.hash_pandas_object(features, index=False).values
+    
+    def lookup(self, df, model_version):
+        """Return (fingerprints, stale_mask, cached_outputs) for the rows of df
+        
+        stale_mask is True for rows that must be rescored: new or changed
+        features, or any row when the model version or outputs changed.
+        """
+        hashes = self.fingerprint(df)
+        
+        if (self.cached is None or self.model_version != model_version
+                or not set(self.output_columns) <= set(self.cached.columns)):
+            return hashes, np.ones(len(df), dtype=bool), None
+        
+        positions = self.cached.index.get_indexer(hashes)
+        stale_mask = positions < 0
+        cached_outputs = self.cached.iloc[positions[~stale_mask]].reset_index(drop=True)
+        
+        return hashes, stale_mask, cached_outputs
+    
+    def update(self, hashes, outputs, model_version):
+        """Replace the cache with this run's fingerprints and scores"""
+        outputs = outputs[self.output_columns].copy()
+        outputs.index = pd.Index(hashes, name='feature_hash')
+        self.cached = outputs[~outputs.index.duplicated()]
+        self.model_version = model_version
+    
+    def save(self):
+        """Save fingerprints and scores"""
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        
+        with open(self.filepath, 'wb') as f:
+            pickle.dump({
+                'model_version': self.model_version,
+                'cached': self.cached
+            }, f)
+    
+    def score(self, df, model_version, score_fn):
+        """Score df, calling score_fn only on rows whose features or model changed
+        
+        score_fn takes a DataFrame and returns a DataFrame of output_columns
+        aligned with its rows. Returns (outputs, rows_rescored).
+        """
+        hashes, stale_mask, cached_outputs = self.lookup(df, model_version)
+        rows_rescored = int(stale_mask.sum())
+        
+        fresh = score_fn(df[stale_mask]) if rows_rescored > 0 else None
+        
+        outputs = pd.DataFrame(index=range(len(df)))
+        for col in self.output_columns:
+            if fresh is None:
+                values = cached_outputs[col].to_numpy()
+            else:
+                values = np.empty(len(df), dtype=np.asarray(fresh[col]).dtype)
+                values[stale_mask] = fresh[col].to_numpy()
+                if cached_outputs is not None:
+                    values[~stale_mask] = cached_outputs[col].to_numpy()
+            outputs[col] = values
+        
+        self.update(hashes, outputs, model_version)
+        self.save()
+        
+        return outputs, rows_rescored
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Prediction Cache Module")
+    print("Use this module to skip rescoring unchanged rows")
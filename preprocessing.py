@@ -6,96 +6,355 @@ Handles data loading, cleaning, and feature engineering
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from customer_kernels import sort_and_offsets, customer_segment_reductions
+from imputation import MedianImputer
+from dimensions import Dimensions
+from sales_rollup import SalesRollup
+from customer_activity import CustomerActivity
+from order_partitions import OrderPartitionStore, PARTITIONED_TABLES, PARTITION_COLUMN
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# 32-char hex id columns, dictionary-encoded to int32 codes in compact mode
+ID_COLUMNS = ['order_id', 'customer_id', 'customer_unique_id', 'product_id', 'seller_id', 'review_id']
+
+# Fixed width (bytes) compact reads parse ids into, so no Python strings are built
+ID_WIDTH = 64
+
+# Low-cardinality string columns stored as categoricals in compact mode
+CATEGORICAL_COLUMNS = [
+    'order_status', 'customer_city', 'customer_state', 'payment_type', 'product_category_name'
+]
+
+# Whole-day counts stored as nullable small ints in compact mode
+DAY_COUNT_COLUMNS = ['delivery_time_days', 'delivery_lateness_days']
+
+DATE_COLUMNS = [
+    'order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date',
+    'order_delivered_customer_date', 'order_estimated_delivery_date',
+    'review_creation_date', 'review_answer_timestamp', 'shipping_limit_date'
+]
+
+# Free-text columns that clean_data drops anyway
+DROPPED_COLUMNS = ['review_comment_title', 'review_comment_message']
 
 
 class DataPreprocessor:
-    def __init__(self, data_path=''):
-        """Initialize the preprocessor with data path"""
+    def __init__(self, data_path='', compact=False, feature_engine='kernels', partition_root=None):
+        """Initialize the preprocessor with data path
+        
+        With compact=True, ids are dictionary-encoded to int32 codes,
+        strings become categoricals and measures are downcast.
+        feature_engine selects how customer features are computed:
+        'kernels' (fused sorted-segment reductions) or 'pandas' (groupby).
+        With partition_root, orders, items, payments and reviews are read
+        from a partitioned dataset (see order_partitions.py) instead of
+        the flat CSVs, and time-bounded loads skip unneeded months.
+        """
+        if feature_engine not in ('kernels', 'pandas'):
+            raise ValueError("feature_engine must be 'kernels' or 'pandas'")
         self.data_path = data_path
+        self.partitions = OrderPartitionStore(partition_root) if partition_root else None
+        self.compact = compact
+        self.feature_engine = feature_engine
         self.df = None
         self.customer_master_df = None
+        self.imputer = MedianImputer()
+        self.dimensions = Dimensions(data_path)
+        self.sales_rollup = None
+        self.id_dictionary = {}
+        self._id_chunks = {}
+        self.CHUNK_ROWS = 50000
         self.CHURN_THRESHOLD_DAYS = 180
         self.analysis_date = None
         
-    def load_data(self):
-        """Load all CSV files and merge them"""
-        print("Loading datasets...")
+    def _read_csv(self, name):
+        """Read one Olist CSV
         
-        # Load the core CSV files
-        customers = pd.read_csv(f'{self.data_path}olist_customers_dataset.csv')
-        orders = pd.read_csv(f'{self.data_path}olist_orders_dataset.csv')
-        order_items = pd.read_csv(f'{self.data_path}olist_order_items_dataset.csv')
-        order_payments = pd.read_csv(f'{self.data_path}olist_order_payments_dataset.csv')
-        order_reviews = pd.read_csv(f'{self.data_path}olist_order_reviews_dataset.csv')
-        products = pd.read_csv(f'{self.data_path}olist_products_dataset.csv')
+        In compact mode the file is read in chunks and each chunk is compacted
+        (ids -> chunk codes, strings -> categoricals, dates parsed,
+        numbers downcast) before the next is parsed, so raw strings never
+        exist for the whole file at once.
+        """
+        filepath = f'{self.data_path}olist_{name}_dataset.csv'
+        if not self.compact:
+            return pd.read_csv(filepath)
         
-        # Merge into a single transaction-level dataframe
-        self.df = orders.merge(customers, on='customer_id')
-        self.df = self.df.merge(order_payments, on='order_id')
-        self.df = self.df.merge(order_reviews, on='order_id')
-        self.df = self.df.merge(order_items, on='order_id')
-        self.df = self.df.merge(products, on='product_id')
+        return self._concat_compact_chunks(
+            self._compact_chunk(chunk)
+            for chunk in pd.read_csv(
+                filepath, chunksize=self.CHUNK_ROWS, usecols=lambda col: col not in DROPPED_COLUMNS,
+                dtype={col: f'S{ID_WIDTH}' for col in ID_COLUMNS}
+            )
+        )
+    
+    def _read_table(self, name, start=None):
+        """Read one table from the partitioned dataset if it holds it, else from CSV
+        
+        Partitioned tables only read the months overlapping [start, ...).
+        """
+        if self.partitions is None or name not in PARTITIONED_TABLES:
+            return self._read_csv(name)
+        if not self.compact or not self.partitions.prune(name, start=start):
+            df = self.partitions.read(name, start=start)
+            return self._concat_compact_chunks([self._compact_chunk(df)]) if self.compact else df
+        
+        # Each part is compacted before the next one is read
+        return self._concat_compact_chunks(
+            self._compact_chunk(chunk) for chunk in self.partitions.iter_parts(name, start=start)
+        )
+    
+    def _concat_compact_chunks(self, chunks):
+        """Concatenate compacted chunks with aligned categories and encoded ids"""
+        chunks = list(chunks)
+        
+        # Align categories across chunks so concat keeps categorical dtypes
+        for col in chunks[0].columns:
+            if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+                categories = pd.api.types.union_categoricals([c[col] for c in chunks]).categories
+                for chunk in chunks:
+                    chunk[col] = chunk[col].cat.set_categories(categories)
+        
+        return self._encode_ids(pd.concat(chunks, ignore_index=True))
+    
+    def _compact_chunk(self, chunk):
+        """Convert one raw CSV chunk to compact dtypes"""
+        chunk = chunk.drop(columns=DROPPED_COLUMNS, errors='ignore')
+        
+        for col in chunk.columns:
+            if col in ID_COLUMNS:
+                chunk[col] = self._chunk_id_codes(col, chunk[col])
+            elif col in CATEGORICAL_COLUMNS:
+                chunk[col] = chunk[col].astype('category')
+            elif col in DATE_COLUMNS:
+                chunk[col] = pd.to_datetime(chunk[col], errors='coerce')
+            elif pd.api.types.is_float_dtype(chunk[col]):
+                chunk[col] = chunk[col].astype(np.float32)
+            elif pd.api.types.is_integer_dtype(chunk[col]):
+                chunk[col] = pd.to_numeric(chunk[col], downcast='integer')
+        
+        return chunk
+    
+    def _chunk_id_codes(self, col, values):
+        """Factorize one chunk's ids, offset past every id chunk already read
+        
+        Ids are handled as fixed-width UTF-8 bytes (as parsed from the CSV)
+        and hashed to 64 bits, so no Python objects are built. The chunk's
+        distinct ids are kept as hashes plus bytes; codes point into the
+        concatenation of the column's id chunks until _encode_ids() merges
+        them into the shared dictionary once the table is read.
+        """
+        values = values.to_numpy()
+        if values.dtype.kind != 'S':
+            # Partitioned parts hold decoded strings
+            values = pd.Series(values, dtype=object).fillna('').to_numpy()
+            try:
+                values = values.astype(f'S{ID_WIDTH}')
+            except UnicodeEncodeError:
+                values = np.char.encode(values.astype(str), 'utf-8').astype(f'S{ID_WIDTH}')
+        values = np.ascontiguousarray(values, dtype=f'S{ID_WIDTH}')
+        words = values.view(np.uint64).reshape(len(values), ID_WIDTH // 8)
+        if (words[:, -1] >> 56).any():
+            raise ValueError(f"{col} values must be shorter than {ID_WIDTH} bytes")
+        
+        present = values != b''
+        hashes = pd.util.hash_pandas_object(pd.DataFrame(words[present]), index=False).to_numpy()
+        present_codes, unique_hashes = pd.factorize(hashes)
+        first = np.unique(present_codes, return_index=True)[1]
+        id_bytes = values[present][first]
+        width = int(np.char.str_len(id_bytes).max()) if len(id_bytes) else 1
+        
+        chunks = self._id_chunks.setdefault(col, [])
+        offset = sum(len(hashes) for hashes, _ in chunks)
+        chunks.append((np.asarray(unique_hashes), id_bytes.astype(f'S{width}')))
+        
+        codes = np.full(len(values), -1, dtype=np.int32)
+        codes[present] = present_codes + offset
+        return codes
+    
+    def _encode_ids(self, table):
+        """Map a table's chunk id codes to int32 codes from one shared dictionary per id column
+        
+        The column's dictionary and the table's chunk hashes are factorized
+        in one call, so each distinct id keeps its first code and codes from
+        earlier tables and loads stay valid. Every table is encoded against
+        the same dictionary, so merges run on integer keys and codes can be
+        decoded after aggregation.
+        """
+        for col in ID_COLUMNS:
+            if col not in table.columns:
+                continue
+            chunks = self._id_chunks[col]
+            codes, unique_hashes = pd.factorize(np.concatenate([hashes for hashes, _ in chunks]))
+            first = np.unique(codes, return_index=True)[1]
+            self.id_dictionary[col] = np.concatenate([id_bytes for _, id_bytes in chunks])[first]
+            self._id_chunks[col] = [(np.asarray(unique_hashes), self.id_dictionary[col])]
+            
+            chunk_codes = table[col].to_numpy()
+            table[col] = np.where(chunk_codes < 0, -1, codes.astype(np.int32)[chunk_codes])
+        return table
+    
+    def decode_ids(self, col, codes):
+        """Map int32 id codes back to their original id strings"""
+        if col not in self.id_dictionary:
+            return codes
+        # Decoding bytes objects directly skips np.char's fixed-width unicode copy
+        id_bytes = self.id_dictionary[col][np.asarray(codes, dtype=np.int64)]
+        return np.array([value.decode('utf-8') for value in id_bytes.tolist()], dtype=object)
+    
+    def load_data(self, start=None):
+        """Load all CSV files and merge them
+        
+        With start, only orders purchased at or after start are kept; with a
+        partitioned dataset only the overlapping months are read at all.
+        """
+        print("Loading datasets...")
+        self.df = self._load_frame(start)
+        self.sales_rollup = None
         
         print(f"Data loaded successfully! Shape: {self.df.shape}")
         return self.df
     
+    def _load_frame(self, start=None):
+        """Read and merge the tables into a transaction-level frame (self.df untouched)"""
+        # Load the core CSV files
+        customers = self._read_csv('customers')
+        orders = self._read_table('orders', start)
+        order_items = self._read_table('order_items', start)
+        order_payments = self._read_table('order_payments', start)
+        order_reviews = self._read_table('order_reviews', start)
+        products = self._read_csv('products')
+        
+        if start is not None:
+            orders = orders[OrderPartitionStore.time_mask(orders[PARTITION_COLUMN], start)]
+        if self.partitions is not None:
+            scanned = self.partitions.scan_report().get('orders')
+            if scanned:
+                print(f"Read {scanned['read']} of {scanned['total']} order partitions")
+        
+        # Merge into a single transaction-level dataframe
+        df = orders.merge(customers, on='customer_id')
+        df = df.merge(order_payments, on='order_id')
+        df = df.merge(order_reviews, on='order_id')
+        df = df.merge(order_items, on='order_id')
+        df = df.merge(products, on='product_id')
+        del customers, orders, order_items, order_payments, order_reviews, products
+        return df
+    
     def clean_data(self):
         """Handle missing values and convert data types"""
         print("\nCleaning data...")
         
-        # Fill missing product categories
-        self.df['product_category_name'] = self.df['product_category_name'].fillna('Unknown')
-        
-        # Fill missing product weight with median
-        median_weight = self.df['product_weight_g'].median()
-        self.df['product_weight_g'] = self.df['product_weight_g'].fillna(median_weight)
+        # Fill missing product category and numerical columns with the
+        # training medians (all computed in one pass, kept for scoring)
+        self.imputer.fit_transform(self.df, inplace=True)
         
         # Drop columns with too many missing values
-        self.df = self.df.drop(columns=['review_comment_title', 'review_comment_message'], errors='ignore')
+        self.df = self.df.drop(columns=DROPPED_COLUMNS, errors='ignore')
         
         # Convert date columns
-        date_columns = [
-            'order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date',
-            'order_delivered_customer_date', 'order_estimated_delivery_date',
-            'review_creation_date', 'review_answer_timestamp', 'shipping_limit_date'
-        ]
-        
-        for col in date_columns:
-            self.df[col] = pd.to_datetime(self.df[col], errors='coerce')
-        
-        # Fill remaining product-related numerical columns
-        cols_to_fill = [
-            'product_name_lenght', 'product_description_lenght', 'product_photos_qty',
-            'product_length_cm', 'product_height_cm', 'product_width_cm'
-        ]
-        
-        for col in cols_to_fill:
-            median_val = self.df[col].median()
-            self.df[col] = self.df[col].fillna(median_val)
+        self._parse_dates(self.df)
         
         print("Data cleaning complete!")
         return self.df
     
+    @staticmethod
+    def _parse_dates(df):
+        """Convert the date columns of a transaction frame in place"""
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+        return df
+    
+    @staticmethod
+    def _add_order_timings(df):
+        """Add delivery time, delivery lateness and approval time columns in place"""
+        df['delivery_time_days'] = (
+            df['order_delivered_customer_date'] - df['order_purchase_timestamp']
+        ).dt.days
+        
+        df['delivery_lateness_days'] = (
+            df['order_delivered_customer_date'] - df['order_estimated_delivery_date']
+        ).dt.days
+        
+        df['approval_time_hours'] = (
+            df['order_approved_at'] - df['order_purchase_timestamp']
+        ).dt.total_seconds() / 3600
+        return df
+    
     def engineer_features(self):
         """Create advanced features for modeling"""
         print("\nEngineering features...")
         
         # Calculate delivery and approval metrics
-        self.df['delivery_time_days'] = (
-            self.df['order_delivered_customer_date'] - self.df['order_purchase_timestamp']
-        ).dt.days
+        self._add_order_timings(self.df)
         
-        self.df['delivery_lateness_days'] = (
-            self.df['order_delivered_customer_date'] - self.df['order_estimated_delivery_date']
-        ).dt.days
+        print("Feature engineering complete!")
+        return self.df
+    
+    def enrich_dimensions(self):
+        """Add seller, region and English category attributes from the dimension tables
         
-        self.df['approval_time_hours'] = (
-            self.df['order_approved_at'] - self.df['order_purchase_timestamp']
-        ).dt.total_seconds() / 3600
+        Each dimension is indexed once and the transaction rows gather their
+        attributes by array take (ids stay int codes in compact mode).
+        """
+        if self.df is None:
+            return None
+        print("\nEnriching with seller, geography and category dimensions...")
+        self.dimensions.load()
+        self.dimensions.enrich(self.df, self.id_dictionary if self.compact else None)
+        return self.df
+    
+    def compact_frame(self):
+        """Store strings as categoricals and downcast numeric measures"""
+        print("\nCompacting transaction frame...")
+        before = self.df.memory_usage(deep=True).sum()
         
-        print("Feature engineering complete!")
+        for col in CATEGORICAL_COLUMNS:
+            if col in self.df.columns:
+                self.df[col] = self.df[col].astype('category')
+        
+        for col in DAY_COUNT_COLUMNS:
+            if col in self.df.columns:
+                self.df[col] = self.df[col].round().astype('Int16')
+        
+        for col in self.df.columns:
+            if col in ID_COLUMNS or col in DAY_COUNT_COLUMNS:
+                continue
+            if pd.api.types.is_float_dtype(self.df[col]):
+                self.df[col] = self.df[col].astype(np.float32)
+            elif pd.api.types.is_integer_dtype(self.df[col]):
+                self.df[col] = pd.to_numeric(self.df[col], downcast='integer')
+        
+        after = self.df.memory_usage(deep=True).sum()
+        print(f"Transaction frame compacted: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
         return self.df
     
+    def memory_report(self, df=None):
+        """Per-column dtype and memory usage (plus process peak RSS when available)"""
+        df = self.df if df is None else df
+        usage = df.memory_usage(deep=True, index=False)
+        
+        report = pd.DataFrame({
+            'column': usage.index,
+            'dtype': [str(df[col].dtype) for col in usage.index],
+            'megabytes': (usage.values / 1e6).round(3)
+        }).sort_values('megabytes', ascending=False).reset_index(drop=True)
+        
+        print(report.to_string(index=False))
+        print(f"Total: {usage.sum() / 1e6:.1f} MB")
+        
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"Peak RSS: {peak_mb:.1f} MB")
+        
+        return report
+    
     def create_customer_master(self):
         """Create customer-level aggregated dataframe"""
         print("\nCreating customer master dataframe...")
@@ -103,6 +362,44 @@ class DataPreprocessor:
         # Set analysis date
         self.analysis_date = self.df['order_purchase_timestamp'].max() + pd.DateOffset(days=1)
         
+        if self.feature_engine == 'kernels':
+            self.customer_master_df = self._customer_features_kernels()
+        else:
+            self.customer_master_df = self._customer_features_pandas()
+        
+        # Compact mode: decode customer ids and widen aggregates back to float64
+        if self.compact:
+            self.customer_master_df['customer_unique_id'] = self.decode_ids(
+                'customer_unique_id', self.customer_master_df['customer_unique_id']
+            )
+            for col in self.customer_master_df.columns:
+                if col == 'customer_unique_id':
+                    continue
+                if (pd.api.types.is_extension_array_dtype(self.customer_master_df[col])
+                        or self.customer_master_df[col].dtype == np.float32):
+                    self.customer_master_df[col] = self.customer_master_df[col].astype(np.float64)
+                elif pd.api.types.is_integer_dtype(self.customer_master_df[col]):
+                    self.customer_master_df[col] = self.customer_master_df[col].astype(np.int64)
+        
+        # Fill NaNs
+        self.customer_master_df.fillna(0, inplace=True)
+        
+        # Create frequency ratio
+        self.customer_master_df['freq_ratio_90d_alltime'] = (
+            self.customer_master_df['frequency_last_90_days'] / 
+            (self.customer_master_df['frequency'] + 1)
+        )
+        
+        # Create churn label
+        self.customer_master_df['churn'] = (
+            self.customer_master_df['recency'] > self.CHURN_THRESHOLD_DAYS
+        ).astype(int)
+        
+        print(f"Customer master dataframe created! Shape: {self.customer_master_df.shape}")
+        return self.customer_master_df
+    
+    def _customer_features_pandas(self):
+        """Reference customer features via pandas groupby"""
         # Create feedback features
         feedback_features = self.df.groupby('customer_unique_id').agg(
             number_of_low_reviews=('review_score', lambda s: (s <= 2).sum())
@@ -134,7 +431,7 @@ class DataPreprocessor:
         ).reset_index()
         
         # Create master dataframe with all features
-        self.customer_master_df = self.df.groupby('customer_unique_id').agg(
+        customer_master_df = self.df.groupby('customer_unique_id').agg(
             recency=('order_purchase_timestamp', lambda date: (self.analysis_date - date.max()).days),
             frequency=('order_id', 'nunique'),
             monetary=('payment_value', 'sum'),
@@ -145,39 +442,209 @@ class DataPreprocessor:
         ).reset_index()
         
         # Merge all features
-        self.customer_master_df = self.customer_master_df.merge(
+        customer_master_df = customer_master_df.merge(
             feedback_features, on='customer_unique_id', how='left'
         )
-        self.customer_master_df = self.customer_master_df.merge(
+        customer_master_df = customer_master_df.merge(
             cadence_stats, on='customer_unique_id', how='left'
         )
-        self.customer_master_df = self.customer_master_df.merge(
+        customer_master_df = customer_master_df.merge(
             recent_behavior, on='customer_unique_id', how='left'
         )
         
-        # Fill NaNs
-        self.customer_master_df.fillna(0, inplace=True)
+        return customer_master_df
+    
+    def _customer_features_kernels(self):
+        """Customer features via one fused pass over time-sorted customer segments"""
+        if self.compact:
+            customer_codes = self.df['customer_unique_id'].to_numpy(dtype=np.int64)
+            customer_ids = None
+        else:
+            customer_codes, customer_ids = pd.factorize(self.df['customer_unique_id'], sort=True)
+        order_codes = pd.factorize(self.df['order_id'])[0]
+        purchase_ns = self.df['order_purchase_timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
         
-        # Create frequency ratio
-        self.customer_master_df['freq_ratio_90d_alltime'] = (
-            self.customer_master_df['frequency_last_90_days'] / 
-            (self.customer_master_df['frequency'] + 1)
+        sort_order, offsets = sort_and_offsets(customer_codes, purchase_ns, order_codes)
+        
+        def sorted_column(col):
+            return self.df[col].to_numpy(dtype=np.float64, na_value=np.nan)[sort_order]
+        
+        window_start = self.analysis_date - pd.DateOffset(days=90)
+        features = customer_segment_reductions(
+            offsets,
+            purchase_ns[sort_order],
+            order_codes[sort_order],
+            sorted_column('payment_value'),
+            sorted_column('review_score'),
+            sorted_column('delivery_time_days'),
+            sorted_column('delivery_lateness_days'),
+            sorted_column('approval_time_hours'),
+            pd.Timestamp(self.analysis_date).value,
+            pd.Timestamp(window_start).value,
+            # The NumPy reductions skip loading Numba's JIT runtime (~50 MB)
+            use_numba=not self.compact
         )
         
-        # Create churn label
-        self.customer_master_df['churn'] = (
-            self.customer_master_df['recency'] > self.CHURN_THRESHOLD_DAYS
-        ).astype(int)
+        segment_codes = customer_codes[sort_order][offsets[:-1]]
+        customer_master_df = pd.DataFrame({
+            'customer_unique_id': segment_codes if customer_ids is None else customer_ids[segment_codes],
+            'recency': features['recency'],
+            'frequency': features['frequency'],
+            'monetary': features['monetary'],
+            'avg_review_score': features['avg_review_score'],
+            'avg_delivery_time': features['avg_delivery_time'],
+            'avg_delivery_lateness': features['avg_delivery_lateness'],
+            'avg_approval_hours': features['avg_approval_hours'],
+            'number_of_low_reviews': features['number_of_low_reviews'],
+            'has_left_bad_review': (features['number_of_low_reviews'] > 0).astype(int),
+            'avg_days_between_purchases': features['avg_days_between_purchases'],
+            'std_dev_days_between_purchases': features['std_dev_days_between_purchases'],
+            'frequency_last_90_days': features['frequency_last_90_days'],
+            'monetary_last_90_days': features['monetary_last_90_days']
+        })
         
-        print(f"Customer master dataframe created! Shape: {self.customer_master_df.shape}")
-        return self.customer_master_df
+        return customer_master_df
+    
+    def validate_customer_master(self, rtol=1e-6):
+        """Compare kernel customer features against the pandas reference
+        
+        Returns the max absolute difference per feature column.
+        """
+        kernel_df = self._customer_features_kernels().fillna(0)
+        pandas_df = self._customer_features_pandas().fillna(0)
+        
+        kernel_df = kernel_df.sort_values('customer_unique_id').reset_index(drop=True)
+        pandas_df = pandas_df.sort_values('customer_unique_id').reset_index(drop=True)
+        
+        if not np.array_equal(kernel_df['customer_unique_id'].to_numpy(), pandas_df['customer_unique_id'].to_numpy()):
+            raise AssertionError("Kernel and pandas customer ids differ")
+        
+        feature_columns = [c for c in pandas_df.columns if c != 'customer_unique_id']
+        max_abs_diff = (
+            kernel_df[feature_columns].astype(float) - pandas_df[feature_columns].astype(float)
+        ).abs().max()
+        
+        pd.testing.assert_frame_equal(
+            kernel_df[pandas_df.columns], pandas_df, check_dtype=False, rtol=rtol
+        )
+        print("Kernel customer features match the pandas reference")
+        return max_abs_diff
+    
+    def latest_purchase_time(self):
+        """Latest order purchase time, from partition statistics when available"""
+        if self.partitions is not None:
+            return self.partitions.time_bounds()[1]
+        if self.df is not None:
+            return pd.to_datetime(self.df[PARTITION_COLUMN]).max()
+        orders = pd.read_csv(f'{self.data_path}olist_orders_dataset.csv', usecols=[PARTITION_COLUMN])
+        return pd.to_datetime(orders[PARTITION_COLUMN], errors='coerce').max()
+    
+    def recent_customer_features(self, days=90):
+        """Last-N-days customer features from the recent orders only
+        
+        Loads just the window (a 90-day refresh reads about 3 monthly
+        partitions) into a separate frame, leaving self.df, and returns
+        frequency_last_90_days and monetary_last_90_days per customer as of
+        self.analysis_date (the customer master's) or, without a master,
+        the day after the latest purchase. The window ends at the analysis
+        date, so a loaded customer master is updated in place without
+        mixing in orders newer than its other features; to move every
+        feature to a later date use refresh_customer_activity.
+        """
+        analysis_date = self.analysis_date
+        if analysis_date is None:
+            analysis_date = self.latest_purchase_time() + pd.DateOffset(days=1)
+        window_start = analysis_date - pd.DateOffset(days=days)
+        
+        recent_df = self._load_frame(start=window_start)
+        purchase_time = pd.to_datetime(recent_df[PARTITION_COLUMN], errors='coerce')
+        recent_df = recent_df[(purchase_time >= window_start) & (purchase_time < analysis_date)]
+        
+        recent_behavior = recent_df.groupby('customer_unique_id', observed=True).agg(
+            frequency_last_90_days=('order_id', 'nunique'),
+            monetary_last_90_days=('payment_value', 'sum')
+        ).reset_index()
+        recent_behavior['monetary_last_90_days'] = recent_behavior['monetary_last_90_days'].astype(np.float64)
+        if self.compact:
+            recent_behavior['customer_unique_id'] = self.decode_ids(
+                'customer_unique_id', recent_behavior['customer_unique_id']
+            )
+        
+        if self.customer_master_df is not None and self.analysis_date is not None:
+            recent = recent_behavior.set_index('customer_unique_id')
+            customer_ids = self.customer_master_df['customer_unique_id']
+            for col in ['frequency_last_90_days', 'monetary_last_90_days']:
+                self.customer_master_df[col] = customer_ids.map(recent[col]).fillna(0).to_numpy()
+            self.customer_master_df['freq_ratio_90d_alltime'] = (
+                self.customer_master_df['frequency_last_90_days'] /
+                (self.customer_master_df['frequency'] + 1)
+            )
+        
+        print(f"Recent features refreshed for {len(recent_behavior)} customers "
+              f"(orders since {window_start:%Y-%m-%d})")
+        return recent_behavior
+    
+    def _decode_customers(self):
+        """Customer code -> id decoder for compact frames (None otherwise)"""
+        if not self.compact:
+            return None
+        return lambda codes: self.decode_ids('customer_unique_id', codes)
+    
+    def build_customer_activity(self):
+        """All-time customer totals of the loaded frame (after engineer_features)
+        
+        Saved with the models, they let refresh_customer_activity bring
+        every customer master feature forward from the new orders only.
+        """
+        activity = CustomerActivity()
+        activity.update(self.df, self._decode_customers())
+        return activity
+    
+    def refresh_customer_activity(self, activity, days=90):
+        """Customer master features as of the latest order, from the orders since the activity watermark
+        
+        Loads the orders since the earlier of the watermark and the
+        last-N-days window start (with a partitioned dataset, just the
+        latest months) into a separate frame, leaving self.df. The settled
+        days are folded into activity, and every feature (recency,
+        frequency, monetary, averages, gaps and the window features) is
+        returned at one analysis date, for existing and new customers
+        alike. An empty activity loads the full history once.
+        """
+        start = None
+        if activity.watermark is not None:
+            window_start = self.latest_purchase_time() + pd.DateOffset(days=1 - days)
+            start = min(activity.watermark, window_start)
+        
+        frame = self._add_order_timings(self._parse_dates(self._load_frame(start=start)))
+        decode = self._decode_customers()
+        activity.update(frame, decode)
+        features = activity.customer_features(frame, days, decode)
+        print(f"Customer features refreshed for {len(features)} customers "
+              f"as of {features.attrs['analysis_date']:%Y-%m-%d}")
+        return features
+    
+    def refresh_sales_rollup(self, rollup):
+        """Bring saved sales rollups up to date from the orders since their watermark
+        
+        Only orders purchased on or after the rollup's last day are loaded
+        (with a partitioned dataset, just the latest months are read) into
+        a separate frame, leaving self.df, and those days are restated.
+        Returns the number of days restated.
+        """
+        since = rollup.watermark()
+        return rollup.update(self._load_frame(start=since), since)
     
     def get_transaction_data(self):
-        """Return transaction-level data for sales forecasting"""
-        sales_df = self.df[['order_purchase_timestamp', 'payment_value']].copy()
-        sales_df.rename(columns={'order_purchase_timestamp': 'ds', 'payment_value': 'y'}, inplace=True)
-        daily_sales_df = sales_df.set_index('ds').resample('D').sum().reset_index()
-        return daily_sales_df
+        """Return daily sales totals for sales forecasting
+        
+        The totals come from the materialized sales rollups, built once per
+        loaded frame (daily / weekly / monthly, see sales_rollup.py).
+        """
+        if self.sales_rollup is None:
+            self.sales_rollup = SalesRollup()
+            self.sales_rollup.update(self.df)
+        return self.sales_rollup.daily_sales()
     
     def get_product_return_data(self):
         """Prepare data for product return prediction"""
@@ -188,17 +655,45 @@ class DataPreprocessor:
         ]
         
         return_df = self.df[feature_columns].copy()
+        if self.compact:
+            return_df['product_category_name'] = return_df['product_category_name'].astype(str)
         return_df.dropna(inplace=True)
         return_df['is_likely_return'] = (return_df['review_score'] <= 2).astype(int)
         return_df = return_df.drop(columns=['review_score'])
         
         return return_df
     
+    def get_product_feature_data(self):
+        """Aggregate return-model features to one row per product"""
+        product_features = self.df.groupby('product_id').agg(
+            product_category_name=('product_category_name', 'first'),
+            price=('price', 'mean'),
+            freight_value=('freight_value', 'mean'),
+            product_name_lenght=('product_name_lenght', 'first'),
+            product_description_lenght=('product_description_lenght', 'first'),
+            product_photos_qty=('product_photos_qty', 'first'),
+            product_weight_g=('product_weight_g', 'first'),
+            product_length_cm=('product_length_cm', 'first'),
+            product_height_cm=('product_height_cm', 'first'),
+            product_width_cm=('product_width_cm', 'first'),
+            order_item_count=('order_id', 'size'),
+            observed_return_rate=('review_score', lambda s: (s <= 2).mean())
+        ).reset_index()
+        
+        if self.compact:
+            product_features['product_id'] = self.decode_ids('product_id', product_features['product_id'])
+            product_features['product_category_name'] = product_features['product_category_name'].astype(str)
+        
+        return product_features
+    
     def process_all(self):
         """Run the complete preprocessing pipeline"""
         self.load_data()
         self.clean_data()
         self.engineer_features()
+        self.enrich_dimensions()
+        if self.compact:
+            self.compact_frame()
         self.create_customer_master()
         
         return {
@@ -0,0 +1,158 @@
+"""
+Precomputed Product Return Risk Table
+Scores every product once and serves per-product / per-category lookups
+"""
+
+import pandas as pd
+import pickle
+import os
+
+
+class ProductRiskTable:
+    def __init__(self):
+        """Initialize an empty product risk table"""
+        self.table = None
+        self.model_version = None
+        self.rows_rescored = 0
+        self.RISK_BINS = [0, 0.3, 0.7, 1.0]
+        self.RISK_LABELS = ['Low Risk', 'Medium Risk', 'High Risk']
+        
+    def _feature_columns(self, return_model):
+        """Columns that the return model scores on"""
+        return return_model.numerical_features + return_model.categorical_features
+    
+    def _fingerprint(self, product_features, feature_columns):
+        """Hash each product's feature values so changed rows can be detected"""
+        return pd.util.hash_pandas_object(
+            product_features[feature_columns], index=False
+        ).values
+    
+    def _score(self, product_features, return_model):
+        """Score product feature rows and attach risk levels"""
+        scored = product_features.copy()
+        return_pred, return_proba = return_model.predict(scored)
+        scored['predicted_return'] = return_pred
+        scored['return_probability'] = return_proba
+        scored['return_risk_level'] = pd.cut(
+            scored['return_probability'],
+            bins=self.RISK_BINS,
+            labels=self.RISK_LABELS,
+            include_lowest=True
+        ).astype(str)
+        return scored
+    
+    def build(self, product_features, return_model):
+        """Score all products and index the table by product_id"""
+        print("\n=== Building Product Risk Table ===")
+        
+        feature_columns = self._feature_columns(return_model)
+        scored = self._score(product_features, return_model)
+        scored['feature_hash'] = self._fingerprint(scored, feature_columns)
+        
+        self.table = scored.set_index('product_id').sort_index()
+        self.model_version = return_model.model_version
+        self.rows_rescored = len(self.table)
+        
+        print(f"Product risk table built! Products scored: {len(self.table)}")
+        return self.table
+    
+    def stored_features(self):
+        """Product feature rows the table was last scored on"""
+        if self.table is None:
+            raise ValueError("Risk table not built yet. Call build() first.")
+        
+        output_columns = ['predicted_return', 'return_probability', 'return_risk_level', 'feature_hash']
+        return self.table.drop(columns=output_columns).reset_index()
+    
+    def refresh(self, product_features, return_model):
+        """Rescore only new products or products whose features changed
+        
+        A change of return model version rescores everything. With
+        product_features=None the stored features are kept, so only a model
+        change rescores. Products missing from product_features keep their rows.
+        """
+        if product_features is None:
+            product_features = self.stored_features()
+        if self.table is None or self.model_version != return_model.model_version:
+            if self.table is not None:
+                stored = self.stored_features()
+                product_features = pd.concat([
+                    stored[~stored['product_id'].isin(product_features['product_id'])], product_features
+                ], ignore_index=True)
+            return self.build(product_features, return_model)
+        
+        print("\n=== Refreshing Product Risk Table ===")
+        
+        feature_columns = self._feature_columns(return_model)
+        incoming = product_features.set_index('product_id')
+        incoming_hash = pd.Series(
+            self._fingerprint(incoming, feature_columns), index=incoming.index
+        )
+        previous_hash = self.table['feature_hash'].reindex(incoming.index)
+        changed_ids = incoming_hash.index[incoming_hash.values != previous_hash.values]
+        
+        if len(changed_ids) > 0:
+            rescored = self._score(incoming.loc[changed_ids].reset_index(), return_model)
+            rescored['feature_hash'] = incoming_hash.loc[changed_ids].values
+            rescored = rescored.set_index('product_id')
+            
+            unchanged = self.table.drop(index=changed_ids, errors='ignore')
+            self.table = pd.concat([unchanged, rescored]).sort_index()
+        self.rows_rescored = len(changed_ids)
+        
+        print(f"Products rescored: {len(changed_ids)} | unchanged: {len(incoming) - len(changed_ids)}")
+        return self.table
+    
+    def lookup(self, product_ids):
+        """Return risk rows for one product id or a list of product ids"""
+        if self.table is None:
+            raise ValueError("Risk table not built yet. Call build() first.")
+        
+        if isinstance(product_ids, str):
+            return self.table.loc[product_ids]
+        
+        return self.table.reindex(pd.Index(product_ids, name='product_id'))
+    
+    def category_rollup(self):
+        """Aggregate product risk by category"""
+        if self.table is None:
+            raise ValueError("Risk table not built yet. Call build() first.")
+        
+        rollup = self.table.groupby('product_category_name').agg(
+            Products=('return_probability', 'size'),
+            Avg_Return_Probability=('return_probability', 'mean'),
+            High_Risk_Products=('return_risk_level', lambda s: (s == 'High Risk').sum()),
+            Total_Returns=('predicted_return', 'sum'),
+            Avg_Price=('price', 'mean')
+        ).reset_index()
+        rollup.rename(columns={'product_category_name': 'Category'}, inplace=True)
+        
+        return rollup.sort_values('Avg_Return_Probability', ascending=False)
+    
+    def save(self, filepath='models/product_risk_table.pkl'):
+        """Save the risk table"""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        
+        with open(filepath, 'wb') as f:
+            pickle.dump({
+                'table': self.table,
+                'model_version': self.model_version
+            }, f)
+        
+        print(f"Product risk table saved to {filepath}")
+    
+    def load(self, filepath='models/product_risk_table.pkl'):
+        """Load a saved risk table"""
+        with open(filepath, 'rb') as f:
+            data = pickle.load(f)
+        
+        self.table = data['table']
+        self.model_version = data['model_version']
+        
+        print(f"Product risk table loaded from {filepath}")
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Product Risk Table Module")
+    print("Use this module to precompute and look up product return risk")
@@ -0,0 +1,176 @@
+"""
+Asynchronous Dashboard Refresh Orchestrator
+Runs customer scoring, product scoring and the sales forecast concurrently,
+exports each branch's dashboard file as soon as it finishes and writes the
+combined KPIs/summaries once all branches are done
+"""
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import predict
+
+
+def _customer_branch():
+    """Score customers (runs in an executor)"""
+    return predict.predict_customer_data()
+
+
+def _product_branch():
+    """Score products (runs in an executor)"""
+    return predict.predict_product_returns()
+
+
+def _sales_branch():
+    """Forecast sales (runs in an executor)"""
+    return predict.predict_sales_forecast()
+
+
+class RefreshOrchestrator:
+    def __init__(self, powerbi_folder='website/PowerBI_Data', executor='process', max_workers=3,
+                 approximate=False, daily=False):
+        """Initialize the orchestrator
+
+        executor='process' runs each model branch in its own process (model
+        work does not share the GIL); 'thread' keeps everything in-process.
+        Exports always run in a thread pool. With approximate=True, KPIs,
+        distributions and aggregated summaries are answered from persisted
+        sketches. With daily=True,
+        the sales rollups and recent customer features are refreshed from
+        the latest orders before the branches start.
+        """
+        if executor not in ('process', 'thread'):
+            raise ValueError("executor must be 'process' or 'thread'")
+        self.powerbi_folder = powerbi_folder
+        self.executor = executor
+        self.max_workers = max_workers
+        self.approximate = approximate
+        self.daily = daily
+        self.timings = {}
+
+    async def _timed(self, name, loop, pool, fn, *args):
+        """Run fn in pool and record its start/end relative to the refresh start"""
+        start = time.perf_counter()
+        result = await loop.run_in_executor(pool, fn, *args)
+        end = time.perf_counter()
+        self.timings[name] = (start - self._t0, end - self._t0)
+        return result
+
+    async def _branch(self, name, loop, compute_pool, io_pool, compute_fn, export_fn):
+        """Compute one branch, then export its dashboard file immediately"""
+        result = await self._timed(name, loop, compute_pool, compute_fn)
+        summary = await self._timed(f'{name} export', loop, io_pool, export_fn, result)
+        return result, summary
+
+    async def refresh(self):
+        """Run all branches concurrently and write the combined exports"""
+        self._t0 = time.perf_counter()
+        self.timings = {}
+        os.makedirs(self.powerbi_folder, exist_ok=True)
+        loop = asyncio.get_running_loop()
+
+        pool_class = ProcessPoolExecutor if self.executor == 'process' else ThreadPoolExecutor
+        with pool_class(max_workers=self.max_workers) as compute_pool, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as io_pool:
+            folder = self.powerbi_folder
+            if self.daily:
+                await self._timed('daily inputs', loop, compute_pool, predict.refresh_daily_inputs)
+            customer, product, sales = await asyncio.gather(
+                self._branch(
+                    'customers', loop, compute_pool, io_pool, _customer_branch,
+                    lambda df: predict.export_customer_analysis(
+                        df, folder, _needs_refresh(df, f'{folder}/Customer_Analysis.csv'))
+                ),
+                self._branch(
+                    'products', loop, compute_pool, io_pool, _product_branch,
+                    lambda df: predict.export_product_analysis(
+                        df, folder, _needs_refresh(df, f'{folder}/Product_Analysis.csv'))
+                ),
+                self._branch(
+                    'sales', loop, compute_pool, io_pool, _sales_branch,
+                    lambda df: predict.export_sales_forecast(df, folder)
+                )
+            )
+
+            customer_df, customer_summary = customer
+            product_df, product_summary = product
+            sales_df, _ = sales
+
+            await asyncio.gather(
+                self._timed(
+                    'rollups', loop, io_pool, predict.export_dashboard_rollups,
+                    customer_summary, product_summary, sales_df, folder, self.approximate
+                ),
+                self._timed(
+                    'risk rollup', loop, io_pool, _risk_rollup, product_df.attrs.get('model_version'), folder
+                ),
+                self._timed(
+                    'regional tables', loop, io_pool, predict.export_regional_tables,
+                    'models/regional_cube.pkl', folder
+                ),
+                self._timed(
+                    'sales history', loop, io_pool, predict.export_sales_history,
+                    'models/sales_rollup.pkl', folder
+                ),
+                self._timed('importances', loop, io_pool, predict.export_feature_importances, folder)
+            )
+
+        self.timings['total'] = (0.0, time.perf_counter() - self._t0)
+        return customer_df, product_df, sales_df
+
+    def run(self):
+        """Run the refresh from synchronous code"""
+        return asyncio.run(self.refresh())
+
+    def report(self):
+        """Print per-branch timings, critical path and overlap"""
+        print("\n=== Refresh Timings ===")
+        for name, (start, end) in self.timings.items():
+            if name != 'total':
+                print(f"  {name:<16} {start:7.2f}s -> {end:7.2f}s  ({end - start:6.2f}s)")
+
+        serial = sum(end - start for name, (start, end) in self.timings.items() if name != 'total')
+        total = self.timings['total'][1]
+        print(f"  Critical path: {total:.2f}s (sequential sum {serial:.2f}s, "
+              f"{serial / total if total > 0 else 0:.1f}x overlap)")
+
+
+def _risk_rollup(model_version, folder):
+    """Refresh the product risk table for the current return model, then export its rollup"""
+    predict.refresh_product_risk_table(model_version=model_version)
+    return predict.export_product_risk_rollup('models/product_risk_table.pkl', f'{folder}/Product_Risk_Rollup.csv')
+
+
+def _needs_refresh(df, analysis_csv):
+    """Rewrite a row-level export only if the scored file changed or the export does not exist yet"""
+    return df.attrs.get('outputs_changed', True) or not os.path.exists(analysis_csv)
+
+
+def main(approximate=False, daily=False):
+    """Run the concurrent prediction and dashboard refresh
+
+    python refresh_orchestrator.py --approximate answers KPIs from sketches;
+    --daily first refreshes the sales rollups and recent customer features.
+    """
+    print("\n" + "="*60)
+    print("BI DASHBOARD - CONCURRENT REFRESH")
+    print("="*60)
+
+    if not os.path.exists('models'):
+        print("\n❌ ERROR: No trained models found!")
+        print("Please run 'train_models.py' first to train the models.")
+        return
+
+    orchestrator = RefreshOrchestrator(approximate=approximate, daily=daily)
+    customer_df, product_df, sales_df = orchestrator.run()
+    orchestrator.report()
+
+    print(f"\n{len(customer_df)} customers analyzed | {len(product_df)} products analyzed | "
+          f"{len(sales_df)}-day forecast generated")
+
+
+if __name__ == "__main__":
+    main(approximate='--approximate' in sys.argv[1:], daily='--daily' in sys.argv[1:])
@@ -0,0 +1,237 @@
+"""
+Regional Sales and Return-Risk Cube
+Pre-aggregates item-level sales and return risk to seller x customer state x
+month cells once, so regional dashboard queries are answered by filtering and
+summing a few thousand cells instead of regrouping the transaction frame
+"""
+
+import pandas as pd
+import numpy as np
+import pickle
+import os
+
+from atomic_io import atomic_write_csv
+from dimensions import DimensionLookup, MISSING_LABEL
+
+
+GROUP_COLUMNS = [
+    'seller_id', 'seller_state', 'seller_region', 'customer_state', 'customer_region', 'month'
+]
+
+# Coarser cube kept alongside for queries that do not need seller_id
+REGIONAL_COLUMNS = [
+    'seller_state', 'seller_region', 'customer_state', 'customer_region', 'month'
+]
+
+# Additive measures per cell; seller_orders counts an order split across
+# sellers once per seller
+MEASURES = [
+    'items', 'seller_orders', 'revenue', 'freight',
+    'reviewed_items', 'observed_returns', 'scored_items', 'return_probability_sum'
+]
+
+
+class RegionalCube:
+    def __init__(self):
+        """Initialize an empty cube"""
+        self.cells = None
+        self.regional_cells = None
+        self.labels = {}
+        self.built_at = None
+
+    def build(self, df, dimensions, id_dictionary=None, return_probability=None):
+        """Aggregate a transaction frame to seller x customer state x month cells
+
+        Items are counted once even though the joined frame repeats them per
+        payment and review. return_probability (indexed by product_id, e.g.
+        the product risk table) adds the model's expected returns per cell.
+        Works on plain and compact (int-coded ids) frames alike.
+        """
+        print("\n=== Building Regional Cube ===")
+        id_dictionary = id_dictionary or {}
+
+        items = df[[
+            'order_id', 'order_item_id', 'seller_id', 'product_id', 'customer_state',
+            'order_purchase_timestamp', 'price', 'freight_value', 'review_score'
+        ]].drop_duplicates(['order_id', 'order_item_id'])
+
+        # Seller attributes come from the seller dimension rows by array take
+        seller_rows = dimensions.sellers.rows(items['seller_id'], id_dictionary.get('seller_id'))
+        self.labels['seller_id'] = np.append(dimensions.sellers.index.to_numpy(dtype=object), MISSING_LABEL)
+        codes = {'seller_id': seller_rows}
+        for col in ['seller_state', 'seller_region']:
+            codes[col] = dimensions.sellers.codes[col][seller_rows]
+            self.labels[col] = dimensions.sellers.categories[col].to_numpy(dtype=object)
+
+        state_codes, states = pd.factorize(
+            items['customer_state'].astype(object).fillna(MISSING_LABEL), sort=True
+        )
+        codes['customer_state'] = state_codes
+        self.labels['customer_state'] = np.asarray(states, dtype=object)
+        state_rows = dimensions.states.rows(self.labels['customer_state'])
+        codes['customer_region'] = dimensions.states.codes['region'][state_rows][state_codes]
+        self.labels['customer_region'] = dimensions.states.categories['region'].to_numpy(dtype=object)
+
+        months = pd.to_datetime(items['order_purchase_timestamp']).dt.strftime('%Y-%m').fillna(MISSING_LABEL)
+        codes['month'], month_labels = pd.factorize(months, sort=True)
+        self.labels['month'] = np.asarray(month_labels, dtype=object)
+
+        facts = pd.DataFrame({col: np.asarray(values, dtype=np.int32) for col, values in codes.items()})
+        facts['order'] = pd.factorize(items['order_id'])[0]
+        facts['revenue'] = items['price'].to_numpy(dtype=np.float64, na_value=np.nan)
+        facts['freight'] = items['freight_value'].to_numpy(dtype=np.float64, na_value=np.nan)
+        review_score = items['review_score'].to_numpy(dtype=np.float64, na_value=np.nan)
+        facts['reviewed_items'] = ~np.isnan(review_score)
+        facts['observed_returns'] = review_score <= 2
+
+        probability = np.full(len(items), np.nan)
+        if return_probability is not None:
+            products = DimensionLookup(return_probability.index, pd.DataFrame(index=return_probability.index))
+            product_rows = products.rows(items['product_id'], id_dictionary.get('product_id'))
+            probability = np.append(return_probability.to_numpy(dtype=np.float64), np.nan)[product_rows]
+        facts['scored_items'] = ~np.isnan(probability)
+        facts['return_probability_sum'] = np.nan_to_num(probability)
+
+        # seller_id determines seller_state/region and customer_state
+        # determines customer_region, so grouping on them adds no cells
+        cells = facts.groupby(GROUP_COLUMNS, sort=True).agg(
+            items=('order', 'size'),
+            seller_orders=('order', 'nunique'),
+            revenue=('revenue', 'sum'),
+            freight=('freight', 'sum'),
+            reviewed_items=('reviewed_items', 'sum'),
+            observed_returns=('observed_returns', 'sum'),
+            scored_items=('scored_items', 'sum'),
+            return_probability_sum=('return_probability_sum', 'sum')
+        ).reset_index()
+        for col in GROUP_COLUMNS:
+            cells[col] = cells[col].astype(np.int32)
+        for col in MEASURES:
+            cells[col] = cells[col].astype(np.float64)
+
+        self.cells = cells
+        self.regional_cells = self._aggregate(cells, REGIONAL_COLUMNS)
+        self.built_at = pd.Timestamp.now().isoformat(timespec='seconds')
+        print(f"Regional cube built! {len(items)} items -> {len(cells)} cells "
+              f"({len(self.regional_cells)} without sellers)")
+        return self.cells
+
+    def _aggregate(self, cells, group_by):
+        """Sum the measures of cells per distinct group_by codes
+
+        The group codes are combined into one integer key, so grouping is a
+        bincount (dense key space) or a 1-D unique instead of a hash groupby.
+        """
+        key = np.zeros(len(cells), dtype=np.int64)
+        n_keys = 1
+        for col in group_by:
+            key = key * len(self.labels[col]) + cells[col].to_numpy()
+            n_keys *= len(self.labels[col])
+
+        if n_keys <= 4 * len(cells) + 1024:
+            present = np.flatnonzero(np.bincount(key, minlength=n_keys))
+            inverse = np.searchsorted(present, key)
+        else:
+            present, inverse = np.unique(key, return_inverse=True)
+
+        result = {}
+        remainder = present
+        for col in reversed(group_by):
+            remainder, result[col] = np.divmod(remainder, len(self.labels[col]))
+        result = pd.DataFrame({col: result[col].astype(np.int32) for col in group_by}, index=range(len(present)))
+        for col in MEASURES:
+            result[col] = np.bincount(inverse, weights=cells[col].to_numpy(), minlength=len(present))
+        return result
+
+    def _codes(self, col, values):
+        """Codes of one or more labels of a group column"""
+        values = [values] if isinstance(values, str) else list(values)
+        positions = pd.Index(self.labels[col]).get_indexer(values)
+        return positions[positions >= 0]
+
+    def query(self, group_by=('customer_state',), filters=None, months=None):
+        """Aggregate the cube to group_by, optionally filtered
+
+        filters maps group columns to a label or list of labels; months is
+        an inclusive ('YYYY-MM', 'YYYY-MM') range (either end may be None).
+        Queries that do not involve seller_id read the smaller seller-free
+        cube. Returns the measures plus avg_item_price, return_rate
+        (observed, review score <= 2) and avg_return_probability (model).
+        """
+        if self.cells is None:
+            raise ValueError("Cube not built yet. Call build() first.")
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+        filters = filters or {}
+        unknown = (set(group_by) | set(filters)) - set(GROUP_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown cube column {', '.join(sorted(unknown))}; use one of {GROUP_COLUMNS}")
+
+        uses_seller = 'seller_id' in group_by or 'seller_id' in filters
+        cells = self.cells if uses_seller else self.regional_cells
+
+        mask = np.ones(len(cells), dtype=bool)
+        for col, values in filters.items():
+            mask &= np.isin(cells[col].to_numpy(), self._codes(col, values))
+        if months is not None:
+            low, high = months
+            month_codes = cells['month'].to_numpy()
+            if low is not None:
+                mask &= month_codes >= np.searchsorted(self.labels['month'], low, side='left')
+            if high is not None:
+                mask &= month_codes < np.searchsorted(self.labels['month'], high, side='right')
+
+        result = self._aggregate(cells[mask], group_by)
+        for col in group_by:
+            result[col] = self.labels[col][result[col].to_numpy()]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result['avg_item_price'] = result['revenue'] / result['items']
+            result['return_rate'] = result['observed_returns'] / result['reviewed_items']
+            result['avg_return_probability'] = result['return_probability_sum'] / result['scored_items']
+        return result
+
+    def export_tables(self, powerbi_folder='website/PowerBI_Data'):
+        """Write the regional dashboard tables answered from the cube"""
+        tables = {
+            'Regional_Sales.csv': self.query(['customer_state', 'customer_region', 'month']),
+            'Seller_Performance.csv': self.query(['seller_id', 'seller_state', 'seller_region'])
+                .sort_values('revenue', ascending=False),
+            'Region_Flows.csv': self.query(['seller_region', 'customer_region'])
+        }
+        for filename, table in tables.items():
+            atomic_write_csv(table.round(6), os.path.join(powerbi_folder, filename))
+        print(f"  ✓ Regional tables saved to {powerbi_folder}/")
+        return tables
+
+    def save(self, filepath='models/regional_cube.pkl'):
+        """Save the cube cells and labels"""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'wb') as f:
+            pickle.dump({
+                'cells': self.cells,
+                'regional_cells': self.regional_cells,
+                'labels': self.labels,
+                'built_at': self.built_at
+            }, f)
+
+        print(f"Regional cube saved to {filepath}")
+
+    def load(self, filepath='models/regional_cube.pkl'):
+        """Load a saved cube"""
+        with open(filepath, 'rb') as f:
+            data = pickle.load(f)
+
+        self.cells = data['cells']
+        self.regional_cells = data['regional_cells']
+        self.labels = data['labels']
+        self.built_at = data['built_at']
+
+        print(f"Regional cube loaded from {filepath}")
+        return self
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Regional Sales and Return-Risk Cube Module")
+    print("Use this module to answer seller / state / month queries")
@@ -1,22 +1,42 @@
 """
 Product Return Likelihood Prediction using Random Forest
+(or histogram gradient boosting with native categorical support)
 """
 
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder, FunctionTransformer
 from sklearn.compose import ColumnTransformer
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.metrics import roc_auc_score
 from sklearn.pipeline import Pipeline
+import hashlib
 import pickle
+import time
 import os
+from drift_monitor import DriftMonitor
+from explanations import ForestExplainer, global_importance
+
+
+def _to_float32(X):
+    """Cast the preprocessed feature matrix to float32"""
+    return np.asarray(X, dtype=np.float32)
 
 
 class ReturnPredictor:
-    def __init__(self):
+    BACKENDS = ('random_forest', 'hist_gb')
+
+    def __init__(self, backend='random_forest'):
         """Initialize the product return prediction model"""
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Choose from {self.BACKENDS}")
+        self.backend = backend
         self.model = None
+        self.model_version = None
+        self.drift_monitor = None
+        self.global_importance = None
+        self.imputer = None
         self.numerical_features = [
             'price', 'freight_value', 'product_name_lenght',
             'product_description_lenght', 'product_photos_qty',
@@ -25,28 +45,15 @@ class ReturnPredictor:
         ]
         self.categorical_features = ['product_category_name']
         
-    def train(self, return_data):
-        """Train the Random Forest return prediction model"""
-        print("\n=== Training Product Return Prediction Model ===")
-        
-        # Features and target
-        X = return_data.drop('is_likely_return', axis=1)
-        y = return_data['is_likely_return']
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
-        
-        # Create preprocessor
+    def _build_random_forest(self):
+        """Build the one-hot encoded Random Forest pipeline"""
         preprocessor = ColumnTransformer(
             transformers=[
                 ('num', StandardScaler(), self.numerical_features),
                 ('cat', OneHotEncoder(handle_unknown='ignore'), self.categorical_features)
             ])
         
-        # Create pipeline
-        self.model = Pipeline(steps=[
+        return Pipeline(steps=[
             ('preprocessor', preprocessor),
             ('classifier', RandomForestClassifier(
                 random_state=42,
@@ -55,9 +62,82 @@ class ReturnPredictor:
                 n_jobs=-1
             ))
         ])
+    
+    def _build_hist_gb(self):
+        """Build the histogram gradient boosting pipeline
+        
+        Categories are ordinal-encoded (unseen -> NaN, treated as missing) and
+        split on natively; all features are cast to float32 before binning.
+        """
+        preprocessor = ColumnTransformer(
+            transformers=[
+                ('num', 'passthrough', self.numerical_features),
+                ('cat', OrdinalEncoder(
+                    handle_unknown='use_encoded_value',
+                    unknown_value=np.nan
+                ), self.categorical_features)
+            ])
+        
+        categorical_mask = (
+            [False] * len(self.numerical_features) + [True] * len(self.categorical_features)
+        )
+        
+        return Pipeline(steps=[
+            ('preprocessor', preprocessor),
+            ('float32', FunctionTransformer(_to_float32)),
+            ('classifier', HistGradientBoostingClassifier(
+                categorical_features=categorical_mask,
+                class_weight='balanced',
+                max_iter=200,
+                learning_rate=0.1,
+                max_leaf_nodes=31,
+                max_bins=255,
+                early_stopping=True,
+                random_state=42
+            ))
+        ])
+    
+    def _build_pipeline(self, backend=None):
+        """Build the untrained pipeline for the given backend"""
+        backend = backend or self.backend
+        if backend == 'hist_gb':
+            return self._build_hist_gb()
+        return self._build_random_forest()
+    
+    def train(self, return_data, imputer=None):
+        """Train the return prediction model with the configured backend
+        
+        The fitted imputer from preprocessing is kept with the model so
+        prediction inputs get the same fill values as training data.
+        """
+        print("\n=== Training Product Return Prediction Model ===")
+        print(f"Backend: {self.backend}")
+        
+        # Features and target
+        X = return_data.drop('is_likely_return', axis=1)
+        y = return_data['is_likely_return']
+        
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=y
+        )
+        
+        if imputer is not None:
+            self.imputer = imputer
+        
+        # Create pipeline
+        self.model = self._build_pipeline()
+        self._forest_explainer = None
         
         # Train model
         self.model.fit(X_train, y_train)
+        self.model_version = hashlib.md5(pickle.dumps(self.model)).hexdigest()[:12]
+        
+        # Reference histograms for drift monitoring: inputs from the training
+        # rows, scores from the held-out rows (in-sample scores are overconfident)
+        self.drift_monitor = DriftMonitor().fit(
+            X_train, self.model.predict_proba(X_test)[:, 1], self.numerical_features, self.categorical_features
+        )
         
         # Evaluate
         train_score = self.model.score(X_train, y_train)
@@ -66,13 +146,62 @@ class ReturnPredictor:
         print(f"Training accuracy: {train_score:.4f}")
         print(f"Testing accuracy: {test_score:.4f}")
         
+        # Global importances from held-out contributions
+        if self.backend == 'random_forest':
+            self.global_importance = global_importance(
+                self.explain(X_test.head(5000)), self.numerical_features + self.categorical_features
+            )
+        
         print(f"\nReturn distribution in training:")
         print(y_train.value_counts())
         
         return self.model
     
-    def predict(self, product_data):
-        """Predict return likelihood for products"""
+    def compare_backends(self, return_data, report_csv=None):
+        """Train every backend on the same split and report size, latency and accuracy"""
+        print("\n=== Comparing Return Model Backends ===")
+        
+        X = return_data.drop('is_likely_return', axis=1)
+        y = return_data['is_likely_return']
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=y
+        )
+        
+        rows = []
+        for backend in self.BACKENDS:
+            model = self._build_pipeline(backend)
+            
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            train_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            proba = model.predict_proba(X_test)[:, 1]
+            predict_seconds = time.perf_counter() - start
+            
+            rows.append({
+                'backend': backend,
+                'model_size_mb': len(pickle.dumps(model)) / 1e6,
+                'train_seconds': train_seconds,
+                'predict_ms_per_1k_rows': predict_seconds * 1000 / len(X_test) * 1000,
+                'test_accuracy': model.score(X_test, y_test),
+                'test_roc_auc': roc_auc_score(y_test, proba)
+            })
+        
+        report = pd.DataFrame(rows)
+        print(report.to_string(index=False))
+        
+        if report_csv:
+            report.to_csv(report_csv, index=False)
+            print(f"Comparison report saved to {report_csv}")
+        
+        return report
+    
+    def predict(self, product_data, monitor=True):
+        """Predict return likelihood for products
+        
+        With monitor=True, inputs and scores are added to the drift monitor.
+        """
         if self.model is None:
             raise ValueError("Model not trained yet. Call train() first.")
         
@@ -80,12 +209,60 @@ class ReturnPredictor:
         if isinstance(product_data, pd.Series):
             product_data = product_data.to_frame().T
         
+        # Fill missing inputs with the training statistics
+        if self.imputer is not None:
+            product_data = self.imputer.transform(product_data)
+        
         # Make predictions
         return_proba = self.model.predict_proba(product_data)[:, 1]
         return_prediction = self.model.predict(product_data)
         
+        if monitor and self.drift_monitor is not None:
+            self.drift_monitor.update(product_data, return_proba)
+        
         return return_prediction, return_proba
     
+    def update_drift(self, product_data, scores):
+        """Add already-scored rows to the drift monitor, imputed as predict() sees them"""
+        if self.drift_monitor is None:
+            return
+        X = product_data[self.numerical_features + self.categorical_features]
+        if self.imputer is not None:
+            X = self.imputer.transform(X)
+        self.drift_monitor.update(X, scores)
+    
+    def explain(self, product_data):
+        """Per-row return-probability path attributions from the forest's decision paths
+        
+        These are not SHAP values (see ForestExplainer). One-hot columns are summed back into product_category_name. Returns
+        one column per feature plus 'bias'; each row sums to the predicted
+        return probability. Only the random_forest backend is supported.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet. Call train() first.")
+        if self.backend != 'random_forest':
+            raise ValueError("Explanations are only available for the random_forest backend")
+        
+        if self.imputer is not None:
+            product_data = self.imputer.transform(product_data)
+        
+        X_encoded = self.model.named_steps['preprocessor'].transform(product_data)
+        contributions = self._explainer().contributions(X_encoded)
+        
+        features = self.numerical_features + self.categorical_features
+        return pd.DataFrame(contributions, columns=features + ['bias'], index=product_data.index)
+    
+    def _explainer(self):
+        """Forest explainer with one-hot columns grouped back to their feature (built once)"""
+        if getattr(self, '_forest_explainer', None) is None:
+            one_hot = self.model.named_steps['preprocessor'].named_transformers_['cat']
+            feature_groups = list(range(len(self.numerical_features))) + [
+                len(self.numerical_features) + i
+                for i, categories in enumerate(one_hot.categories_) for _ in categories
+            ]
+            self._forest_explainer = ForestExplainer(self.model.named_steps['classifier'], feature_groups)
+        return self._forest_explainer
+    
     def save_model(self, filepath='models/return_model.pkl'):
         """Save the trained model"""
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -93,6 +270,14 @@ class ReturnPredictor:
         with open(filepath, 'wb') as f:
             pickle.dump({
                 'model': self.model,
+                'backend': self.backend,
+                'model_version': self.model_version,
+                'drift_monitor': self.drift_monitor,
+                'global_importance': self.global_importance,
+                # Built at training time; pickled with the model so loading
+                # never rebuilds it (the classifier is stored once)
+                'forest_explainer': getattr(self, '_forest_explainer', None),
+                'imputer': self.imputer,
                 'numerical_features': self.numerical_features,
                 'categorical_features': self.categorical_features
             }, f)
@@ -105,15 +290,36 @@ class ReturnPredictor:
             data = pickle.load(f)
             
         self.model = data['model']
+        self._forest_explainer = data.get('forest_explainer')
+        self.backend = data.get('backend', 'random_forest')
+        self.drift_monitor = data.get('drift_monitor')
+        self.global_importance = data.get('global_importance')
+        self.model_version = data.get(
+            'model_version', hashlib.md5(pickle.dumps(self.model)).hexdigest()[:12]
+        )
+        self.imputer = data.get('imputer')
         self.numerical_features = data['numerical_features']
         self.categorical_features = data['categorical_features']
         
         print(f"Model loaded from {filepath}")
     
-    def predict_from_csv(self, input_csv, output_csv):
-        """Predict return likelihood for products in CSV and save results"""
+    def predict_from_csv(self, input_csv, output_csv, chunksize=None):
+        """Predict return likelihood for products in CSV and save results
+        
+        With chunksize, the CSV is scored and written chunk by chunk; the
+        persisted imputer keeps fill values identical across chunks.
+        """
         print(f"\n=== Predicting returns from {input_csv} ===")
         
+        if chunksize is not None:
+            n_rows = 0
+            for i, chunk in enumerate(pd.read_csv(input_csv, chunksize=chunksize)):
+                chunk['predicted_return'], chunk['return_probability'] = self.predict(chunk)
+                chunk.to_csv(output_csv, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+                n_rows += len(chunk)
+            print(f"Predictions for {n_rows} rows saved to {output_csv}")
+            return None
+        
         # Load data
         df = pd.read_csv(input_csv)
         
@@ -0,0 +1,158 @@
+"""
+Materialized Sales Rollups
+Daily sales totals kept by integer day key, with weekly and monthly rollups
+derived from them. Updates restate only the days from a watermark onwards,
+so refreshes never regroup the full transaction history
+"""
+
+import pandas as pd
+import numpy as np
+import pickle
+import os
+
+from calendar_dimension import CalendarDimension, date_keys, EPOCH
+from atomic_io import atomic_write_csv
+
+
+MEASURES = ['sales', 'orders']
+
+# Grain -> calendar key column the daily rows roll up to
+GRAINS = {'day': 'date_key', 'week': 'week_start_key', 'month': 'month_start_key'}
+
+
+class SalesRollup:
+    def __init__(self):
+        """Initialize empty rollups"""
+        self.calendar = CalendarDimension()
+        self.rollups = {}
+        self.updated_at = None
+
+    @property
+    def daily(self):
+        """Daily rollup (date_key, sales, orders), or None before the first update"""
+        return self.rollups.get('day')
+
+    def watermark(self):
+        """Last day with sales; it may be incomplete, so updates restate it"""
+        if self.daily is None or self.daily.empty:
+            return None
+        return pd.Timestamp(EPOCH + int(self.daily['date_key'].iloc[-1]))
+
+    def update(self, df, since=None):
+        """Restate the days from since (default: df's first day) with df's totals
+
+        df holds transaction rows with order_purchase_timestamp, order_id
+        and payment_value, covering every order purchased since then
+        (e.g. DataPreprocessor.load_data(start=since)). sales sums
+        payment_value over the rows, as the forecaster's daily totals do;
+        orders counts distinct orders. Days without sales are kept as
+        zeros, and only the weeks and months touched are re-aggregated.
+        """
+        keys = date_keys(df['order_purchase_timestamp'])
+        since_key = int(keys[keys >= 0].min()) if since is None else int(date_keys([since])[0])
+        if since_key < 0:
+            return 0
+        selected = keys >= since_key
+        keys = keys[selected] - since_key
+        n_days = int(keys.max()) + 1 if len(keys) else 0
+
+        payments = df['payment_value'].to_numpy(dtype=np.float64, na_value=np.nan)[selected]
+        order_codes = pd.factorize(df['order_id'].to_numpy()[selected])[0].astype(np.int64)
+        # An order has a single purchase day, so scattering day by order
+        # leaves one entry per distinct order
+        order_days = np.zeros(int(order_codes.max()) + 1 if len(order_codes) else 0, dtype=np.int64)
+        order_days[order_codes] = keys
+        restated = pd.DataFrame({
+            'date_key': np.arange(since_key, since_key + n_days, dtype=np.int64),
+            'sales': np.bincount(keys, weights=np.nan_to_num(payments), minlength=n_days),
+            'orders': np.bincount(order_days, minlength=n_days).astype(np.int64)
+        })
+
+        # Keep earlier days, zero-filling any gap up to the restated range
+        daily = self.daily
+        kept = daily[daily['date_key'] < since_key] if daily is not None else restated.iloc[:0]
+        if len(kept) and kept['date_key'].iloc[-1] < since_key - 1:
+            gap = np.arange(int(kept['date_key'].iloc[-1]) + 1, since_key, dtype=np.int64)
+            kept = pd.concat([kept, pd.DataFrame({'date_key': gap, 'sales': 0.0, 'orders': 0})])
+        self.rollups['day'] = pd.concat([kept, restated], ignore_index=True)
+
+        for grain in ['week', 'month']:
+            self._restate(grain, since_key)
+        self.updated_at = pd.Timestamp.now().isoformat(timespec='seconds')
+        print(f"Sales rollups updated: {n_days} days restated from {pd.Timestamp(EPOCH + since_key):%Y-%m-%d}")
+        return n_days
+
+    def _restate(self, grain, since_key):
+        """Re-aggregate the periods of a grain that contain days from since_key on"""
+        daily = self.daily
+        period_keys = self.calendar.attributes(daily['date_key'], [GRAINS[grain]])[GRAINS[grain]].to_numpy(np.int64)
+        period_start = int(self.calendar.attributes([since_key], [GRAINS[grain]])[GRAINS[grain]].iloc[0])
+
+        changed = period_keys >= period_start
+        restated = daily.loc[changed, MEASURES].groupby(period_keys[changed], sort=True).sum()
+        restated = restated.rename_axis('date_key').reset_index()
+
+        existing = self.rollups.get(grain)
+        kept = existing[existing['date_key'] < period_start] if existing is not None else restated.iloc[:0]
+        self.rollups[grain] = pd.concat([kept, restated], ignore_index=True)
+
+    def daily_sales(self):
+        """Daily totals as the forecaster's ds / y frame"""
+        if self.daily is None:
+            raise ValueError("No sales rollups yet. Call update() first.")
+        return pd.DataFrame({
+            'ds': pd.to_datetime(EPOCH + self.daily['date_key'].to_numpy().astype('timedelta64[D]')),
+            'y': self.daily['sales'].to_numpy()
+        })
+
+    def table(self, grain='day', columns=None):
+        """A rollup joined with its calendar attributes by date key"""
+        if grain not in GRAINS:
+            raise ValueError(f"grain must be one of {list(GRAINS)}")
+        if grain not in self.rollups:
+            raise ValueError("No sales rollups yet. Call update() first.")
+        rollup = self.rollups[grain]
+        columns = columns or {
+            'day': ['date', 'year', 'month', 'month_name', 'day_of_week', 'week_number',
+                    'is_weekend', 'is_holiday', 'holiday_name', 'is_black_friday'],
+            'week': ['date', 'iso_year', 'week_number'],
+            'month': ['date', 'year', 'quarter', 'month', 'month_name']
+        }[grain]
+        attributes = self.calendar.attributes(rollup['date_key'], columns)
+        return pd.concat([attributes, rollup[MEASURES].reset_index(drop=True)], axis=1)
+
+    def export_tables(self, powerbi_folder='website/PowerBI_Data'):
+        """Write the daily, weekly and monthly sales history tables"""
+        tables = {}
+        for grain, filename in [('day', 'Sales_Daily.csv'), ('week', 'Sales_Weekly.csv'),
+                                ('month', 'Sales_Monthly.csv')]:
+            tables[filename] = self.table(grain)
+            atomic_write_csv(tables[filename].round(2), os.path.join(powerbi_folder, filename))
+        print(f"  ✓ Sales history tables saved to {powerbi_folder}/")
+        return tables
+
+    def save(self, filepath='models/sales_rollup.pkl'):
+        """Save the rollups"""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'wb') as f:
+            pickle.dump({'rollups': self.rollups, 'updated_at': self.updated_at}, f)
+
+        print(f"Sales rollups saved to {filepath}")
+
+    def load(self, filepath='models/sales_rollup.pkl'):
+        """Load saved rollups"""
+        with open(filepath, 'rb') as f:
+            data = pickle.load(f)
+
+        self.rollups = data['rollups']
+        self.updated_at = data['updated_at']
+
+        print(f"Sales rollups loaded from {filepath}")
+        return self
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Materialized Sales Rollups Module")
+    print("Use this module to maintain daily / weekly / monthly sales totals")
@@ -6,16 +6,52 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score, davies_bouldin_score, pairwise_distances
+from joblib import Parallel, delayed
+import hashlib
 import pickle
 import os
 
 
+def _fit_candidate(X_scaled, k, fit_sample_size, random_state):
+    """Fit one candidate k on a subsample and score its inertia on all rows
+    
+    X_scaled arrives as a read-only memmap shared by all workers.
+    """
+    rng = np.random.default_rng(random_state)
+    if len(X_scaled) > fit_sample_size:
+        rows = np.sort(rng.choice(len(X_scaled), fit_sample_size, replace=False))
+        X_fit = X_scaled[rows]
+    else:
+        X_fit = X_scaled
+    
+    model = KMeans(n_clusters=k, random_state=random_state, n_init=3).fit(X_fit)
+    labels = model.predict(X_scaled)
+    return {
+        'k': k,
+        'centers': model.cluster_centers_,
+        'inertia': -model.score(X_scaled),
+        'davies_bouldin': davies_bouldin_score(X_scaled, labels)
+    }
+
+
+def _elbow(k_values, inertias):
+    """k furthest below the line joining the first and last inertia points"""
+    x = (np.asarray(k_values) - k_values[0]) / max(k_values[-1] - k_values[0], 1)
+    y = np.asarray(inertias, dtype=np.float64)
+    y = (y - y.min()) / max(y.max() - y.min(), 1e-12)
+    line = 1 - x
+    return int(k_values[int(np.argmax(line - y))])
+
+
 class CustomerSegmentation:
     def __init__(self, n_clusters=4):
         """Initialize the segmentation model"""
         self.n_clusters = n_clusters
         self.scaler = StandardScaler()
         self.model = None
+        self.model_version = None
+        self.selection_report = None
         self.feature_columns = [
             'recency',
             'frequency',
@@ -25,8 +61,64 @@ class CustomerSegmentation:
             'avg_days_between_purchases'
         ]
         
-    def train(self, customer_master_df):
-        """Train the K-Means clustering model"""
+    def select_n_clusters(self, X_scaled, k_values=range(2, 13), fit_sample_size=200000,
+                          silhouette_sample_size=4000, n_bootstrap=5, n_jobs=-1, random_state=42):
+        """Pick k by sampled silhouette, with Davies-Bouldin and inertia elbow for reference
+        
+        Candidates are fitted in parallel on a subsample, sharing X_scaled
+        with the workers through a memory map. The silhouette is computed on
+        n_bootstrap random samples. Each sample's pairwise distance matrix is
+        computed once and reused for every k. Returns the report, one row
+        per k, with a 95% interval on the silhouette.
+        """
+        k_values = [k for k in k_values if 1 < k < len(X_scaled)]
+        X_scaled = np.ascontiguousarray(X_scaled, dtype=np.float64)
+        
+        candidates = Parallel(n_jobs=n_jobs, max_nbytes='1M', mmap_mode='r')(
+            delayed(_fit_candidate)(X_scaled, k, fit_sample_size, random_state) for k in k_values
+        )
+        candidates = sorted(candidates, key=lambda c: c['k'])
+        
+        rng = np.random.default_rng(random_state)
+        sample_size = min(silhouette_sample_size, len(X_scaled))
+        silhouettes = np.empty((n_bootstrap, len(candidates)))
+        for b in range(n_bootstrap):
+            rows = rng.choice(len(X_scaled), sample_size, replace=False)
+            sample = X_scaled[rows]
+            distances = pairwise_distances(sample, n_jobs=n_jobs)
+            for i, candidate in enumerate(candidates):
+                labels = pairwise_distances(sample, candidate['centers']).argmin(axis=1)
+                if len(np.unique(labels)) < 2:
+                    silhouettes[b, i] = np.nan
+                else:
+                    silhouettes[b, i] = silhouette_score(distances, labels, metric='precomputed')
+        
+        mean = np.nanmean(silhouettes, axis=0)
+        half_width = 1.96 * np.nanstd(silhouettes, axis=0, ddof=1) / np.sqrt(n_bootstrap) if n_bootstrap > 1 \
+            else np.zeros(len(candidates))
+        report = pd.DataFrame({
+            'k': [c['k'] for c in candidates],
+            'silhouette': mean,
+            'silhouette_ci_low': mean - half_width,
+            'silhouette_ci_high': mean + half_width,
+            'davies_bouldin': [c['davies_bouldin'] for c in candidates],
+            'inertia': [c['inertia'] for c in candidates]
+        })
+        
+        best = int(np.nanargmax(mean))
+        report['selected'] = report.index == best
+        # Candidates whose interval overlaps the best one are not clearly worse
+        report['within_ci_of_best'] = report['silhouette_ci_high'] >= report.loc[best, 'silhouette_ci_low']
+        report.attrs['elbow_k'] = _elbow(report['k'].tolist(), report['inertia'].tolist())
+        
+        return report
+    
+    def train(self, customer_master_df, select_k=False, k_values=range(2, 13)):
+        """Train the K-Means clustering model
+        
+        With select_k=True, n_clusters is first chosen by select_n_clusters
+        and persisted with the model.
+        """
         print("\n=== Training Customer Segmentation Model ===")
         
         # Select features
@@ -35,9 +127,16 @@ class CustomerSegmentation:
         # Scale features
         X_scaled = self.scaler.fit_transform(X)
         
+        if select_k:
+            self.selection_report = self.select_n_clusters(X_scaled, k_values)
+            self.n_clusters = int(self.selection_report.loc[self.selection_report['selected'], 'k'].iloc[0])
+            print(self.selection_report.round(4).to_string(index=False))
+            print(f"Selected k={self.n_clusters} (inertia elbow at k={self.selection_report.attrs['elbow_k']})")
+        
         # Train K-Means model
         self.model = KMeans(n_clusters=self.n_clusters, random_state=42, n_init=10)
         clusters = self.model.fit_predict(X_scaled)
+        self.model_version = hashlib.md5(pickle.dumps((self.scaler, self.model))).hexdigest()[:12]
         
         print(f"Model trained with {self.n_clusters} clusters")
         
@@ -76,9 +175,11 @@ class CustomerSegmentation:
         with open(filepath, 'wb') as f:
             pickle.dump({
                 'model': self.model,
+                'model_version': self.model_version,
                 'scaler': self.scaler,
                 'feature_columns': self.feature_columns,
-                'n_clusters': self.n_clusters
+                'n_clusters': self.n_clusters,
+                'selection_report': self.selection_report
             }, f)
         
         print(f"Model saved to {filepath}")
@@ -90,8 +191,12 @@ class CustomerSegmentation:
             
         self.model = data['model']
         self.scaler = data['scaler']
+        self.model_version = data.get(
+            'model_version', hashlib.md5(pickle.dumps((self.scaler, self.model))).hexdigest()[:12]
+        )
         self.feature_columns = data['feature_columns']
         self.n_clusters = data['n_clusters']
+        self.selection_report = data.get('selection_report')
         
         print(f"Model loaded from {filepath}")
     
@@ -0,0 +1,458 @@
+"""
+Shared-Memory Batch Scoring
+Exports the segmentation, churn and return models once as flat parameter
+arrays (memory-mapped .npy files), so any number of scoring processes map
+the same pages instead of unpickling their own model copies. Input chunks
+and scores are exchanged through memory-mapped buffers as well
+"""
+
+import pandas as pd
+import numpy as np
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from atomic_io import atomic_write_csv
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+SHARED_ROOT = 'models/shared_scoring'
+CHUNK_ROWS = 20000
+
+# Prefer RAM-backed files for the input / output buffers
+BUFFER_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+OUTPUT_COLUMNS = {
+    'customer': ['predicted_segment', 'predicted_churn', 'churn_probability'],
+    'product': ['predicted_return', 'return_probability']
+}
+
+
+def flatten_forest(forest):
+    """Concatenate the trees of a fitted sklearn forest into flat node arrays
+
+    Children are global node ids (-1 at leaves), value holds each node's
+    class probabilities, and a row goes left when x <= threshold (missing
+    values follow missing_left).
+    """
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+    value = np.concatenate([tree.value[:, 0, :] for tree in trees]).astype(np.float64)
+    return {
+        'roots': offsets[:-1].astype(np.int64),
+        'left': np.concatenate([
+            np.where(tree.children_left >= 0, tree.children_left + offset, -1) for tree, offset in zip(trees, offsets)
+        ]).astype(np.int32),
+        'right': np.concatenate([
+            np.where(tree.children_right >= 0, tree.children_right + offset, -1) for tree, offset in zip(trees, offsets)
+        ]).astype(np.int32),
+        'feature': np.concatenate([np.maximum(tree.feature, 0) for tree in trees]).astype(np.int32),
+        'threshold': np.concatenate([tree.threshold for tree in trees]).astype(np.float64),
+        'missing_left': np.concatenate([
+            np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count)), dtype=bool) for tree in trees
+        ]),
+        'value': value / value.sum(axis=1, keepdims=True)
+    }
+
+
+def flatten_xgboost(classifier):
+    """Flat node arrays of a fitted binary:logistic XGBClassifier
+
+    XGBoost goes left when x < split_condition (in float32); the threshold
+    is stored as the next float32 below it, so x <= threshold is the same
+    test. value holds the leaf weights, and base_margin the log-odds bias.
+    """
+    model = json.loads(classifier.get_booster().save_raw('json'))
+    learner = model['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise ValueError(f"Unsupported XGBoost objective {learner['objective']['name']}")
+    trees = learner['gradient_booster']['model']['trees']
+    sizes = [len(tree['left_children']) for tree in trees]
+    offsets = np.cumsum([0] + sizes)
+
+    def gather(key, dtype):
+        return np.concatenate([np.asarray(tree[key], dtype=dtype) for tree in trees])
+
+    left = gather('left_children', np.int64)
+    right = gather('right_children', np.int64)
+    node_offsets = np.repeat(offsets[:-1], sizes)
+    conditions = gather('split_conditions', np.float32)
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    return {
+        'roots': offsets[:-1].astype(np.int64),
+        'left': np.where(left >= 0, left + node_offsets, -1).astype(np.int32),
+        'right': np.where(right >= 0, right + node_offsets, -1).astype(np.int32),
+        'feature': gather('split_indices', np.int32),
+        'threshold': np.nextafter(conditions, np.float32(-np.inf)).astype(np.float64),
+        'missing_left': gather('default_left', bool),
+        'value': conditions.astype(np.float64).reshape(-1, 1),
+        'base_margin': np.array([np.log(base_score / (1 - base_score))])
+    }
+
+
+def _ensemble_loop(X, roots, left, right, feature, threshold, missing_left, value, out):
+    """Sum the leaf values reached by every row in every tree (explicit loops)
+
+    Tree-major order keeps one tree's nodes in cache while all rows descend it.
+    """
+    for t in range(roots.shape[0]):
+        for i in range(X.shape[0]):
+            node = roots[t]
+            while left[node] >= 0:
+                x = X[i, feature[node]]
+                if np.isnan(x):
+                    go_left = missing_left[node]
+                else:
+                    go_left = x <= threshold[node]
+                node = left[node] if go_left else right[node]
+            for k in range(value.shape[1]):
+                out[i, k] += value[node, k]
+
+
+_ensemble_loop_jit = njit(cache=True, nogil=True)(_ensemble_loop) if njit is not None else None
+
+
+def _ensemble_numpy(X, roots, left, right, feature, threshold, missing_left, value, out):
+    """Pure-NumPy traversal: all rows descend one tree level per step"""
+    rows = np.arange(X.shape[0])
+    for root in roots:
+        node = np.full(X.shape[0], root, dtype=np.int64)
+        active = rows
+        while len(active):
+            current = node[active]
+            x = X[active, feature[current]]
+            go_left = np.where(np.isnan(x), missing_left[current], x <= threshold[current])
+            node[active] = np.where(go_left, left[current], right[current])
+            active = active[left[node[active]] >= 0]
+        out += value[node]
+
+
+def ensemble_sum(X, trees):
+    """(n_rows, n_values) sum of leaf values over all trees, for float32 rows X"""
+    out = np.zeros((X.shape[0], trees['value'].shape[1]))
+    kernel = _ensemble_loop_jit if _ensemble_loop_jit is not None else _ensemble_numpy
+    kernel(X, trees['roots'], trees['left'], trees['right'], trees['feature'],
+           trees['threshold'], trees['missing_left'], trees['value'], out)
+    return out
+
+
+def score_customers(models, X):
+    """Segment, churn class and churn probability of customer feature rows"""
+    meta = models['meta']['customer']
+    segment_X = (X[:, meta['segment_columns']] - models['segment_mean']) / models['segment_scale']
+    centers = models['segment_centers']
+    distances = (
+        (segment_X ** 2).sum(axis=1, keepdims=True) - 2 * segment_X @ centers.T + (centers ** 2).sum(axis=1)
+    )
+    segments = distances.argmin(axis=1)
+
+    churn_X = ((X[:, meta['churn_columns']] - models['churn_mean']) / models['churn_scale']).astype(np.float32)
+    margin = ensemble_sum(churn_X, models['churn_trees'])[:, 0] + models['churn_trees']['base_margin'][0]
+    probability = 1.0 / (1.0 + np.exp(-margin))
+    return np.column_stack([segments, probability > 0.5, probability])
+
+
+def score_products(models, X, category_codes):
+    """Return class and return probability of product feature rows"""
+    meta = models['meta']['product']
+    numeric = (X - models['return_mean']) / models['return_scale']
+    encoded = np.zeros((len(X), numeric.shape[1] + len(meta['categories'])), dtype=np.float32)
+    encoded[:, :numeric.shape[1]] = numeric
+    known = category_codes >= 0
+    encoded[np.flatnonzero(known), numeric.shape[1] + category_codes[known]] = 1.0
+
+    probabilities = ensemble_sum(encoded, models['return_trees']) / len(models['return_trees']['roots'])
+    predicted = np.asarray(meta['classes'])[probabilities.argmax(axis=1)]
+    return np.column_stack([predicted, probabilities[:, 1]])
+
+
+def _process_memory():
+    """Resident (RSS) and proportional (PSS, shared pages split) memory in MB, Linux only"""
+    memory = {}
+    if os.path.exists('/proc/self/smaps_rollup'):
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    memory[key.lower() + '_mb'] = int(rest.split()[0]) / 1024
+    return memory
+
+
+# Models mapped by this worker process, per export folder
+_WORKER_MODELS = {}
+
+
+def _worker_models(folder):
+    """Map an exported model folder once per process"""
+    if folder not in _WORKER_MODELS:
+        _WORKER_MODELS[folder] = SharedModelStore.map_arrays(folder)
+    return _WORKER_MODELS[folder]
+
+
+def _score_chunk(table, model_folder, buffer_folder, start, stop):
+    """Score rows start:stop of the shared input buffer into the shared output buffer"""
+    models = _worker_models(model_folder)
+    X = np.load(os.path.join(buffer_folder, 'inputs.npy'), mmap_mode='r')[start:stop]
+    outputs = np.load(os.path.join(buffer_folder, 'outputs.npy'), mmap_mode='r+')
+    if table == 'customer':
+        outputs[start:stop] = score_customers(models, X)
+    else:
+        codes = np.load(os.path.join(buffer_folder, 'categories.npy'), mmap_mode='r')[start:stop]
+        outputs[start:stop] = score_products(models, X, codes)
+    del outputs
+    return os.getpid(), _process_memory()
+
+
+class SharedModelStore:
+    def __init__(self, root=SHARED_ROOT):
+        """Initialize the store of exported model arrays"""
+        self.root = root
+        self.version = None
+        self.folder = None
+        self.meta = None
+
+    def export(self, seg_model, churn_model, return_model=None):
+        """Write the models' parameters as .npy arrays plus meta.json
+
+        The export is staged and swapped in, and LATEST points at it, so
+        running workers keep their old mapping until they reopen. Only the
+        random_forest return backend can be exported.
+        """
+        print("\n=== Exporting Shared Scoring Models ===")
+        versions = [seg_model.model_version, churn_model.model_version]
+        arrays = {
+            'segment_mean': seg_model.scaler.mean_,
+            'segment_scale': seg_model.scaler.scale_,
+            'segment_centers': seg_model.model.cluster_centers_
+        }
+        scaler = churn_model.model.named_steps['scaler']
+        arrays['churn_mean'], arrays['churn_scale'] = scaler.mean_, scaler.scale_
+        for name, values in flatten_xgboost(churn_model.model.named_steps['classifier']).items():
+            arrays[f'churn_trees.{name}'] = values
+
+        customer_columns = seg_model.feature_columns + [
+            col for col in churn_model.feature_columns if col not in seg_model.feature_columns
+        ]
+        meta = {'customer': {
+            'columns': customer_columns,
+            'segment_columns': [customer_columns.index(col) for col in seg_model.feature_columns],
+            'churn_columns': [customer_columns.index(col) for col in churn_model.feature_columns]
+        }}
+
+        if return_model is not None and return_model.backend == 'random_forest':
+            preprocessor = return_model.model.named_steps['preprocessor']
+            scaler = preprocessor.named_transformers_['num']
+            encoder = preprocessor.named_transformers_['cat']
+            forest = return_model.model.named_steps['classifier']
+            arrays['return_mean'], arrays['return_scale'] = scaler.mean_, scaler.scale_
+            for name, values in flatten_forest(forest).items():
+                arrays[f'return_trees.{name}'] = values
+            # The encoder keeps NaN as its own (last) category when training saw it
+            categories = list(encoder.categories_[0])
+            missing_category = next((i for i, c in enumerate(categories) if pd.isna(c)), -1)
+            meta['product'] = {
+                'columns': return_model.numerical_features,
+                'category_column': return_model.categorical_features[0],
+                'categories': [None if pd.isna(c) else str(c) for c in categories],
+                'missing_category': missing_category,
+                'classes': [int(c) for c in forest.classes_],
+                'fill_values': return_model.imputer.fill_values if return_model.imputer is not None else {},
+                'constant_fills': return_model.imputer.constant_fills if return_model.imputer is not None else {}
+            }
+            versions.append(return_model.model_version)
+        elif return_model is not None:
+            print(f"  ⚠ Return backend '{return_model.backend}' cannot be exported; product scoring unavailable")
+
+        version = '-'.join(str(v) for v in versions)
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+        for name, values in arrays.items():
+            np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(values))
+        meta['version'] = version
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        folder = os.path.join(self.root, version)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(staging, folder)
+        with open(os.path.join(self.root, 'LATEST'), 'w') as f:
+            f.write(version)
+
+        size = sum(values.nbytes for values in arrays.values()) / 1024 ** 2
+        print(f"Shared scoring models {version} exported to {folder} ({size:.1f} MB)")
+        return version
+
+    def open(self, version=None):
+        """Select an export (the latest one by default)"""
+        if version is None:
+            latest = os.path.join(self.root, 'LATEST')
+            if not os.path.exists(latest):
+                raise FileNotFoundError(f"No shared scoring models found in {self.root}")
+            with open(latest) as f:
+                version = f.read().strip()
+
+        self.version = version
+        self.folder = os.path.join(self.root, version)
+        with open(os.path.join(self.folder, 'meta.json')) as f:
+            self.meta = json.load(f)
+        return self
+
+    @staticmethod
+    def map_arrays(folder):
+        """Memory-map every array of an export (zero-copy, read-only)"""
+        models = {}
+        for path in glob.glob(os.path.join(folder, '*.npy')):
+            name = os.path.basename(path)[:-len('.npy')]
+            values = np.load(path, mmap_mode='r')
+            group, _, key = name.partition('.')
+            if key:
+                models.setdefault(group, {})[key] = values
+            else:
+                models[name] = values
+        with open(os.path.join(folder, 'meta.json')) as f:
+            models['meta'] = json.load(f)
+        return models
+
+
+class SharedScoringPool:
+    def __init__(self, workers=None, root=SHARED_ROOT, version=None, chunk_rows=CHUNK_ROWS, buffer_dir=BUFFER_DIR):
+        """Initialize a pool of scoring processes over one model export
+
+        Workers are spawned fresh (they never import sklearn or xgboost)
+        and map the exported arrays, so the model pages exist once in
+        memory however many workers run.
+        """
+        self.store = SharedModelStore(root).open(version)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_rows = chunk_rows
+        self.buffer_dir = buffer_dir
+        self.executor = None
+        self.worker_memory = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_worker_models, initargs=(self.store.folder,)
+            )
+        return self.executor
+
+    def _write_inputs(self, table, df, buffer_folder):
+        """Write the model inputs of df to the shared input buffers"""
+        meta = self.store.meta.get(table)
+        if meta is None:
+            raise ValueError(f"No {table} model in shared export {self.store.version}")
+        missing = [col for col in meta['columns'] if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing input columns: {', '.join(missing)}")
+
+        X = df[meta['columns']]
+        if table == 'product':
+            # Same fills as MedianImputer.transform
+            X = X.fillna({col: value for col, value in meta['fill_values'].items() if col in X.columns})
+            categories = df[meta['category_column']].astype(object)
+            categories = categories.fillna(meta['constant_fills'].get(meta['category_column'], np.nan))
+            # astype(str) keeps NaN, so missing rows get the encoder's NaN code explicitly
+            missing = categories.isna().to_numpy()
+            codes = pd.Index(meta['categories']).get_indexer(categories.astype(str))
+            codes[missing] = meta.get('missing_category', -1)
+            np.save(os.path.join(buffer_folder, 'categories.npy'), codes.astype(np.int64))
+        np.save(os.path.join(buffer_folder, 'inputs.npy'), X.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def score(self, table, df):
+        """Score a frame in parallel chunks; returns the output columns
+
+        Every row is scored: there is no prediction cache, drift
+        monitoring, feature store lookup or explanation here, unlike in
+        predict.py.
+        """
+        buffer_folder = tempfile.mkdtemp(prefix='scoring-', dir=self.buffer_dir)
+        try:
+            self._write_inputs(table, df, buffer_folder)
+            outputs = np.lib.format.open_memmap(
+                os.path.join(buffer_folder, 'outputs.npy'), mode='w+',
+                dtype=np.float64, shape=(len(df), len(OUTPUT_COLUMNS[table]))
+            )
+            del outputs
+
+            executor = self._executor()
+            futures = [
+                executor.submit(_score_chunk, table, self.store.folder, buffer_folder, start,
+                                min(start + self.chunk_rows, len(df)))
+                for start in range(0, len(df), self.chunk_rows)
+            ]
+            for future in futures:
+                pid, memory = future.result()
+                self.worker_memory[pid] = memory
+
+            outputs = np.load(os.path.join(buffer_folder, 'outputs.npy'))
+        finally:
+            shutil.rmtree(buffer_folder, ignore_errors=True)
+
+        result = pd.DataFrame(outputs, columns=OUTPUT_COLUMNS[table], index=df.index)
+        for col in ['predicted_segment', 'predicted_churn', 'predicted_return']:
+            if col in result.columns:
+                result[col] = result[col].astype(int)
+        return result
+
+    def score_csv(self, table, input_csv, output_csv):
+        """Score one CSV and write it with the prediction columns"""
+        df = pd.read_csv(input_csv)
+        scores = self.score(table, df)
+        for col in scores.columns:
+            df[col] = scores[col].to_numpy()
+        atomic_write_csv(df, output_csv)
+        return df
+
+    def memory_report(self):
+        """Memory of every worker seen so far (PSS counts shared model pages once in total)"""
+        return pd.DataFrame.from_dict(self.worker_memory, orient='index').rename_axis('pid')
+
+
+def main():
+    """Score every CSV shard of a folder with shared-memory workers
+
+    Usage: python shared_scoring.py <customer|product> <input_folder> <output_folder> [workers]
+    """
+    if len(sys.argv) < 4 or sys.argv[1] not in OUTPUT_COLUMNS:
+        print(main.__doc__)
+        return
+    table, input_folder, output_folder = sys.argv[1:4]
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    paths = sorted(glob.glob(os.path.join(input_folder, '*.csv')))
+    rows = 0
+    started = time.perf_counter()
+    with SharedScoringPool(workers) as pool:
+        for path in paths:
+            rows += len(pool.score_csv(table, path, os.path.join(output_folder, os.path.basename(path))))
+        elapsed = time.perf_counter() - started
+        print(f"Scored {rows} {table} rows from {len(paths)} files in {elapsed:.1f}s "
+              f"({rows / elapsed:.0f} rows/s, {pool.workers} workers)")
+        print(pool.memory_report().round(1).to_string())
+
+
+if __name__ == "__main__":
+    main()
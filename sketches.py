@@ -0,0 +1,254 @@
+"""
+Mergeable Streaming Sketches
+Fixed-size summaries that can be updated chunk by chunk, merged across
+chunks/workers and queried in constant time with explicit error bounds
+"""
+
+import pandas as pd
+import numpy as np
+
+
+def _hash64(values):
+    """Stable 64-bit hash of an array of ids"""
+    return pd.util.hash_array(np.asarray(values), categorize=False).astype(np.uint64)
+
+
+class QuantileSketch:
+    def __init__(self, capacity=2048, seed=42):
+        """Initialize a mergeable approximate quantile sketch (KLL-style compactors)
+
+        Level i holds items of weight 2**i; a full level is sorted and every
+        other item (random offset) is promoted, so memory stays
+        O(capacity * log(n / capacity)). Each compaction at level i can shift
+        any rank by at most 2**i, which is accumulated in rank_error.
+        """
+        self.capacity = capacity
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.count = 0
+        self.rank_error = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Add a batch of values (NaN is ignored)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for i, items in enumerate(other.levels):
+            self.levels[i] = np.concatenate([self.levels[i], items])
+        self.count += other.count
+        self.rank_error += other.rank_error
+        self._compact()
+        return self
+
+    def _compact(self):
+        """Halve every level that exceeds capacity into the level above"""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity:
+                items = np.sort(items)
+                keep_odd = len(items) % 2
+                if keep_odd:
+                    items, leftover = items[:-1], items[-1:]
+                else:
+                    leftover = items[:0]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = leftover
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.rank_error += 2 ** level
+            level += 1
+
+    def _weighted(self):
+        """Retained items sorted, with cumulative weights"""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(items), 2.0 ** i) for i, items in enumerate(self.levels)
+        ])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Approximate q-quantile of everything seen (NaN when empty)"""
+        if self.count == 0:
+            return np.nan
+        values, cumulative = self._weighted()
+        position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(values[min(position, len(values) - 1)])
+
+    def rank(self, x):
+        """Approximate number of values <= x (array-friendly)"""
+        if self.count == 0:
+            return np.zeros(np.shape(x))
+        values, cumulative = self._weighted()
+        positions = np.searchsorted(values, x, side='right')
+        return np.where(positions > 0, cumulative[np.maximum(positions - 1, 0)], 0.0)
+
+    def histogram(self, edges):
+        """Approximate bin counts over edges; each count is within 2 * rank_error"""
+        ranks = self.rank(np.asarray(edges, dtype=np.float64))
+        ranks[0] = self.rank(np.nextafter(edges[0], -np.inf))
+        return np.diff(ranks)
+
+    @property
+    def relative_rank_error(self):
+        """Worst-case rank error as a fraction of the count"""
+        return self.rank_error / self.count if self.count else 0.0
+
+
+class HyperLogLog:
+    def __init__(self, precision=12):
+        """Initialize a HyperLogLog distinct counter with 2**precision registers
+
+        Standard error is about 1.04 / sqrt(2**precision) (1.6% at 12).
+        """
+        self.precision = precision
+        self.n_registers = 1 << precision
+        self.registers = np.zeros(self.n_registers, dtype=np.uint8)
+
+    def update(self, values):
+        """Add a batch of ids"""
+        if len(values) == 0:
+            return self
+        hashes = _hash64(values)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = (hashes << np.uint64(self.precision)) | np.uint64(1 << (self.precision - 1))
+        # Position of the first set bit in the remaining 64 - precision bits
+        leading = np.zeros(len(remainder), dtype=np.uint8)
+        probe = remainder.copy()
+        for shift in (32, 16, 8, 4, 2, 1):
+            empty = probe < (np.uint64(1) << np.uint64(64 - shift))
+            leading[empty] += shift
+            probe[empty] <<= np.uint64(shift)
+        np.maximum.at(self.registers, index, leading + 1)
+        return self
+
+    def merge(self, other):
+        """Fold another counter with the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog counters with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """Estimated number of distinct ids"""
+        m = self.n_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+    @property
+    def relative_error(self):
+        """Standard error of count() as a fraction"""
+        return 1.04 / np.sqrt(self.n_registers)
+
+
+class BottomKSample:
+    def __init__(self, size=10000, seed=42):
+        """Initialize a uniform sample without replacement (bottom-k of hashed keys)
+
+        Every row gets a key in [0, 1) hashed from its values (and seed) and
+        the k smallest are kept, which is a reservoir sample that can also be
+        merged across chunks. Since a row's key can be recomputed, rows can
+        also be removed; the sample then holds every current row with a key
+        below the threshold, which only drops when the sample overflows.
+        """
+        self.size = size
+        self.seed = seed
+        self.keys = np.empty(0, dtype=np.float64)
+        self.rows = None
+        self.count = 0
+        self.threshold = 1.0
+
+    def _keys(self, df):
+        """Key in [0, 1) of every row"""
+        hashes = pd.util.hash_pandas_object(df, index=False, hash_key=f'{self.seed:016d}'[-16:]).to_numpy()
+        return (hashes >> np.uint64(11)) * 2.0 ** -53
+
+    def update(self, df):
+        """Add a batch of rows"""
+        self.count += len(df)
+        self._keep(self._keys(df), df.reset_index(drop=True))
+        return self
+
+    def remove(self, df):
+        """Remove a batch of rows added earlier (one sampled copy per row)"""
+        self.count -= len(df)
+        if self.rows is None or not len(df):
+            return self
+
+        def occurrences(keys):
+            return pd.MultiIndex.from_arrays([keys, pd.Series(keys).groupby(keys).cumcount().to_numpy()])
+
+        kept = ~occurrences(self.keys).isin(occurrences(self._keys(df)))
+        self.keys = self.keys[kept]
+        self.rows = self.rows[kept].reset_index(drop=True)
+        return self
+
+    def merge(self, other):
+        """Fold another sample into this one"""
+        self.count += other.count
+        if other.threshold < self.threshold:
+            self._cut(other.threshold)
+        if other.rows is not None:
+            keys = other.keys
+            below = keys < self.threshold
+            self._keep(keys[below], other.rows[below].reset_index(drop=True))
+        return self
+
+    def _cut(self, threshold):
+        """Drop sampled rows with keys at or above threshold"""
+        self.threshold = threshold
+        if self.rows is not None:
+            below = self.keys < threshold
+            self.keys = self.keys[below]
+            self.rows = self.rows[below].reset_index(drop=True)
+
+    def _keep(self, keys, rows):
+        """Keep the k rows with the smallest keys below the threshold"""
+        below = keys < self.threshold
+        keys, rows = keys[below], rows[below]
+        all_keys = np.concatenate([self.keys, keys])
+        all_rows = rows if self.rows is None else pd.concat([self.rows, rows], ignore_index=True)
+        if len(all_keys) > self.size:
+            order = np.argsort(all_keys, kind='stable')
+            self.threshold = float(all_keys[order[self.size]])
+            keep = order[:self.size]
+            all_keys = all_keys[keep]
+            all_rows = all_rows.iloc[keep].reset_index(drop=True)
+        self.keys = all_keys
+        self.rows = all_rows.reset_index(drop=True)
+
+    def estimate_mean(self, column, z=1.96):
+        """(mean, +/- half-width) of a column, with finite population correction"""
+        values = self.rows[column].astype(np.float64).dropna() if self.rows is not None else pd.Series(dtype=float)
+        n = len(values)
+        if n == 0:
+            return np.nan, np.nan
+        if n >= self.count or n < 2:
+            return float(values.mean()), 0.0
+        fpc = np.sqrt((self.count - n) / (self.count - 1))
+        return float(values.mean()), float(z * values.std(ddof=1) / np.sqrt(n) * fpc)
+
+    def estimate_total(self, column, z=1.96):
+        """(sum, +/- half-width) of a column scaled to the full population"""
+        mean, error = self.estimate_mean(column, z)
+        return mean * self.count, error * self.count
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Mergeable Streaming Sketches Module")
+    print("QuantileSketch, HyperLogLog and BottomKSample")
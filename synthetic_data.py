@@ -0,0 +1,295 @@
+"""
+Synthetic Scoring Data Generator
+Fits per-column marginals and a Gaussian copula (rank correlations) to the
+real customer master and return data, and writes seeded, reproducible
+synthetic prediction inputs of any size as parallel CSV shards
+"""
+
+import pandas as pd
+import numpy as np
+import pickle
+import os
+from joblib import Parallel, delayed
+from scipy.special import ndtr, ndtri
+
+
+# Input columns of Predictions_Customer.csv / Predictions_Product.csv
+CUSTOMER_COLUMNS = [
+    'recency', 'frequency', 'monetary', 'avg_review_score', 'has_left_bad_review',
+    'avg_days_between_purchases', 'avg_delivery_time', 'avg_delivery_lateness',
+    'avg_approval_hours', 'number_of_low_reviews', 'std_dev_days_between_purchases',
+    'frequency_last_90_days', 'monetary_last_90_days', 'freq_ratio_90d_alltime'
+]
+PRODUCT_COLUMNS = [
+    'price', 'freight_value', 'product_category_name', 'product_name_lenght',
+    'product_description_lenght', 'product_photos_qty', 'product_weight_g',
+    'product_length_cm', 'product_height_cm', 'product_width_cm'
+]
+CATEGORICAL_COLUMNS = ['product_category_name']
+
+# Columns that are exactly 0 unless a gate on an earlier column holds
+# (e.g. no 90-day purchases unless the latest purchase is that recent);
+# their marginals are fitted on the rows where the gate is open
+GATED_COLUMNS = {
+    'avg_days_between_purchases': ('frequency', 1),
+    'std_dev_days_between_purchases': ('frequency', 1),
+    'frequency_last_90_days': ('recency', -90),
+    'monetary_last_90_days': ('frequency_last_90_days', 0)
+}
+
+# Customer columns that can never exceed another (a window of a total)
+BOUNDED_COLUMNS = {
+    'frequency_last_90_days': 'frequency',
+    'monetary_last_90_days': 'monetary'
+}
+
+# Stable per-table stream ids, so shard seeds never collide across tables
+TABLE_IDS = {'customer': 1, 'product': 2}
+
+QUANTILE_KNOTS = 1001
+
+
+def _write_shard(generator, table, shard, n_rows, filepath):
+    """Generate one shard and write it as CSV (runs in a worker)"""
+    generator.sample(table, n_rows, shard).to_csv(filepath, index=False)
+    return filepath
+
+
+def _gate_open(df, col):
+    """Rows where a gated column can be non-zero (gate value > threshold; negative = below)"""
+    gate_column, threshold = GATED_COLUMNS[col]
+    values = np.asarray(pd.to_numeric(df[gate_column], errors='coerce'), dtype=np.float64)
+    return values < -threshold if threshold < 0 else values > threshold
+
+
+def constraint_violations(df):
+    """Share of rows breaking each customer master relation (impossible combinations)
+
+    A gated column must be 0 while its gate is closed (e.g. no gap
+    between purchases with a single purchase), a window total cannot
+    exceed its all-time total, and has_left_bad_review must match
+    number_of_low_reviews. Missing values never count as violations.
+    """
+    def numeric(col):
+        return np.nan_to_num(np.asarray(pd.to_numeric(df[col], errors='coerce'), dtype=np.float64))
+
+    violations = {}
+    for col, (gate_column, _) in GATED_COLUMNS.items():
+        if col in df and gate_column in df:
+            violations[f'{col} != 0 while {gate_column} gate closed'] = (~_gate_open(df, col)) & (numeric(col) != 0)
+    for col, total in BOUNDED_COLUMNS.items():
+        if col in df and total in df:
+            violations[f'{col} > {total}'] = numeric(col) > numeric(total)
+    if 'has_left_bad_review' in df and 'number_of_low_reviews' in df:
+        violations['has_left_bad_review != (number_of_low_reviews > 0)'] = (
+            numeric('has_left_bad_review') != (numeric('number_of_low_reviews') > 0)
+        )
+    return pd.Series({name: float(np.mean(broken)) for name, broken in violations.items()}, dtype=np.float64)
+
+
+class SyntheticDataGenerator:
+    def __init__(self, seed=42, max_fit_rows=200000):
+        """Initialize an unfitted generator"""
+        self.seed = seed
+        self.max_fit_rows = max_fit_rows
+        self.tables = {}
+
+    def _fit_table(self, df, columns):
+        """Fit marginals and the copula correlation of one table
+
+        Numeric columns keep QUANTILE_KNOTS empirical quantiles, their
+        missing rate and whether they are whole numbers. Categorical
+        columns are ordered by the mean of the first numeric column, so
+        their association with it survives the copula.
+        """
+        rng = np.random.default_rng(self.seed)
+        if len(df) > self.max_fit_rows:
+            df = df.iloc[rng.choice(len(df), self.max_fit_rows, replace=False)]
+        columns = [c for c in columns if c in df.columns]
+        numeric = [c for c in columns if c not in CATEGORICAL_COLUMNS]
+        knots = np.linspace(0, 1, QUANTILE_KNOTS)
+
+        spec = {'columns': columns, 'numeric': {}, 'categorical': {}}
+        scores = np.zeros((len(df), len(columns)))
+        for j, col in enumerate(columns):
+            if col in CATEGORICAL_COLUMNS:
+                values = df[col].astype(object).fillna('Unknown')
+                anchor = pd.to_numeric(df[numeric[0]], errors='coerce') if numeric else pd.Series(0.0, index=df.index)
+                frequencies = values.value_counts(normalize=True)
+                order = anchor.groupby(values).mean().reindex(frequencies.index).sort_values(kind='stable').index
+                upper = np.cumsum(frequencies.reindex(order).to_numpy())
+                upper[-1] = 1.0
+                spec['categorical'][col] = {'categories': np.asarray(order, dtype=object), 'upper': upper}
+
+                # Normal score: uniform draw inside the category's probability interval
+                position = pd.Index(order).get_indexer(values)
+                lower = np.concatenate([[0.0], upper[:-1]])
+                u = lower[position] + rng.random(len(values)) * (upper[position] - lower[position])
+                scores[:, j] = ndtri(np.clip(u, 1e-6, 1 - 1e-6))
+                continue
+
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+            missing = np.isnan(values)
+            if col in GATED_COLUMNS and GATED_COLUMNS[col][0] in columns:
+                missing |= ~_gate_open(df, col)
+            valid = values[~missing]
+            spec['numeric'][col] = {
+                'quantiles': np.quantile(valid, knots) if len(valid) else np.zeros(QUANTILE_KNOTS),
+                'missing_rate': float(np.isnan(values).mean()),
+                'integer': bool(len(valid) and np.all(valid == np.round(valid)))
+            }
+            ranks = pd.Series(valid).rank(method='average').to_numpy()
+            scores[~missing, j] = ndtri(ranks / (len(valid) + 1))
+
+        correlation = np.corrcoef(scores, rowvar=False) if len(columns) > 1 else np.ones((1, 1))
+        correlation = np.nan_to_num(correlation)
+        np.fill_diagonal(correlation, 1.0)
+        # Clip to positive definite before the Cholesky factor
+        eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+        correlation = eigenvectors @ np.diag(np.clip(eigenvalues, 1e-6, None)) @ eigenvectors.T
+        spec['cholesky'] = np.linalg.cholesky(correlation)
+        spec['rank_correlation'] = pd.DataFrame(correlation, index=columns, columns=columns)
+        return spec
+
+    def fit(self, customer_master=None, return_data=None):
+        """Fit the customer and/or product tables from real data"""
+        print("\n=== Fitting Synthetic Data Generator ===")
+        if customer_master is not None:
+            self.tables['customer'] = self._fit_table(customer_master, CUSTOMER_COLUMNS)
+        if return_data is not None:
+            self.tables['product'] = self._fit_table(return_data, PRODUCT_COLUMNS)
+        print(f"Generator fitted for: {', '.join(self.tables)}")
+        return self
+
+    def _rng(self, table, shard):
+        """Independent, reproducible random stream of one shard"""
+        return np.random.default_rng(np.random.SeedSequence([self.seed, TABLE_IDS[table], shard]))
+
+    def sample(self, table, n_rows, shard=0):
+        """Draw n_rows synthetic rows for one shard
+
+        The same (seed, table, shard, n_rows) always yields the same rows,
+        whichever worker or process generates it.
+        """
+        if table not in self.tables:
+            raise ValueError(f"Generator not fitted for '{table}'. Call fit() first.")
+        spec = self.tables[table]
+        rng = self._rng(table, shard)
+
+        z = rng.standard_normal((n_rows, len(spec['columns']))) @ spec['cholesky'].T
+        u = ndtr(z)
+        data = {}
+        for j, col in enumerate(spec['columns']):
+            if col in spec['categorical']:
+                categorical = spec['categorical'][col]
+                index = np.minimum(np.searchsorted(categorical['upper'], u[:, j]), len(categorical['upper']) - 1)
+                data[col] = categorical['categories'][index]
+                continue
+            numeric = spec['numeric'][col]
+            values = np.interp(u[:, j], np.linspace(0, 1, QUANTILE_KNOTS), numeric['quantiles'])
+            if numeric['integer']:
+                values = np.round(values)
+            if col in GATED_COLUMNS and GATED_COLUMNS[col][0] in data:
+                values[~_gate_open(data, col)] = 0.0
+            if numeric['missing_rate'] > 0:
+                values[rng.random(n_rows) < numeric['missing_rate']] = np.nan
+            data[col] = values
+        df = pd.DataFrame(data)
+
+        if table == 'customer':
+            ids = rng.integers(0, np.iinfo(np.int64).max, size=(n_rows, 2))
+            df.insert(0, 'customer_unique_id', np.char.add(
+                np.char.mod('%016x', ids[:, 0]), np.char.mod('%016x', ids[:, 1])
+            ))
+            df = self._customer_constraints(df)
+        return df
+
+    @staticmethod
+    def _customer_constraints(df):
+        """Restore the deterministic relations between customer master columns"""
+        df['frequency'] = df['frequency'].clip(lower=1)
+        df['frequency_last_90_days'] = np.minimum(df['frequency_last_90_days'], df['frequency'])
+        df['monetary_last_90_days'] = np.minimum(df['monetary_last_90_days'], df['monetary'])
+        df['has_left_bad_review'] = (df['number_of_low_reviews'] > 0).astype(int)
+        df['freq_ratio_90d_alltime'] = df['frequency_last_90_days'] / (df['frequency'] + 1)
+        return df
+
+    def generate(self, table, n_rows, output_folder, shard_rows=100000, n_jobs=-1):
+        """Write n_rows synthetic rows as CSV shards, generated in parallel
+
+        Shard i always holds the same rows, so any subset of shards can be
+        regenerated or extended reproducibly.
+        """
+        os.makedirs(output_folder, exist_ok=True)
+        shard_sizes = [min(shard_rows, n_rows - start) for start in range(0, n_rows, shard_rows)]
+        paths = Parallel(n_jobs=n_jobs)(
+            delayed(_write_shard)(
+                self, table, shard, size, os.path.join(output_folder, f'{table}-{shard:05d}.csv')
+            )
+            for shard, size in enumerate(shard_sizes)
+        )
+        print(f"Generated {n_rows} synthetic {table} rows in {len(paths)} shards under {output_folder}")
+        return paths
+
+    def compare(self, table, real, n_rows=100000):
+        """Marginal and rank-correlation fidelity of a synthetic sample against real data
+
+        Returns per-column KS distance / category total variation, the
+        largest absolute difference of the Spearman correlations and, for
+        customers, the share of synthetic rows breaking each constraint
+        (see constraint_violations; all should be 0).
+        """
+        synthetic = self.sample(table, n_rows, shard=0)
+        spec = self.tables[table]
+        rows = []
+        for col in spec['columns']:
+            if col in spec['categorical']:
+                p = real[col].astype(object).fillna('Unknown').value_counts(normalize=True)
+                q = synthetic[col].value_counts(normalize=True)
+                distance = 0.5 * p.subtract(q, fill_value=0).abs().sum()
+                rows.append({'column': col, 'metric': 'total_variation', 'value': distance})
+                continue
+            a = np.sort(pd.to_numeric(real[col], errors='coerce').dropna().to_numpy())
+            b = np.sort(synthetic[col].dropna().to_numpy())
+            grid = np.concatenate([a, b])
+            ks = np.max(np.abs(
+                np.searchsorted(a, grid, side='right') / len(a) - np.searchsorted(b, grid, side='right') / len(b)
+            ))
+            rows.append({'column': col, 'metric': 'ks', 'value': ks})
+
+        numeric = list(spec['numeric'])
+        real_corr = real[numeric].apply(pd.to_numeric, errors='coerce').corr(method='spearman')
+        synthetic_corr = synthetic[numeric].corr(method='spearman')
+        rows.append({'column': '*', 'metric': 'max_spearman_diff',
+                     'value': float(np.nanmax(np.abs(real_corr.to_numpy() - synthetic_corr.to_numpy())))})
+        if table == 'customer':
+            for constraint, rate in constraint_violations(synthetic).items():
+                rows.append({'column': constraint, 'metric': 'violation_rate', 'value': rate})
+        return pd.DataFrame(rows)
+
+    def save(self, filepath='models/synthetic_generator.pkl'):
+        """Save the fitted generator"""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'wb') as f:
+            pickle.dump({'seed': self.seed, 'max_fit_rows': self.max_fit_rows, 'tables': self.tables}, f)
+
+        print(f"Synthetic data generator saved to {filepath}")
+
+    def load(self, filepath='models/synthetic_generator.pkl'):
+        """Load a fitted generator"""
+        with open(filepath, 'rb') as f:
+            data = pickle.load(f)
+
+        self.seed = data['seed']
+        self.max_fit_rows = data['max_fit_rows']
+        self.tables = data['tables']
+
+        print(f"Synthetic data generator loaded from {filepath}")
+        return self
+
+
+if __name__ == "__main__":
+    # This section will be used for testing
+    print("Synthetic Scoring Data Generator Module")
+    print("Use this module to generate reproducible synthetic prediction inputs")
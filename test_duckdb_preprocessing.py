@@ -0,0 +1,108 @@
+"""
+Parity checks for duckdb_preprocessing.py
+Writes a small generated Olist-shaped dataset to a temporary folder and
+compares every DuckDB output with the pandas backend
+"""
+
+import pandas as pd
+import numpy as np
+import pytest
+
+pytest.importorskip('duckdb')
+
+from duckdb_preprocessing import DuckDBPreprocessor
+
+
+N_CUSTOMERS = 150
+N_ORDERS = 300
+N_PRODUCTS = 60
+
+
+def _ids(rng, n):
+    """Olist-style 32-character hex ids"""
+    return [f'{value:032x}' for value in rng.integers(0, 2**63, n)]
+
+
+@pytest.fixture
+def olist_folder(tmp_path):
+    """Generated Olist CSVs (repeat customers, multi-item orders, missing values) in a temp folder"""
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp('2017-01-01')
+
+    customer_ids = _ids(rng, N_ORDERS)
+    customers = pd.DataFrame({
+        'customer_id': customer_ids,
+        'customer_unique_id': rng.choice(_ids(rng, N_CUSTOMERS), N_ORDERS),
+        'customer_zip_code_prefix': rng.integers(1000, 99999, N_ORDERS),
+        'customer_city': 'sao paulo',
+        'customer_state': rng.choice(['SP', 'RJ', 'MG'], N_ORDERS)
+    })
+
+    order_ids = _ids(rng, N_ORDERS)
+    purchase = start + pd.to_timedelta(rng.integers(0, 400 * 86400, N_ORDERS), unit='s')
+    orders = pd.DataFrame({
+        'order_id': order_ids,
+        'customer_id': customer_ids,
+        'order_status': 'delivered',
+        'order_purchase_timestamp': purchase,
+        'order_approved_at': purchase + pd.to_timedelta(rng.integers(60, 86400, N_ORDERS), unit='s'),
+        'order_delivered_carrier_date': purchase + pd.Timedelta(days=2),
+        'order_delivered_customer_date': purchase + pd.to_timedelta(rng.integers(2, 30, N_ORDERS), unit='D'),
+        'order_estimated_delivery_date': purchase + pd.Timedelta(days=15)
+    })
+    orders.loc[rng.random(N_ORDERS) < 0.05, 'order_delivered_customer_date'] = pd.NaT
+
+    products = pd.DataFrame({
+        'product_id': _ids(rng, N_PRODUCTS),
+        'product_category_name': rng.choice(['beleza_saude', 'perfumaria', 'brinquedos'], N_PRODUCTS),
+        'product_name_lenght': rng.integers(10, 60, N_PRODUCTS).astype(float),
+        'product_description_lenght': rng.integers(50, 2000, N_PRODUCTS).astype(float),
+        'product_photos_qty': rng.integers(1, 6, N_PRODUCTS).astype(float),
+        'product_weight_g': rng.integers(100, 5000, N_PRODUCTS).astype(float),
+        'product_length_cm': rng.integers(10, 60, N_PRODUCTS).astype(float),
+        'product_height_cm': rng.integers(2, 40, N_PRODUCTS).astype(float),
+        'product_width_cm': rng.integers(10, 50, N_PRODUCTS).astype(float)
+    })
+    missing = rng.random(N_PRODUCTS) < 0.1
+    products.loc[missing, ['product_category_name', 'product_name_lenght', 'product_photos_qty']] = np.nan
+    products.loc[rng.random(N_PRODUCTS) < 0.05, 'product_weight_g'] = np.nan
+
+    items_per_order = rng.integers(1, 4, N_ORDERS)
+    items = pd.DataFrame({'order_id': np.repeat(order_ids, items_per_order)})
+    items['order_item_id'] = items.groupby('order_id').cumcount() + 1
+    items['product_id'] = rng.choice(products['product_id'], len(items))
+    items['seller_id'] = rng.choice(_ids(rng, 10), len(items))
+    items['shipping_limit_date'] = purchase.repeat(items_per_order) + pd.Timedelta(days=3)
+    items['price'] = rng.gamma(2, 60, len(items)).round(2)
+    items['freight_value'] = rng.gamma(2, 10, len(items)).round(2)
+
+    payments = pd.DataFrame({
+        'order_id': order_ids,
+        'payment_sequential': 1,
+        'payment_type': 'credit_card',
+        'payment_installments': 1,
+        'payment_value': rng.gamma(2, 80, N_ORDERS).round(2)
+    })
+
+    reviews = pd.DataFrame({
+        'review_id': _ids(rng, N_ORDERS),
+        'order_id': order_ids,
+        'review_score': rng.choice([1, 2, 3, 4, 5], N_ORDERS, p=[0.1, 0.05, 0.1, 0.25, 0.5]),
+        'review_comment_title': None,
+        'review_comment_message': None,
+        'review_creation_date': purchase + pd.Timedelta(days=20),
+        'review_answer_timestamp': purchase + pd.Timedelta(days=21)
+    })
+
+    tables = {
+        'customers': customers, 'orders': orders, 'order_items': items,
+        'order_payments': payments, 'order_reviews': reviews, 'products': products
+    }
+    for name, df in tables.items():
+        df.to_csv(tmp_path / f'olist_{name}_dataset.csv', index=False)
+    return f'{tmp_path}/'
+
+
+def test_duckdb_matches_pandas(olist_folder):
+    """customer_master, sales_data, return_data and product features match the pandas backend"""
+    assert DuckDBPreprocessor(data_path=olist_folder).compare_with_pandas()
@@ -0,0 +1,83 @@
+"""
+Regression checks for predict.py
+Trains tiny models on random data in a temporary folder and runs the
+customer and product scoring twice on their own output files
+"""
+
+import pandas as pd
+import numpy as np
+import pytest
+
+import predict
+from segmentation_model import CustomerSegmentation
+from churn_model import ChurnPredictor
+from return_model import ReturnPredictor
+
+
+N_ROWS = 400
+
+
+@pytest.fixture
+def trained_models(tmp_path, monkeypatch):
+    """Random customer / product inputs with models trained on them, in a temp working folder"""
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+
+    seg_model, churn_model = CustomerSegmentation(), ChurnPredictor()
+    customer_columns = list(dict.fromkeys(seg_model.feature_columns + churn_model.feature_columns))
+    customers = pd.DataFrame(rng.random((N_ROWS, len(customer_columns))) * 10, columns=customer_columns)
+    customers['recency'] = rng.integers(1, 400, N_ROWS)
+    customers.insert(0, 'customer_unique_id', [f'{i:032x}' for i in range(N_ROWS)])
+    seg_model.train(customers.copy())
+    seg_model.save_model('models/segmentation_model.pkl')
+    churn_model.train(customers)
+    churn_model.save_model('models/churn_model.pkl')
+    customers.to_csv('Predictions_Customer.csv', index=False)
+
+    return_model = ReturnPredictor()
+    products = pd.DataFrame(rng.random((N_ROWS, len(return_model.numerical_features))) * 100,
+                            columns=return_model.numerical_features)
+    products['product_category_name'] = rng.choice(['a', 'b', 'c'], N_ROWS)
+    products['is_likely_return'] = (products['price'] + rng.normal(0, 20, N_ROWS) > 50).astype(int)
+    return_model.train(products)
+    return_model.save_model('models/return_model.pkl')
+    products.drop(columns='is_likely_return').to_csv('Predictions_Product.csv', index=False)
+
+
+@pytest.mark.parametrize('incremental', [False, True])
+def test_rescoring_own_output(trained_models, incremental):
+    """A second run on the written predictions (input == output) scores like the first"""
+    runs = []
+    for _ in range(2):
+        customers = predict.predict_customer_data(incremental=incremental)
+        products = predict.predict_product_returns(incremental=incremental)
+        runs.append((customers, products))
+
+    for first, second in zip(*runs):
+        assert list(second.columns) == list(first.columns)
+        pd.testing.assert_frame_equal(
+            second.reset_index(drop=True), first.reset_index(drop=True), check_dtype=False
+        )
+
+    customers, products = runs[1]
+    assert pd.to_numeric(customers['churn_probability'], errors='coerce').notna().all()
+    assert {'reason_1', 'reason_3_impact'} <= set(customers.columns)
+    assert {'reason_1', 'reason_3_path_impact'} <= set(products.columns)
+
+
+def test_fresh_template_gets_cached_outputs(trained_models):
+    """A template with already-scored features is written even when every score is a cache hit"""
+    template = pd.read_csv('Predictions_Customer.csv')
+    first = predict.predict_customer_data()
+    assert first.attrs['outputs_changed']
+
+    template.to_csv('Predictions_Customer.csv', index=False)
+    second = predict.predict_customer_data()
+    assert second.attrs['rows_rescored'] == 0
+    assert second.attrs['outputs_changed']
+    written = pd.read_csv('Predictions_Customer.csv')
+    assert {'churn_probability', 'reason_1'} <= set(written.columns)
+    np.testing.assert_allclose(written['churn_probability'], first['churn_probability'])
+
+    third = predict.predict_customer_data()
+    assert not third.attrs['outputs_changed']
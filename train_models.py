@@ -8,6 +8,12 @@ from segmentation_model import CustomerSegmentation
 from churn_model import ChurnPredictor
 from sales_forecast_model import SalesForecaster
 from return_model import ReturnPredictor
+from product_risk import ProductRiskTable
+from feature_store import CustomerFeatureStore
+from approx_analytics import ApproximateAnalytics
+from regional_cube import RegionalCube
+from synthetic_data import SyntheticDataGenerator
+from shared_scoring import SharedModelStore
 import pandas as pd
 
 
@@ -18,8 +24,12 @@ def main():
     
     # Step 1: Preprocess Data
     print("\n[STEP 1] Running Data Preprocessing...")
-    preprocessor = DataPreprocessor(data_path='')
+    preprocessor = DataPreprocessor(data_path='', compact=True)
     data = preprocessor.process_all()
+    CustomerFeatureStore().write_snapshot(data['customer_master'], preprocessor.analysis_date)
+    ApproximateAnalytics().update_transactions(data['transaction_data']).save('models/transaction_sketches.pkl')
+    preprocessor.sales_rollup.save()
+    preprocessor.build_customer_activity().save()
     
     # Step 2: Train Customer Segmentation Model
     print("\n[STEP 2] Training Customer Segmentation Model...")
@@ -42,15 +52,41 @@ def main():
     # Step 5: Train Product Return Prediction Model
     print("\n[STEP 5] Training Product Return Prediction Model...")
     return_model = ReturnPredictor()
-    return_model.train(data['return_data'])
+    return_model.train(data['return_data'], imputer=preprocessor.imputer)
     return_model.save_model()
+    preprocessor.imputer.save()
+    
+    # Step 6: Precompute per-product return risk
+    print("\n[STEP 6] Building Product Risk Table...")
+    risk_table = ProductRiskTable()
+    risk_table.build(preprocessor.get_product_feature_data(), return_model)
+    risk_table.save()
+    
+    # Step 7: Pre-aggregate seller x state x month sales and return risk
+    print("\n[STEP 7] Building Regional Cube...")
+    regional_cube = RegionalCube()
+    regional_cube.build(
+        data['transaction_data'], preprocessor.dimensions, preprocessor.id_dictionary,
+        risk_table.table['return_probability']
+    )
+    regional_cube.save()
+    
+    # Step 8: Fit the synthetic data generator used for load tests
+    print("\n[STEP 8] Fitting Synthetic Data Generator...")
+    generator = SyntheticDataGenerator()
+    generator.fit(data['customer_master'], data['return_data'])
+    generator.save()
+    
+    # Step 9: Export model parameters for shared-memory batch scoring
+    print("\n[STEP 9] Exporting Shared Scoring Models...")
+    SharedModelStore().export(seg_model, churn_model, return_model)
     
     print("\n" + "="*60)
     print("ALL MODELS TRAINED AND SAVED SUCCESSFULLY!")
     print("="*60)
     
-    # Step 6: Create sample prediction CSV templates
-    print("\n[STEP 6] Creating Prediction CSV Templates...")
+    # Step 10: Create sample prediction CSV templates
+    print("\n[STEP 10] Creating Prediction CSV Templates...")
     create_prediction_templates(customer_data, data['return_data'])
     
     print("\n✓ Training pipeline complete!")
@@ -5,11 +5,14 @@
 // Store all customers globally for filtering
 let allCustomers = [];
 
+// Segment x risk counts from the pre-aggregated summary (null when using CSV rows)
+let customerSegmentRisk = null;
+
 // Load and display customer data
 async function loadCustomerData() {
     try {
-        // You can load from actual CSV files or use sample data
-        const customers = await loadCustomersFromCSV();
+        // Prefer the compact summary tables, fall back to the row-level CSV
+        const customers = await loadCustomersFromSummary() || await loadCustomersFromCSV();
         
         if (customers) {
             allCustomers = customers;
@@ -24,6 +27,24 @@ async function loadCustomerData() {
     }
 }
 
+/**
+ * Load customer summary tables (top customers per segment/risk + counts)
+ */
+async function loadCustomersFromSummary() {
+    try {
+        const [topCustomers, segmentRisk] = await Promise.all([
+            dashboardUtils.loadSummaryTable('customer_top'),
+            dashboardUtils.loadSummaryTable('customer_segment_risk')
+        ]);
+        customerSegmentRisk = segmentRisk;
+        return topCustomers;
+    } catch (error) {
+        console.warn('Could not load customer summaries, falling back to CSV:', error);
+        customerSegmentRisk = null;
+        return null;
+    }
+}
+
 /**
  * Load customers from CSV file
  */
@@ -133,15 +154,21 @@ function populateHighRiskTable(customers) {
 /**
  * Create customer charts
  */
-function createCustomerCharts(customers) {
+function createCustomerCharts(customers, segmentRisk = null) {
     // Customer Segment Bar Chart
     const segmentCtx = document.getElementById('customerSegmentChart');
     if (segmentCtx) {
         const segmentCounts = {};
-        customers.forEach(c => {
-            const segment = c.segment_name || 'Unknown';
-            segmentCounts[segment] = (segmentCounts[segment] || 0) + 1;
-        });
+        if (segmentRisk) {
+            segmentRisk.forEach(cell => {
+                segmentCounts[cell.segment_name] = (segmentCounts[cell.segment_name] || 0) + cell.count;
+            });
+        } else {
+            customers.forEach(c => {
+                const segment = c.segment_name || 'Unknown';
+                segmentCounts[segment] = (segmentCounts[segment] || 0) + 1;
+            });
+        }
         
         new Chart(segmentCtx, {
             type: 'bar',
@@ -171,10 +198,16 @@ function createCustomerCharts(customers) {
     const riskCtx = document.getElementById('customerRiskChart');
     if (riskCtx) {
         const riskCounts = {};
-        customers.forEach(c => {
-            const risk = c.churn_risk_level || 'Unknown';
-            riskCounts[risk] = (riskCounts[risk] || 0) + 1;
-        });
+        if (segmentRisk) {
+            segmentRisk.forEach(cell => {
+                riskCounts[cell.churn_risk_level] = (riskCounts[cell.churn_risk_level] || 0) + cell.count;
+            });
+        } else {
+            customers.forEach(c => {
+                const risk = c.churn_risk_level || 'Unknown';
+                riskCounts[risk] = (riskCounts[risk] || 0) + 1;
+            });
+        }
         
         new Chart(riskCtx, {
             type: 'pie',
@@ -245,44 +278,86 @@ function createCustomerCharts(customers) {
 }
 
 /**
- * Apply customer filters
+ * Read the selected segment and risk filters as data values (null = all)
  */
-function applyCustomerFilters() {
+function getCustomerFilterValues() {
     const segmentFilter = document.getElementById('segmentFilter');
     const riskFilter = document.getElementById('riskFilter');
     
+    const segmentMap = {
+        'vip': 'VIP Customers',
+        'recent': 'Recent Buyers',
+        'unhappy': 'Unhappy Customers',
+        'inactive': 'Inactive Customers'
+    };
+    const riskMap = {
+        'high': 'High Risk',
+        'medium': 'Medium Risk',
+        'low': 'Low Risk'
+    };
+    
+    return {
+        targetSegment: segmentFilter && segmentFilter.value !== 'all' ? segmentMap[segmentFilter.value] : null,
+        targetRisk: riskFilter && riskFilter.value !== 'all' ? riskMap[riskFilter.value] : null
+    };
+}
+
+/**
+ * Load one page of the customers table from the data service
+ * Returns false when the service is unavailable.
+ */
+async function loadCustomerTablePage(page) {
+    const { targetSegment, targetRisk } = getCustomerFilterValues();
+    const result = await dashboardUtils.fetchApiPage('customers', {
+        segment: targetSegment,
+        risk: targetRisk,
+        sort: 'churn_probability',
+        order: 'desc',
+        page: page,
+        page_size: 20
+    });
+    
+    if (!result) return false;
+    
+    populateHighRiskTable(result.rows);
+    dashboardUtils.renderTablePager('highRiskTable', result, loadCustomerTablePage);
+    return true;
+}
+
+/**
+ * Apply customer filters
+ */
+async function applyCustomerFilters() {
+    const { targetSegment, targetRisk } = getCustomerFilterValues();
+    
     let filteredCustomers = [...allCustomers];
+    let filteredSegmentRisk = customerSegmentRisk ? [...customerSegmentRisk] : null;
     
     // Apply segment filter
-    if (segmentFilter && segmentFilter.value !== 'all') {
-        const segmentMap = {
-            'vip': 'VIP Customers',
-            'recent': 'Recent Buyers',
-            'unhappy': 'Unhappy Customers',
-            'inactive': 'Inactive Customers'
-        };
-        const targetSegment = segmentMap[segmentFilter.value];
+    if (targetSegment) {
         filteredCustomers = filteredCustomers.filter(c => 
             c.segment_name === targetSegment
         );
+        if (filteredSegmentRisk) {
+            filteredSegmentRisk = filteredSegmentRisk.filter(cell => cell.segment_name === targetSegment);
+        }
     }
     
     // Apply risk filter
-    if (riskFilter && riskFilter.value !== 'all') {
-        const riskMap = {
-            'high': 'High Risk',
-            'medium': 'Medium Risk',
-            'low': 'Low Risk'
-        };
-        const targetRisk = riskMap[riskFilter.value];
+    if (targetRisk) {
         filteredCustomers = filteredCustomers.filter(c => 
             c.churn_risk_level === targetRisk
         );
+        if (filteredSegmentRisk) {
+            filteredSegmentRisk = filteredSegmentRisk.filter(cell => cell.churn_risk_level === targetRisk);
+        }
     }
     
-    // Update displays
-    populateHighRiskTable(filteredCustomers);
-    createCustomerCharts(filteredCustomers);
+    // Update displays (table pages come from the data service when it is running)
+    if (!await loadCustomerTablePage(1)) {
+        populateHighRiskTable(filteredCustomers);
+    }
+    createCustomerCharts(filteredCustomers, filteredSegmentRisk);
 }
 
 /**
@@ -206,6 +206,125 @@ function showNotification(message, type = 'info') {
     }, 4000);
 }
 
+/**
+ * Load the summary manifest (always revalidated, it is tiny)
+ */
+let summaryManifestPromise = null;
+
+function loadSummaryManifest() {
+    if (!summaryManifestPromise) {
+        summaryManifestPromise = fetch('/PowerBI_Data/summary/manifest.json', { cache: 'no-cache' })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                return response.json();
+            })
+            .catch(error => {
+                summaryManifestPromise = null;
+                throw error;
+            });
+    }
+    return summaryManifestPromise;
+}
+
+/**
+ * Convert a columnar table ({columns, length, data}) to row objects
+ */
+function columnarToRows(table) {
+    const rows = new Array(table.length);
+    for (let i = 0; i < table.length; i++) {
+        const row = {};
+        table.columns.forEach(col => {
+            row[col] = table.data[col][i];
+        });
+        rows[i] = row;
+    }
+    return rows;
+}
+
+/**
+ * Load a pre-aggregated summary table by name
+ * Files are addressed by content hash so the browser can cache them forever;
+ * the gzip variant is used when the browser can decompress it natively.
+ */
+async function loadSummaryTable(name) {
+    const manifest = await loadSummaryManifest();
+    const entry = manifest.tables[name];
+    if (!entry) {
+        throw new Error(`Summary table not found: ${name}`);
+    }
+    
+    const base = '/PowerBI_Data/summary/';
+    let table;
+    
+    if (entry.files.gzip && 'DecompressionStream' in window) {
+        const response = await fetch(`${base}${entry.files.gzip.path}?v=${entry.hash}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const stream = response.body.pipeThrough(new DecompressionStream('gzip'));
+        table = JSON.parse(await new Response(stream).text());
+    } else {
+        const response = await fetch(`${base}${entry.files.json.path}?v=${entry.hash}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        table = await response.json();
+    }
+    
+    return columnarToRows(table);
+}
+
+/**
+ * Fetch one page of rows from the local data service (data_service.py)
+ * Returns null when the service is not running so callers can fall back.
+ */
+async function fetchApiPage(endpoint, params) {
+    try {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') {
+                query.set(key, value);
+            }
+        });
+        const response = await fetch(`/api/${endpoint}?${query}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return await response.json();
+    } catch (error) {
+        return null;
+    }
+}
+
+/**
+ * Render Prev / Next controls under a table for a paginated API result
+ */
+function renderTablePager(tableId, result, onPage) {
+    const table = document.getElementById(tableId);
+    if (!table) return;
+    
+    let pager = document.getElementById(`${tableId}Pager`);
+    if (!pager) {
+        pager = document.createElement('div');
+        pager.id = `${tableId}Pager`;
+        pager.className = 'table-pager';
+        pager.style.cssText = 'display: flex; justify-content: flex-end; align-items: center; gap: 10px; margin-top: 10px;';
+        table.insertAdjacentElement('afterend', pager);
+    }
+    
+    const totalPages = Math.max(1, Math.ceil(result.total / result.page_size));
+    pager.innerHTML = `
+        <button class="btn-small btn-primary" ${result.page <= 1 ? 'disabled' : ''} data-page="${result.page - 1}">Prev</button>
+        <span>Page ${result.page} of ${totalPages} (${result.total.toLocaleString()} rows)</span>
+        <button class="btn-small btn-primary" ${result.page >= totalPages ? 'disabled' : ''} data-page="${result.page + 1}">Next</button>
+    `;
+    pager.querySelectorAll('button').forEach(button => {
+        button.addEventListener('click', () => onPage(parseInt(button.dataset.page, 10)));
+    });
+}
+
 /**
  * Export utility functions
  */
@@ -216,7 +335,10 @@ window.dashboardUtils = {
     formatPercentage,
     formatDate,
     getRiskBadge,
-    showNotification
+    showNotification,
+    loadSummaryTable,
+    fetchApiPage,
+    renderTablePager
 };
 
 // Log that main.js is loaded
@@ -5,10 +5,14 @@
 // Store all products globally for filtering
 let allProducts = [];
 
+// Category x risk counts from the pre-aggregated summary (null when using CSV rows)
+let productCategoryRisk = null;
+
 // Load and display product data
 async function loadProductData() {
     try {
-        const products = await loadProductsFromCSV();
+        // Prefer the compact summary tables, fall back to the row-level CSV
+        const products = await loadProductsFromSummary() || await loadProductsFromCSV();
         
         if (products) {
             allProducts = products;
@@ -22,6 +26,24 @@ async function loadProductData() {
     }
 }
 
+/**
+ * Load product summary tables (top products per category/risk + counts)
+ */
+async function loadProductsFromSummary() {
+    try {
+        const [topProducts, categoryRisk] = await Promise.all([
+            dashboardUtils.loadSummaryTable('product_top'),
+            dashboardUtils.loadSummaryTable('product_category_risk')
+        ]);
+        productCategoryRisk = categoryRisk;
+        return topProducts;
+    } catch (error) {
+        console.warn('Could not load product summaries, falling back to CSV:', error);
+        productCategoryRisk = null;
+        return null;
+    }
+}
+
 /**
  * Load products from CSV
  */
@@ -124,7 +146,7 @@ function populateHighRiskProductsTable(products) {
 /**
  * Create product charts
  */
-async function createProductCharts(products) {
+async function createProductCharts(products, categoryRisk = null) {
     // Top 10 High-Risk Categories Bar Chart
     const categoryCtx = document.getElementById('categoryRiskChart');
     if (categoryCtx) {
@@ -170,10 +192,16 @@ async function createProductCharts(products) {
     const riskCtx = document.getElementById('productRiskChart');
     if (riskCtx) {
         const riskCounts = {};
-        products.forEach(p => {
-            const risk = p.return_risk_level || 'Unknown';
-            riskCounts[risk] = (riskCounts[risk] || 0) + 1;
-        });
+        if (categoryRisk) {
+            categoryRisk.forEach(cell => {
+                riskCounts[cell.return_risk_level] = (riskCounts[cell.return_risk_level] || 0) + cell.count;
+            });
+        } else {
+            products.forEach(p => {
+                const risk = p.return_risk_level || 'Unknown';
+                riskCounts[risk] = (riskCounts[risk] || 0) + 1;
+            });
+        }
         
         new Chart(riskCtx, {
             type: 'doughnut',
@@ -253,6 +281,12 @@ async function createProductCharts(products) {
  * Load category analysis data
  */
 async function loadCategoryData() {
+    try {
+        return await dashboardUtils.loadSummaryTable('product_category_rollup');
+    } catch (error) {
+        console.warn('Could not load category summary, falling back to CSV:', error);
+    }
+    
     try {
         const response = await fetch('/PowerBI_Data/Category_Analysis.csv');
         if (!response.ok) {
@@ -285,37 +319,82 @@ async function loadCategoryData() {
 }
 
 /**
- * Apply product filters
+ * Read the selected category and return risk filters as data values (null = all)
  */
-function applyProductFilters() {
+function getProductFilterValues() {
     const categoryFilter = document.getElementById('categoryFilter');
     const returnRiskFilter = document.getElementById('returnRiskFilter');
     
+    const riskMap = {
+        'high': 'High Risk',
+        'medium': 'Medium Risk',
+        'low': 'Low Risk'
+    };
+    
+    return {
+        targetCategory: categoryFilter && categoryFilter.value !== 'all' ? categoryFilter.value : null,
+        targetRisk: returnRiskFilter && returnRiskFilter.value !== 'all' ? riskMap[returnRiskFilter.value] : null
+    };
+}
+
+/**
+ * Load one page of the products table from the data service
+ * Returns false when the service is unavailable.
+ */
+async function loadProductTablePage(page) {
+    const { targetCategory, targetRisk } = getProductFilterValues();
+    const result = await dashboardUtils.fetchApiPage('products', {
+        category: targetCategory,
+        risk: targetRisk,
+        sort: 'return_probability',
+        order: 'desc',
+        page: page,
+        page_size: 20
+    });
+    
+    if (!result) return false;
+    
+    populateHighRiskProductsTable(result.rows);
+    dashboardUtils.renderTablePager('highRiskProductsTable', result, loadProductTablePage);
+    return true;
+}
+
+/**
+ * Apply product filters
+ */
+async function applyProductFilters() {
+    const { targetCategory, targetRisk } = getProductFilterValues();
+    
     let filteredProducts = [...allProducts];
+    let filteredCategoryRisk = productCategoryRisk ? [...productCategoryRisk] : null;
     
     // Apply category filter
-    if (categoryFilter && categoryFilter.value !== 'all') {
+    if (targetCategory) {
         filteredProducts = filteredProducts.filter(p => 
-            p.product_category_name === categoryFilter.value
+            p.product_category_name === targetCategory
         );
+        if (filteredCategoryRisk) {
+            filteredCategoryRisk = filteredCategoryRisk.filter(cell => 
+                cell.product_category_name === targetCategory
+            );
+        }
     }
     
     // Apply return risk filter
-    if (returnRiskFilter && returnRiskFilter.value !== 'all') {
-        const riskMap = {
-            'high': 'High Risk',
-            'medium': 'Medium Risk',
-            'low': 'Low Risk'
-        };
-        const targetRisk = riskMap[returnRiskFilter.value];
+    if (targetRisk) {
         filteredProducts = filteredProducts.filter(p => 
             p.return_risk_level === targetRisk
         );
+        if (filteredCategoryRisk) {
+            filteredCategoryRisk = filteredCategoryRisk.filter(cell => cell.return_risk_level === targetRisk);
+        }
     }
     
-    // Update displays
-    populateHighRiskProductsTable(filteredProducts);
-    createProductCharts(filteredProducts);
+    // Update displays (table pages come from the data service when it is running)
+    if (!await loadProductTablePage(1)) {
+        populateHighRiskProductsTable(filteredProducts);
+    }
+    createProductCharts(filteredProducts, filteredCategoryRisk);
 }
 
 /**